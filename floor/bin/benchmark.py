@@ -5,45 +5,55 @@ from __future__ import absolute_import, division, print_function, unicode_litera
 import argparse
 import logging
 import sys
-import time
-import timeit
 
-from floor.controller import Controller
-from floor.controller.playlist import Playlist
-from floor.driver.base import Base as BaseDriver
 from floor.processor import all_processors
+from floor.util import benchmark
 
 LOG_FORMAT = "%(levelname)s: %(message)s"
 logger = logging.getLogger("benchmark")
 
 
-class DummyDriver(BaseDriver):
-    FAKE_WEIGHTS = [0] * 64
-
-    def get_weights(self):
-        return self.FAKE_WEIGHTS
-
-
 def get_options():
     parser = argparse.ArgumentParser(description="Benchmark one or more processors.")
 
     parser.add_argument(
         "processors",
         type=str,
-        nargs="+",
-        help='The name of the processor(s) to test, or "all" to test all.',
+        nargs="*",
+        default=["all"],
+        help='The name of the processor(s) to test, or "all" to test all (the default).',
     )
 
     parser.add_argument(
-        "--iterations",
-        dest="iterations",
-        default=100000,
+        "--frames",
+        dest="frames",
+        default=benchmark.DEFAULT_FRAMES,
         type=int,
-        help="How many iterations to run.",
+        help="How many frames to render at each BPM.",
     )
 
     parser.add_argument(
-        "--verbose", dest="verbose", action="store_true", help="Enable verbose logging"
+        "--bpms",
+        dest="bpms",
+        default=",".join(str(bpm) for bpm in benchmark.DEFAULT_BPMS),
+        type=str,
+        help="Comma-separated list of BPMs to render at.",
+    )
+
+    parser.add_argument(
+        "--fps",
+        dest="fps",
+        default=benchmark.DEFAULT_FPS,
+        type=int,
+        help="Frame rate of the fake clock.",
+    )
+
+    parser.add_argument(
+        "--no_allocations",
+        dest="allocations",
+        action="store_false",
+        default=True,
+        help="Skip measuring allocations.",
     )
 
     parser.add_argument(
@@ -54,51 +64,97 @@ def get_options():
         help="Whether to enable or disable garbage collection during benchmark.",
     )
 
-    return parser.parse_args()
-
-
-def benchmark_processor(name, processor, iterations, disable_gc):
-    driver = DummyDriver({})
-    playlist = Playlist(processor=processor)
-
-    class FakeClock:
-        def __init__(self):
-            self.clock = 0
+    parser.add_argument(
+        "--save_baseline",
+        dest="save_baseline",
+        default=None,
+        type=str,
+        help="Save the results as a JSON baseline to this file.",
+    )
 
-        def time(self):
-            # Call time.time() so benchmark factors this in, even though we are ignoring
-            # its value here in order to use our fake clock.
-            time.time()
-            return self.clock
+    parser.add_argument(
+        "--baseline",
+        dest="baseline",
+        default=None,
+        type=str,
+        help="Compare the results to this baseline, and fail on any regressions.",
+    )
 
-        def sleep(self, amt):
-            self.clock += amt
+    parser.add_argument(
+        "--threshold",
+        dest="threshold",
+        default=benchmark.DEFAULT_THRESHOLD,
+        type=float,
+        help="Fraction by which a metric may grow over its baseline before failing.",
+    )
 
-    clocksource = FakeClock()
-    controller = Controller(driver=driver, playlist=playlist, clocksource=clocksource)
+    parser.add_argument(
+        "--startup",
+        dest="startup",
+        action="store_true",
+        default=False,
+        help="Measure how long the show takes to start, instead of benchmarking processors.",
+    )
 
-    if disable_gc:
-        setup = ""
-    else:
-        setup = "gc.enable()"
+    parser.add_argument(
+        "--weights_log",
+        dest="weights_log",
+        default=None,
+        help="Play back weights recorded from a show (see run-show.py --record_weights) "
+        "instead of scripted steps.",
+    )
 
-    def timed_function(controller=controller):
-        controller.run_one_frame()
+    parser.add_argument(
+        "--startup_runs",
+        dest="startup_runs",
+        default=benchmark.DEFAULT_STARTUP_RUNS,
+        type=int,
+        help="How many times to start the show with --startup.",
+    )
 
-    timer = timeit.Timer(stmt=timed_function, setup=setup)
-    total_time = timer.timeit(number=iterations)
-    frames_per_second = round(iterations / total_time, 2)
-    logger.info("Benchmark done! Took {} seconds".format(total_time))
-    logger.info("FPS={}".format(frames_per_second))
+    parser.add_argument(
+        "--verbose", dest="verbose", action="store_true", help="Enable verbose logging"
+    )
 
-    return frames_per_second
+    return parser.parse_args()
 
 
-def print_results(results):
-    print("Name              FPS")
-    print("----------------  -----------")
-    for name, fps in sorted(results.items(), key=lambda x: x[1]):
-        print("{:16s}  {}".format(name, int(fps)))
+def print_results(results, baseline=None):
+    baseline = baseline or {}
+    print(
+        "Name                    ns/frame      p50 ns      p99 ns   peak B/frame  blocks/frame"
+        "  vs baseline"
+    )
+    print(
+        "--------------------  ----------  ----------  ----------  -------------  ------------"
+        "  -----------"
+    )
+    for name, result in sorted(results.items(), key=lambda x: x[1].ns_per_frame):
+        change = ""
+        if name in baseline:
+            change = "{:+.0%}".format(result.ns_per_frame / max(1, baseline[name].ns_per_frame) - 1)
+        peak = result.peak_bytes_per_frame
+        blocks = result.alloc_blocks_per_frame
+        print(
+            "{:20s}  {:>10}  {:>10}  {:>10}  {:>13}  {:>12}  {:>11}".format(
+                name,
+                result.ns_per_frame,
+                result.p50_ns,
+                result.p99_ns,
+                "-" if peak is None else peak,
+                "-" if blocks is None else blocks,
+                change,
+            )
+        )
+
+
+def print_startup(times):
+    times = sorted(times)
+    print(
+        "Startup: median {:.1f} ms, min {:.1f} ms, max {:.1f} ms over {} runs".format(
+            benchmark.percentile(times, 50) * 1000, times[0] * 1000, times[-1] * 1000, len(times)
+        )
+    )
 
 
 def run():
@@ -106,6 +162,10 @@ def run():
     log_level = logging.DEBUG if args.verbose else logging.INFO
     logging.basicConfig(level=log_level, format=LOG_FORMAT)
 
+    if args.startup:
+        print_startup(benchmark.measure_startup(runs=args.startup_runs))
+        return
+
     procs = all_processors()
     processors_to_test = {}
 
@@ -115,21 +175,38 @@ def run():
         else:
             processor = procs.get(processor_name)
             if not processor:
-                logging.error("Processor not found: {}".format(args.processor))
-                logging.error("Choices: {}".format(", ".join(sorted(procs.keys()))))
+                logger.error("Processor not found: {}".format(processor_name))
+                logger.error("Choices: {}".format(", ".join(sorted(procs.keys()))))
                 sys.exit(1)
             processors_to_test[processor_name] = processor
 
-    results = {}
-    names = sorted(processors_to_test.keys())
-    for name in names:
-        processor = processors_to_test[name]
-        logger.info("Starting benchmark of {} with {} iterations ...".format(name, args.iterations))
-        result = benchmark_processor(name, processor, args.iterations, args.disable_gc)
-        results[name] = result
+    baseline = None
+    if args.baseline:
+        baseline = benchmark.load_baseline(args.baseline)
+
+    results = benchmark.benchmark_processors(
+        processors_to_test,
+        bpms=[float(bpm) for bpm in args.bpms.split(",")],
+        frames=args.frames,
+        fps=args.fps,
+        allocation_frames=benchmark.DEFAULT_ALLOCATION_FRAMES if args.allocations else 0,
+        disable_gc=args.disable_gc,
+        weights_log=args.weights_log,
+    )
 
     logger.info("Done!")
-    print_results(results)
+    print_results(results, baseline)
+
+    if args.save_baseline:
+        benchmark.save_baseline(args.save_baseline, results)
+        logger.info("Saved baseline to {}".format(args.save_baseline))
+
+    if baseline is not None:
+        regressions = benchmark.find_regressions(results, baseline, threshold=args.threshold)
+        for regression in regressions:
+            logger.error("Regression: {}".format(regression))
+        if regressions:
+            sys.exit(1)
 
 
 if __name__ == "__main__":
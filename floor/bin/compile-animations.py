@@ -0,0 +1,66 @@
+#!/usr/bin/env python
+
+from __future__ import absolute_import, division, print_function, unicode_literals
+
+import argparse
+import glob
+import logging
+import os
+import sys
+
+from floor.util import animation_file
+
+LOG_FORMAT = "%(levelname)s: %(message)s"
+logger = logging.getLogger("compile-animations")
+
+
+def get_options():
+    parser = argparse.ArgumentParser(
+        description="Compile Piskel animations to frame files for the Animator processor."
+    )
+
+    parser.add_argument(
+        "sources",
+        type=str,
+        nargs="*",
+        help="Piskel .c exports or .py animation modules to compile. By default, compiles "
+        "every animation in {}, preferring .py modules over .c exports.".format(
+            animation_file.ANIMATIONS_DIR
+        ),
+    )
+
+    parser.add_argument(
+        "--verbose", dest="verbose", action="store_true", help="Enable verbose logging"
+    )
+
+    return parser.parse_args()
+
+
+def default_sources():
+    sources = {}
+    for ext in (".c", ".py"):
+        for filename in glob.glob(os.path.join(animation_file.ANIMATIONS_DIR, "*" + ext)):
+            name = os.path.splitext(os.path.basename(filename))[0]
+            if name != "__init__":
+                sources[name] = filename
+    return [sources[name] for name in sorted(sources)]
+
+
+def run():
+    args = get_options()
+    log_level = logging.DEBUG if args.verbose else logging.INFO
+    logging.basicConfig(level=log_level, format=LOG_FORMAT)
+
+    for source in args.sources or default_sources():
+        output = os.path.splitext(source)[0] + animation_file.COMPILED_EXT
+        try:
+            frames = animation_file.load_source(source)
+            num_frames = animation_file.compile_animation(frames, output)
+        except Exception as e:
+            logger.error("Could not compile {}: {}".format(source, e))
+            sys.exit(1)
+        logger.info("Compiled {} frames to {}".format(num_frames, output))
+
+
+if __name__ == "__main__":
+    run()
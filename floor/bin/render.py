@@ -0,0 +1,167 @@
+#!/usr/bin/env python
+
+from __future__ import absolute_import, division, print_function, unicode_literals
+
+import argparse
+import logging
+import os
+import sys
+import time
+
+from floor.controller import Layout, Playlist, offline
+from floor.processor import all_processors
+from floor.util import benchmark
+from floor.util.geometry import DEFAULT_GEOMETRY
+
+LOG_FORMAT = "%(levelname)s: %(message)s"
+CONFIG_DIR = os.path.join(os.path.dirname(os.path.realpath(__file__)), "..", "config")
+logger = logging.getLogger("render")
+
+
+def get_options():
+    parser = argparse.ArgumentParser(
+        description="Render a processor or playlist to a frame file, faster than real time."
+    )
+
+    parser.add_argument("output", type=str, help="The frame file to write.")
+
+    parser.add_argument(
+        "--processor",
+        dest="processor_name",
+        default=None,
+        help="Render this processor.",
+    )
+
+    parser.add_argument(
+        "--playlist",
+        dest="playlist",
+        default=None,
+        help="Render this playlist file.",
+    )
+
+    parser.add_argument(
+        "--seconds",
+        dest="seconds",
+        default=10.0,
+        type=float,
+        help="How many seconds of show time to render.",
+    )
+
+    parser.add_argument(
+        "--fps",
+        dest="fps",
+        default=offline.DEFAULT_FPS,
+        type=int,
+        help="Frames per second of show time.",
+    )
+
+    parser.add_argument(
+        "--bpm",
+        dest="bpm",
+        default=offline.DEFAULT_BPM,
+        type=float,
+        help="The tempo at the start of the show.",
+    )
+
+    parser.add_argument(
+        "--bpm_change",
+        dest="bpm_changes",
+        default=[],
+        action="append",
+        help='Change tempo during the show, as "<seconds>:<bpm>". May be repeated.',
+    )
+
+    parser.add_argument(
+        "--feet",
+        dest="feet",
+        default=0,
+        type=int,
+        help="Number of scripted feet stepping around the floor.",
+    )
+
+    parser.add_argument(
+        "--seed",
+        dest="seed",
+        default=0,
+        type=int,
+        help="Seed for the scripted feet.",
+    )
+
+    parser.add_argument(
+        "--floor_config",
+        dest="floor_config",
+        default=None,
+        help="Render for this floor configuration, eg a bigger floor; one pod by default.",
+    )
+
+    parser.add_argument(
+        "--verbose", dest="verbose", action="store_true", help="Enable verbose logging"
+    )
+
+    return parser.parse_args()
+
+
+def parse_bpm_change(value):
+    seconds, bpm = value.split(":")
+    return float(seconds), float(bpm)
+
+
+def run():
+    args = get_options()
+    log_level = logging.DEBUG if args.verbose else logging.INFO
+    logging.basicConfig(level=log_level, format=LOG_FORMAT)
+
+    if bool(args.playlist) == bool(args.processor_name):
+        logger.error("Must provide one of --playlist or --processor")
+        sys.exit(1)
+
+    procs = all_processors()
+    if args.processor_name:
+        processor = procs.get(args.processor_name)
+        if not processor:
+            logger.error("Processor not found: {}".format(args.processor_name))
+            logger.error("Choices: {}".format(", ".join(sorted(procs.keys()))))
+            sys.exit(1)
+        playlist = Playlist.from_single_processor(processor)
+    else:
+        playlist = Playlist.from_file(args.playlist, procs)
+
+    try:
+        bpm_changes = [parse_bpm_change(value) for value in args.bpm_changes]
+    except ValueError:
+        logger.error("Malformed --bpm_change; expected <seconds>:<bpm>")
+        sys.exit(1)
+
+    layout = None
+    if args.floor_config:
+        layout = Layout(config_dir=CONFIG_DIR, config_name=args.floor_config)
+    geometry = layout.geometry if layout else DEFAULT_GEOMETRY
+
+    weights_script = None
+    if args.feet:
+        num_frames = int(round(args.seconds * args.fps))
+        weights_script = benchmark.scripted_weights(
+            num_frames, fps=args.fps, num_feet=args.feet, seed=args.seed, geometry=geometry
+        )
+
+    start = time.time()
+    num_frames = offline.render_to_file(
+        playlist,
+        args.output,
+        args.seconds,
+        fps=args.fps,
+        bpm=args.bpm,
+        weights_script=weights_script,
+        bpm_changes=bpm_changes,
+        layout=layout,
+    )
+    elapsed = time.time() - start
+    logger.info(
+        "Rendered {:.1f}s of show in {:.1f}s ({:.1f}x real time)".format(
+            args.seconds, elapsed, args.seconds / max(elapsed, 1e-6)
+        )
+    )
+
+
+if __name__ == "__main__":
+    run()
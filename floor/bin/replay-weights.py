@@ -0,0 +1,90 @@
+#!/usr/bin/env python
+
+from __future__ import absolute_import, division, print_function, unicode_literals
+
+import argparse
+import json
+import logging
+import os
+import sys
+
+from floor.controller import Layout
+from floor.util.geometry import DEFAULT_GEOMETRY
+from floor.util.weight_decoder import replay
+from floor.util.weight_log import WeightLog, WeightLogError
+
+LOG_FORMAT = "%(levelname)s: %(message)s"
+CONFIG_DIR = os.path.join(os.path.dirname(os.path.realpath(__file__)), "..", "config")
+logger = logging.getLogger("replay-weights")
+
+
+def get_options():
+    parser = argparse.ArgumentParser(
+        description="Run a recorded weight log through a step filter, and count the steps "
+        "on each tile, eg to tune the filter's settings."
+    )
+
+    parser.add_argument("weights_log", type=str, help="The weight log to replay.")
+
+    parser.add_argument(
+        "--floor_config",
+        dest="floor_config",
+        default=None,
+        help="Use this floor configuration's size and step filter.",
+    )
+
+    parser.add_argument(
+        "--step_filter",
+        dest="step_filter",
+        default=None,
+        help="Step filter settings as JSON, eg '{\"smoothing\": 0.3}'; overrides the layout's.",
+    )
+
+    parser.add_argument(
+        "--floor_threshold",
+        dest="floor_threshold",
+        default=200,
+        type=int,
+        help="The floor threshold the show ran with.",
+    )
+
+    return parser.parse_args()
+
+
+def run():
+    args = get_options()
+    logging.basicConfig(level=logging.INFO, format=LOG_FORMAT)
+
+    geometry = DEFAULT_GEOMETRY
+    tile_order = geometry.chain_order()
+    step_filter = {}
+    if args.floor_config:
+        layout = Layout(config_dir=CONFIG_DIR, config_name=args.floor_config)
+        geometry = layout.geometry
+        tile_order = layout.tile_order()
+        step_filter = layout.step_filter
+    if args.step_filter:
+        step_filter = json.loads(args.step_filter)
+
+    try:
+        log = WeightLog(args.weights_log)
+    except (IOError, WeightLogError) as e:
+        logger.error("Can't read weight log: {}".format(e))
+        sys.exit(1)
+
+    weights, steps = replay(
+        log,
+        tile_order,
+        step_filter=step_filter,
+        threshold=args.floor_threshold,
+    )
+    logger.info(
+        "Replayed {} frames ({:.1f}s): {} steps".format(len(log), log.duration(), steps.sum())
+    )
+    print("Steps per tile:")
+    for row in steps.reshape((geometry.rows, geometry.cols)).tolist():
+        print(" ".join("{:>5}".format(count) for count in row))
+
+
+if __name__ == "__main__":
+    run()
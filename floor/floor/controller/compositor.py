@@ -0,0 +1,91 @@
+from __future__ import absolute_import, division, print_function, unicode_literals
+
+from builtins import object, range
+
+import numpy as np
+
+from floor.processor.constants import COLOR_MAXIMUM
+from floor.util.frame_buffer import DEFAULT_NUM_PIXELS, FrameBuffer
+
+
+class Compositor(object):
+    """Blends a stack of layer frames into a single output frame.
+
+    The result is the same as folding `floor.util.color_utils.alpha_blend` over
+    every pixel of every layer, bottom-most layer first: colors are clamped to
+    `[0, COLOR_MAXIMUM]` and truncated, black pixels are fully transparent, and
+    each pixel's alpha is multiplied by its layer's alpha. Brightness is applied
+    to the final result.
+
+    Clamping, masking and alpha weighting happen for all layers at once on a
+    `(num_layers, num_pixels, 3)` stack; only the final fold walks the layers,
+    with a fixed number of whole-frame operations per layer.
+    """
+
+    # Compositing is done in double precision so that results match the
+    # per-pixel Python implementation exactly.
+    WORK_DTYPE = np.float64
+
+    def __init__(self, num_pixels=DEFAULT_NUM_PIXELS):
+        self.num_pixels = num_pixels
+        self.output = FrameBuffer(num_pixels)
+        self._result = np.zeros((num_pixels, 3), dtype=self.WORK_DTYPE)
+        self._colors = None
+        self._alphas = None
+        self._visible = None
+        self._resize(3)
+
+    def _resize(self, num_layers):
+        """Reallocate the layer stack; only happens when more layers show up."""
+        self._colors = np.zeros((num_layers, self.num_pixels, 3), dtype=self.WORK_DTYPE)
+        self._alphas = np.zeros((num_layers, self.num_pixels, 1), dtype=self.WORK_DTYPE)
+        self._visible = np.zeros((num_layers, self.num_pixels), dtype=bool)
+
+    def composite(self, frames, alphas, brightness=1.0):
+        """Composites `frames` and returns the result.
+
+        Arguments:
+            frames {list} -- `FrameBuffer`s to blend, bottom-most first.
+            alphas {list} -- The layer alpha for each frame, on `[0.0, 1.0]`.
+
+        Keyword Arguments:
+            brightness {float} -- Global brightness, on `[0.0, 1.0]` (default: {1.0})
+
+        Returns:
+            FrameBuffer -- The composited frame. This buffer is owned by the
+            compositor, and is overwritten on the next call.
+        """
+        num_layers = len(frames)
+        if num_layers > len(self._colors):
+            self._resize(num_layers)
+
+        colors = self._colors[:num_layers]
+        layer_alphas = self._alphas[:num_layers]
+        visible = self._visible[:num_layers]
+        for i in range(num_layers):
+            colors[i] = frames[i].rgb
+            layer_alphas[i, :, 0] = frames[i].alpha
+
+        # Normalize every pixel of every layer in one pass.
+        np.clip(colors, 0, COLOR_MAXIMUM, out=colors)
+        np.trunc(colors, out=colors)
+
+        # Effective alpha: pixel alpha times layer alpha, zero for black pixels.
+        layer_alphas *= np.asarray(alphas, dtype=self.WORK_DTYPE).reshape((-1, 1, 1))
+        np.any(colors, axis=2, out=visible)
+        layer_alphas[~visible] = 0.0
+
+        # Pre-multiply, leaving `layer_alphas` holding each layer's
+        # contribution and the amount of the layers below that shows through.
+        colors *= layer_alphas
+        np.subtract(1.0, layer_alphas, out=layer_alphas)
+
+        result = self._result
+        result.fill(0.0)
+        for i in range(num_layers):
+            result *= layer_alphas[i]
+            result += colors[i]
+            np.trunc(result, out=result)
+
+        np.multiply(result, brightness, out=self.output.rgb, casting="unsafe")
+        return self.output
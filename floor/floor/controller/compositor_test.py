@@ -0,0 +1,58 @@
+from __future__ import absolute_import, division, print_function, unicode_literals
+
+import random
+from builtins import range
+from unittest import TestCase
+
+from floor.controller.compositor import Compositor
+from floor.processor.constants import COLOR_MAXIMUM
+from floor.util.color_utils import alpha_blend, normalize_pixel, set_brightness
+from floor.util.frame_buffer import FrameBuffer
+
+
+def reference_composite(layers, brightness):
+    """The per-pixel implementation the compositor replaces."""
+    composited = [(0, 0, 0)] * 64
+    for pixels, layer_alpha in layers:
+        for idx, pixel in enumerate(pixels):
+            composited[idx] = alpha_blend(normalize_pixel(pixel), composited[idx], layer_alpha)
+    return [set_brightness(pixel, brightness)[:3] for pixel in composited]
+
+
+class CompositorTest(TestCase):
+    def random_pixel(self):
+        choice = random.random()
+        if choice < 0.2:
+            return (0, 0, 0)
+        elif choice < 0.3:
+            # Out of range values get clamped.
+            return (-10.5, COLOR_MAXIMUM + 100, random.uniform(0, COLOR_MAXIMUM))
+        color = tuple(random.uniform(0, COLOR_MAXIMUM) for _ in range(3))
+        if choice < 0.6:
+            return color + (random.random(),)
+        return color
+
+    def test_matches_per_pixel_blending(self):
+        random.seed(1979)
+        compositor = Compositor()
+        for num_layers in (1, 3, 6):
+            for _ in range(20):
+                layers = []
+                for _ in range(num_layers):
+                    pixels = [self.random_pixel() for _ in range(64)]
+                    layer_alpha = random.choice((0.0, 0.25, 0.5, 1.0, random.random()))
+                    layers.append((pixels, layer_alpha))
+                brightness = random.choice((1.0, 0.5, random.random()))
+
+                frames = [FrameBuffer.from_pixels(pixels) for pixels, _ in layers]
+                alphas = [layer_alpha for _, layer_alpha in layers]
+                result = compositor.composite(frames, alphas, brightness)
+
+                expected = reference_composite(layers, brightness)
+                for actual_pixel, expected_pixel in zip(result.to_pixels(), expected):
+                    for actual, wanted in zip(actual_pixel, expected_pixel):
+                        self.assertAlmostEqual(wanted, actual, places=3)
+
+    def test_no_layers(self):
+        result = Compositor().composite([], [])
+        self.assertEqual([(0, 0, 0)] * 64, result.to_pixels())
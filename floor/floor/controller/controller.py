@@ -1,16 +1,23 @@
 from __future__ import absolute_import, division, print_function, unicode_literals
 
 import logging
+import re
 import time
 from builtins import object, range
 from collections import OrderedDict
 
+import numpy as np
+
 from floor import processor
+from floor.controller.compositor import Compositor
 from floor.controller.playlist import PlaylistManager
+from floor.controller.render_worker import WorkerRenderLayer
 from floor.controller.rendering import PlaylistRenderLayer, ProcessorRenderLayer
+from floor.controller.scheduler import FrameScheduler
 from floor.processor.base import RenderContext
-from floor.util.color_utils import alpha_blend, normalize_pixel, set_brightness
-from floor.util.simple_profile import profile
+from floor.util.geometry import DEFAULT_GEOMETRY
+from floor.util.instrumentation import Metrics, enabled_from_environment
+from floor.util.weight_events import WeightTracker
 
 logger = logging.getLogger("controller")
 
@@ -18,8 +25,23 @@ logger = logging.getLogger("controller")
 class Controller(object):
     DEFAULT_FPS = 120
     DEFAULT_BPM = 120.0
-
-    def __init__(self, drivers, playlist_manager, clocksource=time):
+    DEFAULT_NUM_OVERLAYS = 2
+
+    # Input events are named `<layer name>_<input type>`, eg `overlay1_switch`.
+    INPUT_EVENT_RE = re.compile(r"^(?P<layer_name>\w+?)_(?P<input_type>ranged_value|switch)$")
+
+    def __init__(
+        self,
+        drivers,
+        playlist_manager,
+        clocksource=time,
+        num_overlays=DEFAULT_NUM_OVERLAYS,
+        metrics=None,
+        frame_policy=FrameScheduler.DEFAULT_POLICY,
+        processor_pool=None,
+        render_workers=(),
+        layout=None,
+    ):
         """Constructor.
 
         Arguments:
@@ -29,6 +51,18 @@ class Controller(object):
         Keyword Arguments:
             clocksource {function} -- An object that should have `.time()`
             and `.sleep()` methods (default: {time})
+            num_overlays {int} -- Number of overlay layers to stack on top of the
+            playlist, named `overlayN` (bottom-most) through `overlay1` (top-most).
+            metrics {floor.util.instrumentation.Metrics} -- Where to record per-stage
+            frame timings. By default, collection is enabled by the `PROFILE`
+            environment variable, and can be toggled at runtime.
+            frame_policy {str} -- What to do when frames run late; see `FrameScheduler`.
+            processor_pool {floor.controller.processor_pool.ProcessorPool} -- Builds and
+            keeps processors for the playlist.
+            render_workers {list} -- Names of layers to render in worker processes,
+            eg `["playlist", "overlay1"]`; see `floor.controller.render_worker`.
+            layout {floor.controller.Layout} -- The floor's layout, which gives its size.
+            A single 8x8 pod if not given.
         """
         assert len(drivers) > 0, "Must provide 1 or more drivers"
         self.drivers = drivers
@@ -37,45 +71,78 @@ class Controller(object):
         ), "playlist_manager is not a PlaylistManager"
         self.playlist_manager = playlist_manager
         self.clocksource = clocksource
+        self.geometry = layout.geometry if layout else DEFAULT_GEOMETRY
         self.frame_start = 0
         self.fps = None
         self.frame_seconds = None
+        self.metrics = metrics or Metrics(enabled=enabled_from_environment())
+        self.scheduler = FrameScheduler(
+            1.0 / self.DEFAULT_FPS,
+            clocksource=clocksource,
+            policy=frame_policy,
+            metrics=self.metrics,
+        )
 
         self.all_processors = processor.all_processors()
 
+        # Ordered dict of layers to render, bottom-most layer first.
+        self.layers = OrderedDict()
+        # Metrics stage name for each layer's render.
+        self.render_stages = {}
+
         self.set_fps(self.DEFAULT_FPS)
 
-        # Ordered dict of layers to render, bottom-most layer first.
-        self.layers = OrderedDict(
-            (
-                (
-                    "playlist",
-                    PlaylistRenderLayer(
-                        playlist_manager=self.playlist_manager, all_processors=self.all_processors
-                    ),
-                ),
-                ("overlay2", ProcessorRenderLayer()),
-                ("overlay1", ProcessorRenderLayer()),
-            )
+        def processor_layer_cls(name):
+            return WorkerRenderLayer if name in render_workers else ProcessorRenderLayer
+
+        self.add_layer(
+            "playlist",
+            PlaylistRenderLayer(
+                playlist_manager=self.playlist_manager,
+                all_processors=self.all_processors,
+                processor_pool=processor_pool,
+                processor_layer_cls=processor_layer_cls("playlist"),
+            ),
         )
+        for num in range(num_overlays, 0, -1):
+            name = "overlay{}".format(num)
+            self.add_layer(name, processor_layer_cls(name)())
 
         self.bpm = None
         self.downbeat = None
         self.set_bpm(self.DEFAULT_BPM)
 
         # Give outside controllers a chance to fake foot steps on the floor
-        self.synthetic_weights = [0] * 64
+        self.synthetic_weights = np.zeros(self.geometry.num_pixels, dtype=int)
+        self.weight_tracker = WeightTracker(self.geometry.num_pixels)
+        # Scratch rows for merging drivers' weights and pressures; see `_merge_driver_values`.
+        self._merge_rows = {}
 
         # A global "brightness" level, a value between 0.0 and 1.0.
         self.brightness = 1.0
 
+        self.compositor = Compositor(self.geometry.num_pixels)
+        # What went into the last composited frame; see `generate_frame`.
+        self.last_frame_state = None
+
+    def add_layer(self, name, layer):
+        """Adds a render layer on top of all existing layers."""
+        if name in self.layers:
+            raise ValueError('Layer "{}" already exists'.format(name))
+        self.layers[name] = layer
+        self.render_stages[name] = "render.{}".format(name)
+        layer.set_frame_seconds(self.frame_seconds)
+
     def _iter_enabled_layers(self):
-        """Returns an iterable of all enabled layers."""
-        return [layer for layer in list(self.layers.values()) if layer.is_enabled()]
+        """Returns an iterable of `(name, layer)` for all enabled layers."""
+        return [(name, layer) for name, layer in list(self.layers.items()) if layer.is_enabled()]
 
     def set_fps(self, fps):
         self.fps = fps
         self.frame_seconds = 1.0 / fps
+        self.scheduler.set_frame_seconds(self.frame_seconds)
+        for layer in self.layers.values():
+            layer.set_frame_seconds(self.frame_seconds)
 
     def set_bpm(self, bpm, downbeat=None):
         logger.info("Setting bpm to: {}".format(bpm))
@@ -93,29 +160,23 @@ class Controller(object):
 
     def handle_input_event(self, event_name, num, value):
         logger.debug("input event: {}: {} -> {}".format(event_name, num, value))
-        if event_name == "playlist_ranged_value":
-            self.layers["playlist"].on_ranged_value_change(num, value)
-        elif event_name == "overlay1_ranged_value":
-            self.layers["overlay1"].on_ranged_value_change(num, value)
-        elif event_name == "overlay2_ranged_value":
-            self.layers["overlay2"].on_ranged_value_change(num, value)
-        elif event_name == "playlist_switch":
-            self.layers["playlist"].on_switch_change(num, value)
-        elif event_name == "overlay1_switch":
-            self.layers["overlay1"].on_switch_change(num, value)
-        elif event_name == "overlay2_switch":
-            self.layers["overlay2"].on_switch_change(num, value)
-        else:
+        match = self.INPUT_EVENT_RE.match(event_name)
+        layer = self.layers.get(match.group("layer_name")) if match else None
+        if not layer:
             logger.warning("Ignoring unknown event {}".format(event_name))
+        elif match.group("input_type") == "ranged_value":
+            layer.on_ranged_value_change(num, value)
+        else:
+            layer.on_switch_change(num, value)
 
     def square_weight_on(self, index):
-        if index > 64 or index < 1:
+        if index > self.geometry.num_pixels or index < 1:
             logger.error("Ignoring square_weight_on() value beyond bounds")
             return
         self.synthetic_weights[index - 1] = 1
 
     def square_weight_off(self, index):
-        if index > 64 or index < 1:
+        if index > self.geometry.num_pixels or index < 1:
             logger.error("Ignoring square_weight_on() value beyond bounds")
             return
         self.synthetic_weights[index - 1] = 0
@@ -124,66 +185,129 @@ class Controller(object):
         while True:
             self.run_one_frame()
 
-    @profile(print_seconds=2)
     def run_one_frame(self):
-        self.init_loop()
-        self.generate_frame()
-        self.transfer_data()
-        self.delay()
+        with self.metrics.time("frame"):
+            self.init_loop()
+            if self.scheduler.start_frame():
+                self.generate_frame()
+            with self.metrics.time("transfer_data"):
+                self.transfer_data()
+        with self.metrics.time("delay"):
+            self.delay()
 
-    @profile()
     def init_loop(self):
         self.frame_start = self.clocksource.time()
 
-    @profile()
     def generate_frame(self):
-        weights = self.get_weights()
-        composited_leds = [(0, 0, 0)] * 64
-        for layer in self._iter_enabled_layers():
-            context = RenderContext(
+        metrics = self.metrics
+        with metrics.time("get_weights"):
+            tracker = self.weight_tracker
+            weight_events = tracker.update(self.merge_weights(), self.frame_start)
+            weights = tracker.weight_list
+            pressures = self.get_pressures()
+        layers = self._iter_enabled_layers()
+        contexts = [
+            RenderContext(
                 clock=self.frame_start,
                 downbeat=self.downbeat,
                 weights=weights,
+                weight_array=tracker.weights,
+                weight_events=weight_events,
+                weight_history=tracker.history,
                 bpm=self.bpm,
                 ranged_values=layer.ranged_values,
                 switches=layer.switches,
+                pressures=pressures,
+                geometry=self.geometry,
             )
-            current_leds = layer.render(context)
-            if not current_leds:
+            for name, layer in layers
+        ]
+        # Get any layers rendering in worker processes started.
+        for (name, layer), context in zip(layers, contexts):
+            layer.prepare(context)
+
+        frames = []
+        alphas = []
+        layer_state = []
+        changed = False
+        for (name, layer), context in zip(layers, contexts):
+            with metrics.time(self.render_stages[name]):
+                current_frame = layer.render(context)
+            changed = changed or layer.changed
+            if not current_frame:
                 continue
-            for idx, current_pixel in enumerate(current_leds):
-                current_pixel = normalize_pixel(current_pixel)
-                last_pixel = composited_leds[idx]
-                composited_leds[idx] = alpha_blend(current_pixel, last_pixel, layer.get_alpha())
+            frames.append(current_frame)
+            alphas.append(layer.get_alpha())
+            layer_state.append((name, alphas[-1]))
+
+        # Most processors are `clocked` well below the frame rate, so often every
+        # layer returned the same frame as last time. If nothing else changed
+        # either, the drivers already have this frame.
+        frame_state = (layer_state, self.brightness, tracker.version)
+        if not changed and frame_state == self.last_frame_state:
+            metrics.increment("unchanged_frames")
+            return
+        self.last_frame_state = frame_state
 
-        leds = [set_brightness(pixel, self.brightness) for pixel in composited_leds]
+        with metrics.time("composite"):
+            leds = self.compositor.composite(frames, alphas, self.brightness)
         for driver in self.drivers:
-            driver.set_leds(leds)
+            # Sharded drivers only get their own part of the floor.
+            shard = getattr(driver, "shard", None)
+            driver.set_leds(shard.slice(leds) if shard else leds)
 
-    @profile()
     def get_weights(self):
         # Returns a single frame of weights, by taking the `max()` of
         # every driver's reported weight for every pixel.
-        all_weights = [driver.get_weights() for driver in self.drivers]
-        all_weights.append(self.synthetic_weights)
+        return self.merge_weights().tolist()
 
-        weights = [0] * 64
-        for i in range(len(weights)):
-            max_weight = max(w[i] if len(w) > i else 0 for w in all_weights)
-            weights[i] = max_weight
+    def merge_weights(self):
+        """Like `get_weights`, but returns a numpy array."""
+        # Weights are 0 or 1, whatever type drivers report them as.
+        weights = np.zeros(self.geometry.num_pixels, dtype=int)
+        self._merge_driver_values([driver.get_weights() for driver in self.drivers], weights)
         return weights
 
-    @profile()
+    def get_pressures(self):
+        # Like `get_weights`, returns the `max()` of every driver's reported
+        # pressure for every pixel.
+        pressures = np.zeros(self.geometry.num_pixels, dtype=np.float32)
+        self._merge_driver_values([driver.get_pressures() for driver in self.drivers], pressures)
+        return pressures
+
+    def _merge_driver_values(self, all_values, out):
+        """Takes the `max()` of each driver's values, and the synthetic weights, into
+        `out`, stitching sharded drivers' values into place.
+        """
+        unsharded = []
+        for driver, values in zip(self.drivers, all_values):
+            shard = getattr(driver, "shard", None)
+            if shard:
+                shard.stitch(values, out)
+            else:
+                unsharded.append(values)
+
+        # One row per unsharded driver, under the stitched values and synthetic weights,
+        # reduced with a single max.
+        key = (len(unsharded), out.dtype)
+        rows = self._merge_rows.get(key)
+        if rows is None or rows.shape[1] != len(out):
+            rows = self._merge_rows[key] = np.zeros((len(unsharded) + 2, len(out)), out.dtype)
+        rows[0] = out
+        rows[1] = self.synthetic_weights
+        for row, values in zip(rows[2:], unsharded):
+            num_values = min(len(values), len(out))
+            row[:num_values] = values[:num_values]
+            row[num_values:] = 0
+        np.maximum.reduce(rows, axis=0, out=out)
+
     def transfer_data(self):
         for driver in self.drivers:
-            driver.send_data()
+            if driver.needs_send(self.frame_start):
+                driver.send_data()
+                driver.mark_sent(self.frame_start)
             driver.read_data()
 
-    @profile()
     def delay(self):
-        elapsed = self.clocksource.time() - self.frame_start
-
-        if elapsed < self.frame_seconds:
-            self.clocksource.sleep(self.frame_seconds - elapsed)
-        else:
-            logger.debug("Over by {}".format(elapsed - self.frame_seconds))
+        self.scheduler.wait()
+        self.metrics.increment("frames")
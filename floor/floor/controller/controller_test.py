@@ -6,12 +6,24 @@ from unittest import TestCase
 from mock import Mock
 
 from floor.controller.controller import Controller
+from floor.controller.layout import Layout
 from floor.controller.playlist import Playlist, PlaylistManager
+from floor.controller.render_worker import WorkerRenderLayer
+from floor.controller.rendering import ProcessorRenderLayer
+from floor.controller.scheduler import FrameScheduler
+from floor.driver.base import Base as BaseDriver
 from floor.processor import all_processors
 from floor.processor.base import Base as BaseProcessor
+from floor.processor.utils import clocked
+from floor.util.fake_clock import FakeClock
+from floor.util.frame_buffer import FrameBuffer
+from floor.util.geometry import Geometry
+from floor.util.instrumentation import Metrics
+from floor.util.weight_events import StepEvent
 
 BASE_DIR = os.path.dirname(os.path.realpath(__file__))
-DEFAULT_PLAYLIST = BASE_DIR + "/../../config/playlists/default.json"
+CONFIG_DIR = BASE_DIR + "/../../config"
+DEFAULT_PLAYLIST = CONFIG_DIR + "/playlists/default.json"
 
 
 RED = (0xFF, 0x00, 0x00)
@@ -31,11 +43,69 @@ class SingleColorProcessor(BaseProcessor):
         return [self.color] * 64
 
 
+class HalfTransparentRedProcessor(BaseProcessor):
+    """A test processor that returns a `FrameBuffer` directly."""
+
+    def get_next_frame(self, context):
+        frame = FrameBuffer()
+        frame.fill(RED)
+        frame.alpha[:32] = 0.5
+        return frame
+
+
+class SlowColorProcessor(SingleColorProcessor):
+    """A test processor that only generates 10 frames per second."""
+
+    @clocked(frames_per_second=10)
+    def get_next_frame(self, context):
+        return [self.color] * 64
+
+
+class PodCornerProcessor(BaseProcessor):
+    """A test processor that only knows about single pods, lighting their top left."""
+
+    def get_next_frame(self, context):
+        return [RED] + [BLACK] * 63
+
+
+class FloorCornerProcessor(BaseProcessor):
+    """A test processor that lights the bottom right of any size of floor."""
+
+    def get_next_frame(self, context):
+        frame = [BLACK] * context.geometry.num_pixels
+        frame[-1] = GREEN
+        return frame
+
+
+class StepRecordingProcessor(BaseProcessor):
+    """A test processor that records the step events it sees."""
+
+    def __init__(self, **kwargs):
+        super(StepRecordingProcessor, self).__init__(**kwargs)
+        self.events = []
+
+    def get_next_frame(self, context):
+        self.events.extend(context.weight_events)
+        return None
+
+
+class RecordingDriver(BaseDriver):
+    """A driver that counts sends."""
+
+    def __init__(self, args=None):
+        super(RecordingDriver, self).__init__(args or {})
+        self.sends = 0
+
+    def send_data(self):
+        self.sends += 1
+
+
 class ControllerTest(TestCase):
     @staticmethod
     def new_fake_driver():
-        driver = Mock()
+        driver = Mock(shard=None)
         driver.get_weights = Mock(return_value=[0] * 64)
+        driver.get_pressures = Mock(return_value=[0.0] * 64)
         return driver
 
     def setUp(self):
@@ -73,25 +143,141 @@ class ControllerTest(TestCase):
         controller = Controller([driver], playlist_manager)
 
         controller.run_one_frame()
-        self.assertEqual([BLUE + (1.0,)] * 64, driver.set_leds.call_args[0][0])
+        self.assertEqual([BLUE] * 64, driver.set_leds.call_args[0][0].to_pixels())
 
         overlay2 = controller.layers["overlay2"]
         overlay2.set_processor(red_processor)
         overlay2.set_alpha(0.5)
         controller.run_one_frame()
-        self.assertEqual([(0x7F, 0x00, 0x7F)] * 64, driver.set_leds.call_args[0][0])
+        self.assertEqual([(0x7F, 0x00, 0x7F)] * 64, driver.set_leds.call_args[0][0].to_pixels())
 
         overlay1 = controller.layers["overlay1"]
         overlay1.set_processor(green_processor)
         overlay1.set_alpha(0.5)
         controller.run_one_frame()
-        self.assertEqual([(0x3F, 0x7F, 0x3F)] * 64, driver.set_leds.call_args[0][0])
+        self.assertEqual([(0x3F, 0x7F, 0x3F)] * 64, driver.set_leds.call_args[0][0].to_pixels())
+
+    def test_render_workers(self):
+        playlist = Playlist.from_single_processor(SingleColorProcessor, args={"color": BLUE})
+        driver = self.new_fake_driver()
+        controller = Controller(
+            [driver],
+            PlaylistManager(playlist),
+            clocksource=FakeClock(),
+            render_workers=["playlist", "overlay1"],
+        )
+        # Plenty of time for the workers to start.
+        controller.set_fps(0.1)
+        overlay1 = controller.layers["overlay1"]
+        self.assertIsInstance(overlay1, WorkerRenderLayer)
+        self.assertIsInstance(
+            controller.layers["playlist"].processor_render_layer, WorkerRenderLayer
+        )
+        self.assertNotIsInstance(controller.layers["overlay2"], WorkerRenderLayer)
+
+        try:
+            overlay1.set_processor(SingleColorProcessor(color=GREEN))
+            overlay1.set_alpha(0.5)
+            controller.run_one_frame()
+            self.assertEqual([(0x00, 0x7F, 0x7F)] * 64, driver.set_leds.call_args[0][0].to_pixels())
+        finally:
+            overlay1.close()
+            controller.layers["playlist"].processor_render_layer.close()
+
+    def test_layout_geometry(self):
+        layout = Mock(geometry=Geometry(rows=8, cols=16))
+        playlist = Playlist.from_single_processor(PodCornerProcessor)
+        driver = self.new_fake_driver()
+        driver.get_weights = Mock(return_value=[0] * 127 + [1])
+        controller = Controller([driver], PlaylistManager(playlist), layout=layout)
+
+        controller.run_one_frame()
+        leds = driver.set_leds.call_args[0][0].to_pixels()
+        self.assertEqual(128, len(leds))
+        # Single pod frames are repeated across the floor.
+        self.assertEqual([RED, BLACK, RED], [leds[0], leds[1], leds[8]])
+        self.assertEqual(BLACK, leds[16])
+
+        controller.square_weight_on(128)
+        self.assertEqual(128, len(controller.get_weights()))
+        self.assertEqual(1, controller.get_weights()[127])
+
+        controller.layers["overlay1"].set_processor(FloorCornerProcessor())
+        controller.run_one_frame()
+        leds = driver.set_leds.call_args[0][0].to_pixels()
+        self.assertEqual(GREEN, leds[127])
+
+    def test_sharded_drivers(self):
+        layout = Layout(config_dir=CONFIG_DIR, config_name="side-by-side-layout")
+        drivers = []
+        for shard in ("left", "right", None):
+            driver = RecordingDriver({"config_dir": CONFIG_DIR, "shard": shard})
+            driver.init_layout(layout)
+            drivers.append(driver)
+        left, right, whole = drivers
+        self.assertEqual(64, len(left.leds))
+        self.assertEqual(128, len(whole.leds))
+
+        playlist = Playlist.from_single_processor(FloorCornerProcessor)
+        controller = Controller(drivers, PlaylistManager(playlist), layout=layout)
+        controller.run_one_frame()
+        self.assertEqual(GREEN, whole.leds[127])
+        self.assertEqual(GREEN, right.leds[63])
+        self.assertEqual(BLACK, left.leds[63])
+
+        # Each shard's weights are stitched back into place.
+        left.weights = [0] * 64
+        left.weights[8] = 1
+        right.weights = [0] * 64
+        right.weights[8] = 1
+        weights = controller.get_weights()
+        self.assertEqual(128, len(weights))
+        self.assertEqual([16, 24], [i for i, weight in enumerate(weights) if weight])
+
+    def test_weight_events(self):
+        playlist = Playlist.from_single_processor(StepRecordingProcessor)
+        driver = self.new_fake_driver()
+        clock = FakeClock()
+        controller = Controller([driver], PlaylistManager(playlist), clocksource=clock)
+        controller.run_one_frame()
+        processor = controller.layers["playlist"].current_processor
+        self.assertEqual([], processor.events)
+
+        clock.advance(1)
+        controller.square_weight_on(3)
+        controller.run_one_frame()
+        self.assertEqual([StepEvent(2, True, clock.time())], processor.events)
+        self.assertEqual(1, controller.weight_tracker.weight_list[2])
+
+        clock.advance(1)
+        controller.square_weight_off(3)
+        controller.run_one_frame()
+        self.assertEqual(StepEvent(2, False, clock.time()), processor.events[-1])
+
+    def test_brightness(self):
+        playlist = Playlist.from_single_processor(SingleColorProcessor, args={"color": BLUE})
+        driver = self.new_fake_driver()
+        controller = Controller([driver], PlaylistManager(playlist))
+
+        controller.set_brightness(0.5)
+        controller.run_one_frame()
+        self.assertEqual([(0, 0, 127.5)] * 64, driver.set_leds.call_args[0][0].to_pixels())
+
+    def test_processor_may_return_frame_buffer(self):
+        playlist = Playlist.from_single_processor(SingleColorProcessor, args={"color": BLUE})
+        driver = self.new_fake_driver()
+        controller = Controller([driver], PlaylistManager(playlist))
+        controller.layers["overlay1"].set_processor(HalfTransparentRedProcessor())
+
+        controller.run_one_frame()
+        expected = [(0x7F, 0x00, 0x7F)] * 32 + [RED] * 32
+        self.assertEqual(expected, driver.set_leds.call_args[0][0].to_pixels())
 
     def test_multiple_drivers_get_weights_are_blended(self):
-        driver1 = Mock()
+        driver1 = Mock(shard=None)
         driver1.get_weights = Mock(return_value=[0, 1, 0, 0] * 16)
 
-        driver2 = Mock()
+        driver2 = Mock(shard=None)
         driver2.get_weights = Mock(return_value=[0, 0, 0, 1] * 16)
 
         playlist = Playlist.from_file(DEFAULT_PLAYLIST, all_processors())
@@ -111,3 +297,176 @@ class ControllerTest(TestCase):
         expected_weights[0] = 0
         weights = controller.get_weights()
         self.assertEqual(expected_weights, weights)
+
+    def test_multiple_drivers_get_pressures_are_blended(self):
+        driver1 = self.new_fake_driver()
+        driver1.get_pressures = Mock(return_value=[0.0, 0.5, 0.25, 0.0] * 16)
+
+        driver2 = self.new_fake_driver()
+        driver2.get_pressures = Mock(return_value=[0.0, 0.25, 0.5, 0.0] * 16)
+
+        controller = Controller([driver1, driver2], self.playlist_manager)
+        controller.square_weight_on(1)
+        self.assertEqual(
+            [1.0, 0.5, 0.5, 0.0] + [0.0, 0.5, 0.5, 0.0] * 15, controller.get_pressures().tolist()
+        )
+
+    def test_extra_overlays(self):
+        playlist = Playlist.from_single_processor(SingleColorProcessor, args={"color": BLUE})
+        driver = self.new_fake_driver()
+        controller = Controller([driver], PlaylistManager(playlist), num_overlays=4)
+        self.assertEqual(
+            ["playlist", "overlay4", "overlay3", "overlay2", "overlay1"], list(controller.layers)
+        )
+
+        overlay4 = controller.layers["overlay4"]
+        overlay4.set_processor(SingleColorProcessor(color=RED))
+        overlay4.set_alpha(0.5)
+        controller.run_one_frame()
+        self.assertEqual([(0x7F, 0x00, 0x7F)] * 64, driver.set_leds.call_args[0][0].to_pixels())
+
+        with self.assertRaises(ValueError):
+            controller.add_layer("overlay4", ProcessorRenderLayer())
+
+    def test_handle_input_event(self):
+        c = self.controller
+        c.add_layer("overlay3", ProcessorRenderLayer())
+        c.handle_input_event("overlay3_ranged_value", 1, 64)
+        c.handle_input_event("overlay3_switch", 2, True)
+        c.handle_input_event("playlist_ranged_value", 0, 10)
+        c.handle_input_event("bogus_switch", 2, True)
+        self.assertEqual([0, 64, 0, 0], c.layers["overlay3"].ranged_values)
+        self.assertEqual([False, False, True, False], c.layers["overlay3"].switches)
+        self.assertEqual(10, c.layers["playlist"].processor_render_layer.ranged_values[0])
+
+    def test_metrics(self):
+        playlist = Playlist.from_single_processor(SingleColorProcessor, args={"color": BLUE})
+        clock = FakeClock()
+        controller = Controller(
+            [self.new_fake_driver()],
+            PlaylistManager(playlist),
+            clocksource=clock,
+            metrics=Metrics(enabled=True),
+        )
+        controller.layers["overlay1"].set_processor(SingleColorProcessor(color=RED))
+        controller.run_one_frame()
+
+        # Slow drivers make the next frame late.
+        driver = controller.drivers[0]
+        driver.send_data.side_effect = lambda: clock.advance(1.0)
+        controller.run_one_frame()
+
+        result = controller.metrics.to_object()
+        counters = result["counters"]
+        self.assertEqual(2, counters["frames"])
+        self.assertEqual(1, counters["overruns"])
+        histograms = result["histograms"]
+        for stage in (
+            "frame",
+            "get_weights",
+            "render.playlist",
+            "render.overlay1",
+            "composite",
+            "transfer_data",
+            "delay",
+        ):
+            self.assertEqual(2, histograms[stage]["count"], stage)
+        self.assertNotIn("render.overlay2", histograms)
+        self.assertEqual(1, histograms["overrun"]["count"])
+
+    def test_metrics_disabled(self):
+        controller = Controller([self.driver], self.playlist_manager, metrics=Metrics())
+        controller.run_one_frame()
+        self.assertEqual({}, dict(controller.metrics.histograms))
+
+    def test_skip_render_when_behind(self):
+        clock = FakeClock()
+        playlist = Playlist.from_single_processor(SingleColorProcessor, args={"color": BLUE})
+        controller = Controller(
+            [self.driver],
+            PlaylistManager(playlist),
+            clocksource=clock,
+            frame_policy=FrameScheduler.POLICY_SKIP_RENDER,
+        )
+        controller.run_one_frame()
+        self.assertEqual(1, self.driver.set_leds.call_count)
+
+        # A frame that takes 3.5 frame periods; the next two only send data.
+        self.driver.send_data.side_effect = lambda: clock.advance(controller.frame_seconds * 3.5)
+        controller.run_one_frame()
+        self.driver.send_data.side_effect = None
+        for _ in range(4):
+            controller.run_one_frame()
+
+        self.assertEqual(4, self.driver.set_leds.call_count)
+        self.assertEqual(6, self.driver.send_data.call_count)
+        self.assertEqual(2, controller.scheduler.skipped_renders)
+
+    def new_clocked_controller(self, driver, clock):
+        playlist = Playlist.from_single_processor(SlowColorProcessor, args={"color": BLUE})
+        return Controller(
+            [driver], PlaylistManager(playlist), clocksource=clock, metrics=Metrics(enabled=True)
+        )
+
+    def test_unchanged_frames_are_not_recomposited(self):
+        clock = FakeClock()
+        driver = self.new_fake_driver()
+        controller = self.new_clocked_controller(driver, clock)
+        for _ in range(120):
+            controller.run_one_frame()
+
+        num_frames = driver.set_leds.call_count
+        self.assertTrue(9 <= num_frames <= 10, num_frames)
+        self.assertEqual(120 - num_frames, controller.metrics.counters["unchanged_frames"])
+        self.assertEqual([BLUE] * 64, driver.set_leds.call_args[0][0].to_pixels())
+
+    def test_brightness_and_weights_mark_frames_changed(self):
+        clock = FakeClock()
+        driver = self.new_fake_driver()
+        controller = self.new_clocked_controller(driver, clock)
+        controller.run_one_frame()
+        controller.run_one_frame()
+        self.assertEqual(1, driver.set_leds.call_count)
+
+        controller.set_brightness(0.5)
+        controller.run_one_frame()
+        self.assertEqual(2, driver.set_leds.call_count)
+
+        controller.square_weight_on(3)
+        controller.run_one_frame()
+        self.assertEqual(3, driver.set_leds.call_count)
+
+        controller.layers["playlist"].set_alpha(0.5)
+        controller.run_one_frame()
+        self.assertEqual(4, driver.set_leds.call_count)
+
+        controller.run_one_frame()
+        self.assertEqual(4, driver.set_leds.call_count)
+
+    def test_drivers_skip_unchanged_sends(self):
+        clock = FakeClock()
+        driver = RecordingDriver({"keepalive_seconds": 0.25})
+        controller = self.new_clocked_controller(driver, clock)
+        for _ in range(120):
+            controller.run_one_frame()
+
+        # Only new frames are sent, with no gaps long enough for a keepalive.
+        new_frames = (
+            controller.metrics.counters["frames"] - controller.metrics.counters["unchanged_frames"]
+        )
+        self.assertEqual(new_frames, driver.sends)
+
+        # A blank frame, then keepalives.
+        sends = driver.sends
+        controller.layers["playlist"].set_alpha(0)
+        for _ in range(120):
+            controller.run_one_frame()
+        self.assertEqual(1 + 3, driver.sends - sends)
+
+    def test_drivers_send_every_frame_by_default(self):
+        clock = FakeClock()
+        driver = RecordingDriver()
+        controller = self.new_clocked_controller(driver, clock)
+        for _ in range(10):
+            controller.run_one_frame()
+        self.assertEqual(10, driver.sends)
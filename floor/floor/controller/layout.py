@@ -4,6 +4,11 @@ import os
 import re
 from builtins import object
 
+import numpy as np
+
+from floor.util.frame_buffer import FrameBuffer
+from floor.util.geometry import DEFAULT_COLS, DEFAULT_ROWS, Geometry
+
 
 class Layout(object):
     LAYOUT_MAPPING_DIR = "layouts"
@@ -15,6 +20,10 @@ class Layout(object):
         self.rows = None
         self.cols = None
         self.layout = None
+        self.geometry = None
+        self.shards = {}
+        self.pods = None
+        self.step_filter = {}
 
         if not config_name:
             config_name = self.DEFAULT_CONFIG_NAME
@@ -66,10 +75,112 @@ class Layout(object):
             # is a 1 that means the square is active.  If its 0 then the square has been bypassed
             # with a cable, so we need to skip writing that squares data so that things don't
             # get out of sync
-            self.squares = config.get("squares", 64)
-            self.rows = config.get("rows", 8)
-            self.cols = config.get("cols", 8)
+            self.rows = config.get("rows", DEFAULT_ROWS)
+            self.cols = config.get("cols", DEFAULT_COLS)
+            self.squares = config.get("squares", self.rows * self.cols)
             self.layout = config.get("layout", None)
+            self.geometry = Geometry(self.rows, self.cols)
+            # Where each pod is, in the order they're chained together, if not left to
+            # right, then top to bottom; see `tile_order`.
+            pods = config.get("pods")
+            self.pods = [tuple(pod) for pod in pods] if pods else None
+            # Settings for deciding when tiles are stepped on; see `floor.util.step_filter`.
+            self.step_filter = config.get("step_filter", {})
+
+            # A floor driven by several drivers (eg separate floors, or SPI buses) is split
+            # into named shards, each a rectangle of the whole floor.
+            self.shards = {}
+            for name, shard_config in config.get("shards", {}).items():
+                self.shards[name] = Shard.from_object(name, shard_config, self)
+
+    def get_shard(self, name):
+        if name not in self.shards:
+            raise ValueError('Layout "{}" has no shard "{}"'.format(self.name, name))
+        return self.shards[name]
 
     def is_bypassed(self, num):
         return self.layout[num] == 0
+
+    def tile_order(self):
+        """Returns the floor's pixel indices in the order its tiles are chained together."""
+        return self.geometry.chain_order(self.pods)
+
+
+class Shard(object):
+    """A rectangle of the floor that one driver looks after.
+
+    The driver sees its shard as a floor of its own, numbered from the shard's top
+    left, and the controller slices its frames out of, and stitches its weights back
+    into, the whole floor.
+    """
+
+    def __init__(self, name, x, y, rows, cols, floor_geometry, layout=None):
+        """Constructor.
+
+        Arguments:
+            name {str} -- The shard's name, which drivers are given to pick it.
+            x {int} -- Column of the shard's top left tile on the floor.
+            y {int} -- Row of the shard's top left tile on the floor.
+            rows {int} -- Height of the shard, in tiles.
+            cols {int} -- Width of the shard, in tiles.
+            floor_geometry {Geometry} -- The whole floor.
+
+        Keyword Arguments:
+            layout {list} -- The whole floor's bypassed tile map (see `Layout`).
+        """
+        if not (
+            floor_geometry.contains(x, y) and floor_geometry.contains(x + cols - 1, y + rows - 1)
+        ):
+            raise ValueError(
+                "Shard {} ({}x{} at {}, {}) does not fit on a {}x{} floor".format(
+                    name, cols, rows, x, y, floor_geometry.cols, floor_geometry.rows
+                )
+            )
+        self.name = name
+        self.x = x
+        self.y = y
+        self.geometry = Geometry(rows, cols)
+        # The floor's index of each of the shard's pixels.
+        self.indices = floor_geometry.index_grid[y : y + rows, x : x + cols].ravel()
+        self.layout = layout
+        self.frame = FrameBuffer(self.geometry.num_pixels)
+
+    @classmethod
+    def from_object(cls, name, obj, layout):
+        try:
+            return cls(
+                name,
+                obj.get("x", 0),
+                obj.get("y", 0),
+                obj["rows"],
+                obj["cols"],
+                layout.geometry,
+                layout=layout.layout,
+            )
+        except KeyError as e:
+            raise ValueError("Shard {} is missing {}".format(name, e))
+
+    def __repr__(self):
+        return "<Shard {} {}x{} at {}, {}>".format(
+            self.name, self.geometry.cols, self.geometry.rows, self.x, self.y
+        )
+
+    def is_bypassed(self, num):
+        return self.layout is not None and self.layout[self.indices[num]] == 0
+
+    def slice(self, frame):
+        """Returns the shard's part of a whole floor `FrameBuffer`.
+
+        The same `FrameBuffer` is refilled every call.
+        """
+        np.take(frame.rgb, self.indices, axis=0, out=self.frame.rgb)
+        np.take(frame.alpha, self.indices, out=self.frame.alpha)
+        return self.frame
+
+    def stitch(self, values, out):
+        """Merges a driver's per-tile `values` (eg weights) into the whole floor's
+        array `out`, keeping the largest of each.
+        """
+        num_values = min(len(values), len(self.indices))
+        indices = self.indices[:num_values]
+        out[indices] = np.maximum(out[indices], np.asarray(values[:num_values], dtype=out.dtype))
@@ -0,0 +1,60 @@
+from __future__ import absolute_import, division, print_function, unicode_literals
+
+import os
+from unittest import TestCase
+
+import numpy as np
+
+from floor.controller.layout import Layout, Shard
+from floor.util.frame_buffer import FrameBuffer
+from floor.util.geometry import Geometry
+
+BASE_DIR = os.path.dirname(os.path.realpath(__file__))
+CONFIG_DIR = os.path.join(BASE_DIR, "..", "..", "config")
+
+
+class LayoutTest(TestCase):
+    def test_default_layout(self):
+        layout = Layout(config_dir=CONFIG_DIR)
+        self.assertEqual(Geometry(8, 8), layout.geometry)
+        self.assertEqual({}, layout.shards)
+
+    def test_shards(self):
+        layout = Layout(config_dir=CONFIG_DIR, config_name="side-by-side-layout")
+        self.assertEqual(Geometry(rows=8, cols=16), layout.geometry)
+        right = layout.get_shard("right")
+        self.assertEqual(Geometry(8, 8), right.geometry)
+        self.assertEqual([8, 9], right.indices[:2].tolist())
+        self.assertEqual(24, right.indices[8])
+
+        with self.assertRaises(ValueError):
+            layout.get_shard("middle")
+
+    def test_tile_order(self):
+        layout = Layout(config_dir=CONFIG_DIR, config_name="side-by-side-layout")
+        self.assertEqual(layout.geometry.chain_order(), layout.tile_order())
+        layout.pods = [(8, 0), (0, 0)]
+        self.assertEqual([8, 9], layout.tile_order()[:2])
+
+
+class ShardTest(TestCase):
+    def setUp(self):
+        floor = Geometry(rows=2, cols=4)
+        self.shard = Shard("right", 2, 0, 2, 2, floor, layout=[1, 1, 1, 0, 1, 1, 1, 1])
+
+    def test_slice(self):
+        frame = FrameBuffer.from_pixels([(i, 0, 0) for i in range(8)])
+        self.assertEqual([2, 3, 6, 7], [pixel[0] for pixel in self.shard.slice(frame)])
+
+    def test_stitch(self):
+        out = np.array([0, 1, 0, 0, 0, 0, 0, 0])
+        self.shard.stitch([1, 0, 0, 1], out)
+        self.assertEqual([0, 1, 1, 0, 0, 0, 0, 1], out.tolist())
+
+    def test_bypassed(self):
+        self.assertFalse(self.shard.is_bypassed(0))
+        self.assertTrue(self.shard.is_bypassed(1))
+
+    def test_must_fit(self):
+        with self.assertRaises(ValueError):
+            Shard("big", 2, 0, 2, 3, Geometry(rows=2, cols=4))
@@ -0,0 +1,95 @@
+"""
+Renders a show to a frame file without the real-time loop.
+
+A `Controller` runs on a `FakeClock`, so each frame takes only as long as it
+takes to render, with a `Capture` driver recording the output. Weights and
+tempo changes come from scripts, so the same arguments always render the
+same show. See `bin/render.py`.
+
+    playlist = Playlist.from_single_processor(Ripple)
+    render_to_file(playlist, "ripple.frames", seconds=10, bpm_changes=[(5.0, 90.0)])
+"""
+
+from __future__ import absolute_import, division
+
+import logging
+from builtins import range
+
+from floor.controller.controller import Controller
+from floor.controller.playlist import PlaylistManager
+from floor.controller.processor_pool import InlineExecutor, ProcessorPool
+from floor.driver.capture import Capture
+from floor.util.fake_clock import FakeClock
+
+logger = logging.getLogger("offline")
+
+DEFAULT_FPS = Controller.DEFAULT_FPS
+DEFAULT_BPM = Controller.DEFAULT_BPM
+
+
+def render_to_file(
+    playlist,
+    filename,
+    seconds,
+    fps=DEFAULT_FPS,
+    bpm=DEFAULT_BPM,
+    weights_script=None,
+    bpm_changes=(),
+    metrics=None,
+    layout=None,
+):
+    """Renders `seconds` of show time of `playlist` to the frame file `filename`.
+
+    Arguments:
+        playlist {floor.controller.Playlist} -- The show to render. Its items advance
+            by show time, not wall clock time.
+        filename {str} -- The frame file to write.
+        seconds {float} -- How much show time to render.
+
+    Keyword Arguments:
+        fps {int} -- Frames per second of show time.
+        bpm {float} -- The tempo at the start of the show.
+        weights_script {list} -- `(weights, pressures)` for each frame, repeated if
+            shorter than the show; eg from `floor.util.benchmark.scripted_weights`. No
+            one is on the floor if not given.
+        bpm_changes {list} -- `(seconds, bpm)` tempo changes, each starting a new
+            downbeat.
+        metrics {floor.util.instrumentation.Metrics} -- Passed to the `Controller`.
+        layout {floor.controller.Layout} -- The floor to render for; a single pod if
+            not given.
+
+    Returns:
+        int -- The number of frames written.
+    """
+    clock = FakeClock()
+    playlist.clocksource = clock
+    driver = Capture({"filename": filename, "fps": fps, "bpm": bpm})
+    if layout:
+        driver.init_layout(layout)
+    controller = Controller(
+        [driver],
+        PlaylistManager(playlist),
+        clocksource=clock,
+        num_overlays=0,
+        metrics=metrics,
+        processor_pool=ProcessorPool(executor=InlineExecutor()),
+        layout=layout,
+    )
+    controller.set_fps(fps)
+    controller.set_bpm(bpm, downbeat=clock.time())
+
+    num_frames = int(round(seconds * fps))
+    # Scheduled by frame number, since the clock adds up rounding errors.
+    bpm_changes = sorted((int(round(when * fps)), new_bpm) for when, new_bpm in bpm_changes)
+    try:
+        for frame in range(num_frames):
+            while bpm_changes and bpm_changes[0][0] <= frame:
+                controller.set_bpm(bpm_changes.pop(0)[1], downbeat=clock.time())
+            if weights_script:
+                driver.set_inputs(*weights_script[frame % len(weights_script)])
+            controller.run_one_frame()
+    finally:
+        driver.close()
+
+    logger.info("Rendered {} frames to {}".format(num_frames, filename))
+    return num_frames
@@ -0,0 +1,95 @@
+from __future__ import absolute_import, division, print_function, unicode_literals
+
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+
+from floor.controller.offline import render_to_file
+from floor.controller.playlist import Playlist, PlaylistItem
+from floor.processor.base import Base as BaseProcessor
+from floor.processor.utils import clocked
+from floor.util.benchmark import scripted_weights
+from floor.util.frame_file import FrameFile
+
+
+class BeatCounterProcessor(BaseProcessor):
+    """Shows how many beats it has seen in the red channel."""
+
+    def __init__(self, **kwargs):
+        self.beats = 0
+        super(BeatCounterProcessor, self).__init__(**kwargs)
+
+    @clocked(frames_per_beat=1)
+    def get_next_frame(self, context):
+        self.beats += 1
+        return [(self.beats, 0, 0)] * 64
+
+
+class OfflineStepProcessor(BaseProcessor):
+    """Lights up stepped-on tiles."""
+
+    def __init__(self, **kwargs):
+        self.color = kwargs.pop("color", 1)
+        super(OfflineStepProcessor, self).__init__(**kwargs)
+
+    def get_next_frame(self, context):
+        return [(0, 0, self.color * weight) for weight in context.weights]
+
+
+class OfflineRenderTest(TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmpdir)
+        self.filename = os.path.join(self.tmpdir, "show.frames")
+
+    def red_channel(self, frames):
+        return [int(frame.rgb[0, 0]) for frame in frames]
+
+    def test_renders_on_beats(self):
+        playlist = Playlist.from_single_processor(BeatCounterProcessor)
+        self.assertEqual(240, render_to_file(playlist, self.filename, 2.0, fps=120, bpm=120))
+
+        frames = FrameFile(self.filename)
+        self.assertEqual(240, len(frames))
+        self.assertEqual(120.0, frames.bpm)
+        red = self.red_channel(frames)
+        # A new beat every half second.
+        self.assertEqual([1, 2, 3, 4], [red[0], red[60], red[120], red[180]])
+        self.assertEqual(1, red[59])
+
+    def test_bpm_changes(self):
+        playlist = Playlist.from_single_processor(BeatCounterProcessor)
+        render_to_file(playlist, self.filename, 2.0, fps=120, bpm=60, bpm_changes=[(1.0, 240)])
+
+        red = self.red_channel(FrameFile(self.filename))
+        # One beat in the first second, then four in the next.
+        self.assertEqual(1, red[119])
+        self.assertEqual(5, red[-1])
+
+    def test_playlist_advances_by_show_time(self):
+        playlist = Playlist(
+            "Test",
+            items=[
+                PlaylistItem(OfflineStepProcessor, duration=1, processor_args={"color": 1}),
+                PlaylistItem(OfflineStepProcessor, duration=1, processor_args={"color": 2}),
+            ],
+        )
+        weights_script = [([1] * 64, [1.0] * 64)]
+        render_to_file(playlist, self.filename, 3.0, fps=30, weights_script=weights_script)
+
+        blue = [int(frame.rgb[0, 2]) for frame in FrameFile(self.filename)]
+        self.assertEqual(1, blue[0])
+        self.assertEqual(2, blue[45])
+        self.assertEqual(1, blue[-1])
+
+    def test_deterministic(self):
+        weights_script = scripted_weights(120)
+        other_filename = os.path.join(self.tmpdir, "other.frames")
+        for filename in (self.filename, other_filename):
+            playlist = Playlist.from_single_processor(OfflineStepProcessor)
+            render_to_file(playlist, filename, 1.0, weights_script=weights_script)
+
+        with open(self.filename, "rb") as fp, open(other_filename, "rb") as other_fp:
+            self.assertEqual(fp.read(), other_fp.read())
+        self.assertTrue(any(frame.rgb.any() for frame in FrameFile(self.filename)))
@@ -2,9 +2,10 @@ import json
 import logging
 import os
 import re
+import time
 from builtins import object
-from time import time
 
+from floor.controller.transitions import Transition
 from floor.processor.base import Base as ProcessorBase
 
 logger = logging.getLogger("playlist")
@@ -25,38 +26,86 @@ class InvalidPlaylistFile(PlaylistError):
 class PlaylistItem:
     """An immutable holder of a playlist entry."""
 
-    def __init__(self, processor_cls, title=None, duration=None, processor_args=None):
-        assert issubclass(
-            processor_cls, ProcessorBase
-        ), "{} is not a subclass of processor.Base".format(processor_cls)
-        self.processor_cls = processor_cls
+    def __init__(
+        self,
+        processor_cls,
+        title=None,
+        duration=None,
+        processor_args=None,
+        all_processors=None,
+        transition=None,
+    ):
+        """Constructor.
+
+        Arguments:
+            processor_cls {class} -- The processor to run. May also be the name of a
+                processor in `all_processors`, which is then only imported when the
+                item first needs it.
+
+        Keyword Arguments:
+            transition {floor.controller.transitions.Transition} -- How this item takes
+                over from the one before it. Cuts straight to it if not given.
+        """
+        if isinstance(processor_cls, str):
+            assert all_processors is not None, "Processor names need all_processors"
+            self.processor_name = processor_cls
+            self._processor_cls = None
+        else:
+            assert issubclass(
+                processor_cls, ProcessorBase
+            ), "{} is not a subclass of processor.Base".format(processor_cls)
+            self.processor_name = processor_cls.__name__
+            self._processor_cls = processor_cls
+        self.all_processors = all_processors
         self.processor_args = processor_args or {}
         self.duration = int(duration) if duration is not None else None
-        self.title = title or self.processor_cls.__name__
+        self.title = title or self.processor_name
+        self.transition = transition
+
+    @property
+    def processor_cls(self):
+        if self._processor_cls is None:
+            self._processor_cls = self.all_processors[self.processor_name]
+        return self._processor_cls
 
     @classmethod
     def from_object(cls, obj, all_processors):
         processor_name = obj["name"]
-        processor = all_processors.get(processor_name)
-        if processor is None:
+        if processor_name not in all_processors:
             raise ProcessorNotFound('Processor "{}" is unknown'.format(processor_name))
         title = obj.get("title")
         duration = obj.get("duration")
         processor_args = obj.get("args")
-        return cls(processor, title=title, duration=duration, processor_args=processor_args)
+        try:
+            transition = Transition.from_object(obj.get("transition"))
+        except (TypeError, ValueError) as e:
+            raise InvalidPlaylistFile('Item "{}": {}'.format(title or processor_name, e))
+        return cls(
+            processor_name,
+            title=title,
+            duration=duration,
+            processor_args=processor_args,
+            all_processors=all_processors,
+            transition=transition,
+        )
 
     def to_object(self):
-        return {
-            "name": self.processor_cls.__name__,
+        obj = {
+            "name": self.processor_name,
             "title": self.title,
             "duration": self.duration,
             "args": self.processor_args,
         }
+        if self.transition:
+            obj["transition"] = self.transition.to_object()
+        return obj
 
 
 class Playlist(object):
-    def __init__(self, title, items=None):
+    def __init__(self, title, items=None, clocksource=time):
         self.title = title
+        # Where `next_advance` times come from; anything with a `.time()` method.
+        self.clocksource = clocksource
         # The index into the queue array
         self.position = None
         # Time when the playlist should auto advance.
@@ -128,7 +177,7 @@ class Playlist(object):
 
         # Save time remaining
         if self.next_advance is not None:
-            current["remaining_duration"] = self.next_advance - time()
+            current["remaining_duration"] = self.next_advance - self.clocksource.time()
         else:
             current["remaining_duration"] = None
         self.next_advance = None
@@ -140,7 +189,7 @@ class Playlist(object):
 
         if current["remaining_duration"] is not None:
             # Restore time remaining
-            self.next_advance = time() + current["remaining_duration"]
+            self.next_advance = self.clocksource.time() + current["remaining_duration"]
         else:
             self.next_advance = None
 
@@ -166,11 +215,19 @@ class Playlist(object):
         if self.position is None:
             # First call: Start the first item.
             self.advance()
-        elif self.next_advance is not None and (time() > self.next_advance):
+        elif self.next_advance is not None and (self.clocksource.time() > self.next_advance):
             self.advance()
 
         return self.queue[self.position]
 
+    def peek_next(self):
+        """Returns the item `advance` would go to, without advancing."""
+        if not self.queue:
+            return None
+        if self.position is None:
+            return self.queue[0]
+        return self.queue[(self.position + 1) % len(self.queue)]
+
     def advance(self):
         """Go to the next playlist item."""
         if self.position is None:
@@ -199,7 +256,7 @@ class Playlist(object):
 
         current = self.queue[self.position]
         if current.duration:
-            self.next_advance = time() + current.duration
+            self.next_advance = self.clocksource.time() + current.duration
         else:
             self.next_advance = None
 
@@ -3,7 +3,12 @@ from __future__ import absolute_import, division, print_function, unicode_litera
 import os
 from unittest import TestCase
 
-from floor.controller.playlist import Playlist, PlaylistItem, ProcessorNotFound
+from floor.controller.playlist import (
+    InvalidPlaylistFile,
+    Playlist,
+    PlaylistItem,
+    ProcessorNotFound,
+)
 from floor.processor import all_processors
 
 BASE_DIR = os.path.dirname(os.path.realpath(__file__))
@@ -58,6 +63,26 @@ class PlaylistTest(TestCase):
             item_object,
         )
 
+    def test_playlist_item_transition(self):
+        obj = {
+            "name": "Animator",
+            "title": "Animator",
+            "args": {},
+            "duration": 10,
+            "transition": {"type": "wipe", "beats": 4.0, "quantize": True},
+        }
+        item = PlaylistItem.from_object(obj, self.all_procs)
+        self.assertEqual("wipe", item.transition.kind)
+        self.assertEqual(obj, item.to_object())
+
+        item = PlaylistItem.from_object(
+            {"name": "Animator", "transition": "crossfade"}, self.all_procs
+        )
+        self.assertEqual({"type": "crossfade"}, item.to_object()["transition"])
+
+        with self.assertRaises(InvalidPlaylistFile):
+            PlaylistItem.from_object({"name": "Animator", "transition": "dissolve"}, self.all_procs)
+
     def test_playlist_item_invalid_processor_name(self):
         with self.assertRaises(ProcessorNotFound):
             PlaylistItem.from_object(
@@ -66,3 +91,23 @@ class PlaylistTest(TestCase):
                 },
                 self.all_procs,
             )
+
+    def test_playlist_item_imports_lazily(self):
+        item = PlaylistItem.from_object({"name": "Animator"}, self.all_procs)
+        self.assertIsNone(item._processor_cls)
+        self.assertEqual("Animator", item.title)
+        self.assertIs(self.all_procs["Animator"], item.processor_cls)
+
+    def test_peek_next(self):
+        playlist = Playlist("Test")
+        self.assertIsNone(playlist.peek_next())
+
+        first = PlaylistItem.from_object({"name": "Animator"}, self.all_procs)
+        second = PlaylistItem.from_object({"name": "Spiral"}, self.all_procs)
+        playlist.append(first)
+        playlist.append(second)
+        self.assertIs(first, playlist.peek_next())
+        playlist.advance()
+        self.assertIs(second, playlist.peek_next())
+        playlist.advance()
+        self.assertIs(first, playlist.peek_next())
@@ -0,0 +1,109 @@
+from __future__ import absolute_import, division, print_function, unicode_literals
+
+import json
+import logging
+from builtins import object, str
+from collections import OrderedDict
+from concurrent.futures import Executor, Future, ThreadPoolExecutor
+
+logger = logging.getLogger("processor_pool")
+
+
+class ProcessorPool(object):
+    """Builds processors for playlist items, and keeps recently used ones around.
+
+    Some processors do a lot of work in their constructors (building tables,
+    fonts or animations). `prewarm` builds an item's processor on a background
+    thread ahead of time, so that `get` can hand it over without a hitch when the
+    item starts. Processors are kept, least recently used first, so that going
+    back to a recent item also reuses its processor.
+
+    Items with the same processor and args share an instance. Only the latest
+    prewarm is kept, so that skipped items don't hold on to their processors.
+    """
+
+    DEFAULT_SIZE = 4
+
+    def __init__(self, size=DEFAULT_SIZE, executor=None):
+        """Constructor.
+
+        Keyword Arguments:
+            size {int} -- How many processors to keep.
+            executor {concurrent.futures.Executor} -- Where to build prewarmed
+                processors. Defaults to a single background thread.
+        """
+        self.size = size
+        self.executor = executor
+        # Key -> processor, least recently used first.
+        self.instances = OrderedDict()
+        # Key -> `Future` for the processor being prewarmed, if any.
+        self.pending = {}
+
+    @staticmethod
+    def key(item):
+        args = json.dumps(item.processor_args, sort_keys=True, default=repr)
+        return item.processor_name, args
+
+    @staticmethod
+    def build(item):
+        """Builds a new processor for `item`."""
+        processor_cls = item.processor_cls
+        try:
+            return processor_cls(**item.processor_args)
+        except Exception as e:
+            raise ValueError(
+                'Processor "{}" could not be created: {}'.format(processor_cls, str(e))
+            )
+
+    def prewarm(self, item):
+        """Starts building the processor for `item` in the background, if there isn't
+        one already, and forgets any earlier prewarm.
+        """
+        key = self.key(item)
+        for pending_key in list(self.pending):
+            if pending_key != key:
+                self.pending.pop(pending_key).cancel()
+        if key in self.instances or key in self.pending:
+            return
+        if self.executor is None:
+            self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="prewarm")
+        logger.debug("Prewarming {}".format(item.title))
+        self.pending[key] = self.executor.submit(self.build, item)
+
+    def get(self, item):
+        """Returns the processor for `item`, building it if it wasn't prewarmed."""
+        key = self.key(item)
+        processor = self.instances.pop(key, None)
+        if processor is None:
+            future = self.pending.pop(key, None)
+            if future is not None:
+                # Usually done by now; if not, it's still further along than a new one.
+                processor = future.result()
+            else:
+                processor = self.build(item)
+
+        self.instances[key] = processor
+        while len(self.instances) > self.size:
+            self.instances.popitem(last=False)
+        return processor
+
+    def discard(self, item):
+        """Forgets the processor for `item`, eg because it failed."""
+        key = self.key(item)
+        self.instances.pop(key, None)
+        self.pending.pop(key, None)
+
+
+class InlineExecutor(Executor):
+    """An executor that runs everything right away, on the calling thread.
+
+    Keeps prewarming deterministic, eg when rendering offline.
+    """
+
+    def submit(self, fn, *args, **kwargs):
+        future = Future()
+        try:
+            future.set_result(fn(*args, **kwargs))
+        except Exception as e:
+            future.set_exception(e)
+        return future
@@ -0,0 +1,161 @@
+from __future__ import absolute_import, division, print_function, unicode_literals
+
+import threading
+from unittest import TestCase
+
+from floor.controller.playlist import Playlist, PlaylistItem, PlaylistManager
+from floor.controller.processor_pool import InlineExecutor, ProcessorPool
+from floor.controller.rendering import PlaylistRenderLayer
+from floor.processor import all_processors
+from floor.processor.base import Base as BaseProcessor
+from floor.processor.base import RenderContext
+from floor.util.fake_clock import FakeClock
+
+
+class CountingProcessor(BaseProcessor):
+    """Counts how many instances were built, and on which threads."""
+
+    instances = []
+
+    def __init__(self, **kwargs):
+        self.color = kwargs.pop("color", 0)
+        if kwargs.pop("fail", False):
+            raise RuntimeError("Failed")
+        super(CountingProcessor, self).__init__(**kwargs)
+        self.thread = threading.current_thread()
+        CountingProcessor.instances.append(self)
+
+    def get_next_frame(self, context):
+        return [(self.color, 0, 0)] * 64
+
+
+class ProcessorPoolTest(TestCase):
+    def setUp(self):
+        CountingProcessor.instances = []
+
+    def item(self, color=0, **kwargs):
+        return PlaylistItem(CountingProcessor, processor_args=dict(color=color, **kwargs))
+
+    def test_reuses_instances(self):
+        pool = ProcessorPool()
+        first = pool.get(self.item(color=1))
+        self.assertIs(first, pool.get(self.item(color=1)))
+        self.assertIsNot(first, pool.get(self.item(color=2)))
+        self.assertEqual(2, len(CountingProcessor.instances))
+
+    def test_evicts_least_recently_used(self):
+        pool = ProcessorPool(size=2)
+        first = pool.get(self.item(color=1))
+        pool.get(self.item(color=2))
+        pool.get(self.item(color=1))
+        pool.get(self.item(color=3))
+
+        self.assertIs(first, pool.get(self.item(color=1)))
+        pool.get(self.item(color=2))
+        self.assertEqual(4, len(CountingProcessor.instances))
+
+    def test_prewarm_in_background(self):
+        pool = ProcessorPool()
+        pool.prewarm(self.item(color=1))
+        pool.prewarm(self.item(color=1))
+        processor = pool.get(self.item(color=1))
+
+        self.assertEqual([processor], CountingProcessor.instances)
+        self.assertIsNot(threading.current_thread(), processor.thread)
+
+    def test_prewarm_failure(self):
+        pool = ProcessorPool(executor=InlineExecutor())
+        pool.prewarm(self.item(fail=True))
+        with self.assertRaises(ValueError):
+            pool.get(self.item(fail=True))
+
+    def test_only_latest_prewarm_is_kept(self):
+        pool = ProcessorPool(executor=InlineExecutor())
+        pool.prewarm(self.item(color=1))
+        pool.prewarm(self.item(color=2))
+        self.assertEqual([pool.key(self.item(color=2))], list(pool.pending))
+
+        # The skipped item is built again if it's needed after all.
+        self.assertIsNot(CountingProcessor.instances[0], pool.get(self.item(color=1)))
+        self.assertIs(CountingProcessor.instances[1], pool.get(self.item(color=2)))
+
+    def test_discard(self):
+        pool = ProcessorPool()
+        first = pool.get(self.item())
+        pool.discard(self.item())
+        self.assertIsNot(first, pool.get(self.item()))
+
+
+class PlaylistPrewarmTest(TestCase):
+    def setUp(self):
+        CountingProcessor.instances = []
+
+    def test_prewarms_next_item(self):
+        clock = FakeClock()
+        playlist = Playlist(
+            "Test",
+            items=[
+                PlaylistItem(CountingProcessor, duration=10, processor_args={"color": 1}),
+                PlaylistItem(CountingProcessor, duration=10, processor_args={"color": 2}),
+            ],
+            clocksource=clock,
+        )
+        pool = ProcessorPool(executor=InlineExecutor())
+        layer = PlaylistRenderLayer(PlaylistManager(playlist), all_processors(), pool)
+
+        def render():
+            context = RenderContext(clock.time(), 0, [0] * 64, 120, [0] * 4, [False] * 4)
+            return layer.render(context)
+
+        render()
+        self.assertEqual([1], [p.color for p in CountingProcessor.instances])
+
+        clock.advance(7.0)
+        render()
+        self.assertEqual([1], [p.color for p in CountingProcessor.instances])
+
+        # The second item is built ahead of time...
+        clock.advance(1.5)
+        render()
+        self.assertEqual([1, 2], [p.color for p in CountingProcessor.instances])
+
+        # ...and used when it starts.
+        clock.advance(2.0)
+        frame = render()
+        self.assertEqual((2, 0, 0), frame[0])
+        self.assertIs(CountingProcessor.instances[1], layer.current_processor)
+
+        # Going back to the first item reuses its processor.
+        clock.advance(10.5)
+        self.assertEqual((1, 0, 0), render()[0])
+        self.assertEqual(2, len(CountingProcessor.instances))
+
+    def test_prewarm_failure_skips_item(self):
+        clock = FakeClock()
+        playlist = Playlist(
+            "Test",
+            items=[
+                PlaylistItem(CountingProcessor, duration=10, processor_args={"color": 1}),
+                PlaylistItem(CountingProcessor, duration=10, processor_args={"fail": True}),
+                PlaylistItem(CountingProcessor, duration=10, processor_args={"color": 3}),
+            ],
+            clocksource=clock,
+        )
+        pool = ProcessorPool(executor=InlineExecutor())
+        layer = PlaylistRenderLayer(PlaylistManager(playlist), all_processors(), pool)
+
+        def render():
+            context = RenderContext(clock.time(), 0, [0] * 64, 120, [0] * 4, [False] * 4)
+            return layer.render(context)
+
+        render()
+        clock.advance(8.5)
+        render()
+        self.assertIn(pool.key(playlist.queue[1]), pool.pending)
+
+        # The failed item is dropped, and the show carries on with the next one.
+        clock.advance(2.0)
+        self.assertEqual((1, 0, 0), render()[0])
+        self.assertEqual(2, len(playlist.queue))
+        self.assertEqual((3, 0, 0), render()[0])
+        self.assertEqual({}, pool.pending)
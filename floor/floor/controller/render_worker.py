@@ -0,0 +1,322 @@
+"""
+Rendering layers in worker processes.
+
+Every layer normally renders on the controller's thread, one after another,
+so a show only ever uses one core. A `WorkerRenderLayer` is a drop-in
+`ProcessorRenderLayer` whose processor runs in a process of its own: the
+controller sends it each frame's `RenderContext` before rendering anything
+(see `BaseRenderLayer.prepare`), and rendered frames come back through a
+`FrameRing` in shared memory. When the controller gets round to the layer,
+it uses whatever frame is ready by the deadline, so a slow processor drops
+frames instead of holding up the whole floor.
+
+Processors are sent to the worker by pickling them. The few that can't be
+pickled (eg ones holding open files) are rendered inline instead.
+"""
+
+from __future__ import absolute_import, division, print_function, unicode_literals
+
+import ctypes
+import logging
+import multiprocessing
+import pickle
+import time
+
+import numpy as np
+
+from floor.controller.rendering import ProcessorRenderLayer
+from floor.util.frame_buffer import DEFAULT_NUM_PIXELS, FrameBuffer
+
+logger = logging.getLogger("render_worker")
+
+# Messages to the worker.
+PROCESSOR = "processor"
+RANGED_VALUE = "ranged_value"
+RENDER = "render"
+STOP = "stop"
+# Messages from the worker.
+FRAME = "frame"
+ERROR = "error"
+
+
+class RenderWorkerError(Exception):
+    """A processor failed in a worker process."""
+
+
+class FrameRing(object):
+    """A fixed number of frame slots in shared memory, written by a worker process and
+    read by the controller.
+
+    Frame number `n` goes in slot `n % num_slots`. Each slot's sequence number is the
+    frame it holds, or -1 while it's being written, so that a reader can tell when a
+    slot was overwritten under it.
+    """
+
+    DEFAULT_SLOTS = 4
+
+    def __init__(self, num_slots=DEFAULT_SLOTS, num_pixels=DEFAULT_NUM_PIXELS, buffer=None):
+        """Constructor.
+
+        Keyword Arguments:
+            num_slots {int} -- How many frames the ring holds.
+            num_pixels {int} -- Pixels per frame.
+            buffer {multiprocessing.RawArray} -- Shared memory to use, from another
+                `FrameRing`. Allocated if not given.
+        """
+        self.num_slots = num_slots
+        self.num_pixels = num_pixels
+        created = buffer is None
+        if created:
+            buffer = multiprocessing.RawArray(
+                ctypes.c_char, self.buffer_size(num_slots, num_pixels)
+            )
+        self.buffer = buffer
+
+        dtype = FrameBuffer.DTYPE
+        offset = 0
+        self.sequence = np.frombuffer(buffer, dtype=np.int64, count=num_slots, offset=offset)
+        offset += self.sequence.nbytes
+        self.rgb = np.frombuffer(
+            buffer, dtype=dtype, count=num_slots * num_pixels * 3, offset=offset
+        ).reshape((num_slots, num_pixels, 3))
+        offset += self.rgb.nbytes
+        self.alpha = np.frombuffer(
+            buffer, dtype=dtype, count=num_slots * num_pixels, offset=offset
+        ).reshape((num_slots, num_pixels))
+        if created:
+            self.sequence.fill(-1)
+
+    @staticmethod
+    def buffer_size(num_slots, num_pixels):
+        itemsize = np.dtype(FrameBuffer.DTYPE).itemsize
+        return num_slots * (8 + num_pixels * 4 * itemsize)
+
+    def write(self, number, frame):
+        """Stores `frame` as frame `number`."""
+        slot = number % self.num_slots
+        self.sequence[slot] = -1
+        self.rgb[slot] = frame.rgb
+        self.alpha[slot] = frame.alpha
+        self.sequence[slot] = number
+
+    def read(self, number, out):
+        """Copies frame `number` into the `FrameBuffer` `out`.
+
+        Returns `False`, and leaves `out` in an undefined state, if the frame has
+        already been overwritten.
+        """
+        slot = number % self.num_slots
+        if self.sequence[slot] != number:
+            return False
+        np.copyto(out.rgb, self.rgb[slot])
+        np.copyto(out.alpha, self.alpha[slot])
+        return self.sequence[slot] == number
+
+    def read_latest(self, out, since=0):
+        """Copies the newest frame in the ring into `out`, if it's frame `since` or later.
+
+        Returns its number, or `None` if there isn't one to read.
+        """
+        number = int(self.sequence.max())
+        if number < since or not self.read(number, out):
+            return None
+        return number
+
+
+def run_worker(conn, buffer, num_slots, num_pixels):
+    """Renders frames for a `WorkerRenderLayer`, until told to stop."""
+    ring = FrameRing(num_slots, num_pixels, buffer=buffer)
+    layer = ProcessorRenderLayer()
+    try:
+        while True:
+            messages = [conn.recv()]
+            while conn.poll():
+                messages.append(conn.recv())
+
+            # Only the latest frame is worth rendering, if we've fallen behind.
+            render = None
+            for message in messages:
+                command = message[0]
+                if command == STOP:
+                    return
+                elif command == PROCESSOR:
+                    layer.set_processor(message[1])
+                elif command == RANGED_VALUE:
+                    layer.on_ranged_value_change(message[1], message[2])
+                elif command == RENDER:
+                    render = message
+            if render is None:
+                continue
+
+            _, number, render_context = render
+            try:
+                frame = layer.render(render_context)
+            except Exception as e:
+                logger.exception("Error generating frame for processor {}".format(layer.processor))
+                conn.send((ERROR, number, "{}: {}".format(type(e).__name__, e)))
+                continue
+            if frame is not None and layer.changed:
+                ring.write(number, frame)
+            conn.send((FRAME, number, layer.changed, frame is not None))
+    except (EOFError, KeyboardInterrupt):
+        return
+
+
+class WorkerRenderLayer(ProcessorRenderLayer):
+    """A `ProcessorRenderLayer` that renders in a worker process."""
+
+    # How much of a frame to wait for the worker, from when the frame was requested.
+    DEADLINE_FRACTION = 0.75
+    START_METHOD = "spawn"
+
+    def __init__(self, processor=None):
+        super(WorkerRenderLayer, self).__init__()
+        # Frames are read from the ring into `spare`, which becomes the output if the
+        # read succeeds.
+        self.spare = None
+        self.ring = None
+        self.process = None
+        self.conn = None
+        # Whether the current processor couldn't be sent, and is rendered here instead.
+        self.inline = False
+        # Number of the last frame requested, and of the last one received.
+        self.requested = 0
+        self.received = 0
+        # Number of a changed frame whose slot was overwritten before it could be read,
+        # until a frame at least as new has been.
+        self.missed = None
+        self.request_time = None
+        self.timer = time.perf_counter
+        self.set_processor(processor)
+
+    def start(self, num_pixels):
+        """Starts a worker process rendering frames of `num_pixels`, and sends it the
+        current processor.
+        """
+        context = multiprocessing.get_context(self.START_METHOD)
+        self.ring = FrameRing(num_pixels=num_pixels)
+        self.spare = FrameBuffer(num_pixels)
+        self.output = self.output_key = None
+        self.missed = None
+        self.conn, worker_conn = context.Pipe()
+        self.process = context.Process(
+            target=run_worker,
+            args=(worker_conn, self.ring.buffer, self.ring.num_slots, num_pixels),
+            name="render_worker",
+        )
+        self.process.daemon = True
+        self.process.start()
+        worker_conn.close()
+        self._send_processor()
+
+    def close(self):
+        """Stops the worker process."""
+        if self.process is None:
+            return
+        try:
+            self.conn.send((STOP,))
+        except (IOError, OSError):
+            pass
+        self.process.join(1.0)
+        if self.process.is_alive():
+            self.process.terminate()
+        self.conn.close()
+        self.process = self.conn = None
+
+    def set_processor(self, processor):
+        super(WorkerRenderLayer, self).set_processor(processor)
+        self.output = self.output_key = None
+        self.missed = None
+        self.inline = False
+        # Otherwise it's sent when the worker starts.
+        if self.process is not None:
+            self._send_processor()
+
+    def _send_processor(self):
+        try:
+            self.conn.send((PROCESSOR, self.processor))
+        except (pickle.PicklingError, TypeError, AttributeError) as e:
+            logger.warning(
+                "Processor {} can't run in a worker, rendering it inline: {}".format(
+                    self.get_processor_name(), e
+                )
+            )
+            self.inline = True
+            self.conn.send((PROCESSOR, None))
+
+    def on_ranged_value_change(self, num, val):
+        super(WorkerRenderLayer, self).on_ranged_value_change(num, val)
+        if self.process is not None and not self.inline:
+            self.conn.send((RANGED_VALUE, num, val))
+
+    def prepare(self, render_context):
+        if self.processor is None or self.inline:
+            return
+        num_pixels = render_context.geometry.num_pixels
+        if self.process is None or self.ring.num_pixels != num_pixels:
+            self.close()
+            self.start(num_pixels)
+            if self.inline:
+                return
+        self.requested += 1
+        self.request_time = self.timer()
+        self.conn.send((RENDER, self.requested, render_context))
+
+    def render(self, render_context):
+        if self.requested <= self.received:
+            self.prepare(render_context)
+        if self.processor is None or self.inline:
+            return super(WorkerRenderLayer, self).render(render_context)
+
+        # Without a frame rate to keep up, wait for every frame.
+        deadline = None
+        if self.frame_seconds:
+            deadline = self.request_time + self.frame_seconds * self.DEADLINE_FRACTION
+        self.changed = False
+        try:
+            while self.received < self.requested:
+                timeout = None if deadline is None else max(0.0, deadline - self.timer())
+                if not self.conn.poll(timeout):
+                    break
+                self._receive(self.conn.recv())
+            # Catch up on anything else that's arrived.
+            while self.conn.poll():
+                self._receive(self.conn.recv())
+        except (EOFError, IOError, OSError) as e:
+            self.close()
+            self.set_processor(None)
+            raise RenderWorkerError("Worker process exited: {}".format(e))
+        return self.output
+
+    def _receive(self, message):
+        command, number = message[:2]
+        if command == ERROR:
+            self.received = number
+            raise RenderWorkerError(message[2])
+        if number <= self.received:
+            return
+        self.received = number
+        changed, has_frame = message[2:]
+        if not has_frame:
+            self.changed = self.changed or self.output is not None
+            self.output = None
+        elif changed or self.missed is not None:
+            if self._read_frame(number, changed):
+                self.changed = True
+                self.missed = None
+                previous = self.output if self.output is not None else FrameBuffer(len(self.spare))
+                self.output, self.spare = self.spare, previous
+            elif changed:
+                self.missed = number
+
+    def _read_frame(self, number, changed):
+        """Reads frame `number`, or the newest frame after it, into `spare`.
+
+        Returns whether there was one to read.
+        """
+        if changed and self.ring.read(number, self.spare):
+            return True
+        # The frame was overwritten, by one that's newer still; unchanged frames after
+        # it aren't written, so look for the missed frame or a later one.
+        since = number if changed else self.missed
+        return self.ring.read_latest(self.spare, since) is not None
@@ -0,0 +1,156 @@
+from __future__ import absolute_import, division, print_function, unicode_literals
+
+import os
+import threading
+import time
+from unittest import TestCase
+
+from floor.controller.render_worker import (
+    FRAME,
+    FrameRing,
+    RenderWorkerError,
+    WorkerRenderLayer,
+)
+from floor.processor.base import Base as BaseProcessor
+from floor.processor.base import RenderContext
+from floor.util.frame_buffer import FrameBuffer
+
+
+class WorkerPidProcessor(BaseProcessor):
+    """Renders the pid of the process it runs in, and the frame's clock."""
+
+    def __init__(self, **kwargs):
+        self.delay = kwargs.pop("delay", 0)
+        self.fail = kwargs.pop("fail", False)
+        super(WorkerPidProcessor, self).__init__(**kwargs)
+
+    def get_next_frame(self, context):
+        if self.fail:
+            raise RuntimeError("Failed")
+        time.sleep(self.delay)
+        return [(os.getpid() % 1000, context.clock, 0)] * 64
+
+
+class UnpicklableProcessor(WorkerPidProcessor):
+    def __init__(self, **kwargs):
+        super(UnpicklableProcessor, self).__init__(**kwargs)
+        self.lock = threading.Lock()
+
+
+def context(clock):
+    return RenderContext(clock, 0, [0] * 64, 120, [0] * 4, [False] * 4)
+
+
+class FrameRingTest(TestCase):
+    def test_read_and_write(self):
+        ring = FrameRing(num_slots=2, num_pixels=4)
+        frame = FrameBuffer(4)
+        frame.fill((1, 2, 3), alpha=0.5)
+        ring.write(7, frame)
+
+        out = FrameBuffer(4)
+        self.assertTrue(ring.read(7, out))
+        self.assertEqual((1, 2, 3), out[3])
+        self.assertEqual(0.5, out.alpha[0])
+
+        ring.write(9, FrameBuffer(4))
+        self.assertFalse(ring.read(7, out))
+
+    def test_shared(self):
+        ring = FrameRing(num_pixels=4)
+        other = FrameRing(num_pixels=4, buffer=ring.buffer)
+        frame = FrameBuffer(4)
+        frame.fill((4, 5, 6))
+        other.write(1, frame)
+
+        out = FrameBuffer(4)
+        self.assertTrue(ring.read(1, out))
+        self.assertEqual((4, 5, 6), out[0])
+
+
+class ReceiveTest(TestCase):
+    """Frames arriving from the worker, without a worker process."""
+
+    def setUp(self):
+        self.layer = WorkerRenderLayer()
+        self.layer.ring = FrameRing(num_slots=2, num_pixels=4)
+        self.layer.spare = FrameBuffer(4)
+
+    def write(self, number, value):
+        frame = FrameBuffer(4)
+        frame.fill((value, 0, 0))
+        self.layer.ring.write(number, frame)
+
+    def test_reads_changed_frames(self):
+        self.write(1, 10)
+        self.layer._receive((FRAME, 1, True, True))
+        self.assertEqual((10, 0, 0), self.layer.output[0])
+        self.layer._receive((FRAME, 2, False, True))
+        self.assertEqual(2, self.layer.received)
+        self.assertEqual((10, 0, 0), self.layer.output[0])
+
+    def test_overwritten_frame(self):
+        # Frame 1 changed, but was overwritten by frame 3 before it was read.
+        self.write(1, 10)
+        self.write(3, 30)
+        self.layer.changed = False
+        self.layer._receive((FRAME, 1, True, True))
+        self.assertTrue(self.layer.changed)
+        self.assertEqual((30, 0, 0), self.layer.output[0])
+
+    def test_overwritten_frame_still_being_written(self):
+        self.write(1, 10)
+        self.layer.ring.sequence[1] = -1
+        self.layer.changed = False
+        self.layer._receive((FRAME, 1, True, True))
+        self.assertFalse(self.layer.changed)
+        self.assertIsNone(self.layer.output)
+
+        # Frame 3 finishes, but the next message is for an unchanged frame 2.
+        self.write(3, 30)
+        self.layer._receive((FRAME, 2, False, True))
+        self.assertTrue(self.layer.changed)
+        self.assertEqual((30, 0, 0), self.layer.output[0])
+        self.assertIsNone(self.layer.missed)
+
+
+class WorkerRenderLayerTest(TestCase):
+    def setUp(self):
+        self.layer = WorkerRenderLayer()
+        self.layer.set_frame_seconds(10.0)
+
+    def tearDown(self):
+        self.layer.close()
+
+    def test_renders_in_worker(self):
+        self.layer.set_processor(WorkerPidProcessor())
+        self.layer.prepare(context(1))
+        frame = self.layer.render(context(1))
+        self.assertTrue(self.layer.changed)
+        self.assertNotEqual(os.getpid() % 1000, frame[0][0])
+        self.assertEqual(1, frame[0][1])
+
+        # Without `prepare`.
+        self.assertEqual(2, self.layer.render(context(2))[0][1])
+
+    def test_late_frames(self):
+        self.layer.set_processor(WorkerPidProcessor(delay=0.2))
+        self.layer.set_frame_seconds(0.01)
+        self.assertIsNone(self.layer.render(context(1)))
+
+        deadline = time.time() + 10
+        frame = None
+        while frame is None and time.time() < deadline:
+            time.sleep(0.05)
+            frame = self.layer.render(context(2))
+        self.assertIsNotNone(frame)
+
+    def test_error(self):
+        self.layer.set_processor(WorkerPidProcessor(fail=True))
+        with self.assertRaises(RenderWorkerError):
+            self.layer.render(context(1))
+
+    def test_unpicklable(self):
+        self.layer.set_processor(UnpicklableProcessor())
+        self.assertEqual(os.getpid() % 1000, self.layer.render(context(1))[0][0])
+        self.assertTrue(self.layer.inline)
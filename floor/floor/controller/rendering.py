@@ -1,9 +1,14 @@
 from __future__ import absolute_import, division, print_function, unicode_literals
 
 import logging
-from builtins import object, str
+import time
+from builtins import object
 
+from floor.controller.processor_pool import ProcessorPool
+from floor.controller.transitions import Transition, TransitionMixer
 from floor.processor.constants import RANGED_INPUT_MAX
+from floor.processor.utils import frame_generation
+from floor.util.frame_buffer import FrameBuffer
 
 
 class BaseRenderLayer(object):
@@ -15,6 +20,13 @@ class BaseRenderLayer(object):
         self.alpha = 1.0
         self.ranged_values = [0] * 4
         self.switches = [False] * 4
+        # Whether the last `render` may have returned a different frame than the one before.
+        self.changed = True
+        # How long the controller has to produce each frame, if known.
+        self.frame_seconds = None
+
+    def set_frame_seconds(self, frame_seconds):
+        self.frame_seconds = frame_seconds
 
     def set_enabled(self, enabled):
         self.enabled = bool(enabled)
@@ -54,6 +66,12 @@ class BaseRenderLayer(object):
             return
         self.switches[num] = bool(is_on)
 
+    def prepare(self, render_context):
+        """Called for every enabled layer before any of them renders, with the same
+        context `render` will get. Layers that render elsewhere can start here.
+        """
+        pass
+
     def render(self, render_context):
         """Return a frame of pixels
 
@@ -61,7 +79,7 @@ class BaseRenderLayer(object):
             render_context {RenderContext} -- The current rendering context.
 
         Returns:
-            An iterable of pixels, or `None` if layer is disabled.
+            A `FrameBuffer`, or `None` if layer is disabled.
         """
         raise NotImplementedError
 
@@ -72,6 +90,13 @@ class ProcessorRenderLayer(BaseRenderLayer):
     def __init__(self, processor=None):
         super(ProcessorRenderLayer, self).__init__()
         self.processor = processor
+        # Reused when converting legacy pixel lists returned by the processor, and when
+        # fitting frames to the floor.
+        self.frame = FrameBuffer()
+        self.fitted = None
+        # The last frame returned, and the processor and generation it came from.
+        self.output = None
+        self.output_key = None
 
     def is_enabled(self):
         return self.processor is not None and self.enabled
@@ -83,9 +108,41 @@ class ProcessorRenderLayer(BaseRenderLayer):
             self.processor.on_ranged_value_change(num, val)
 
     def render(self, render_context):
-        if self.processor:
-            return self.processor.get_next_frame(render_context)
-        return None
+        if not self.processor:
+            self.changed = True
+            self.output = self.output_key = None
+            return None
+
+        pixels = self.processor.get_next_frame(render_context)
+
+        # A `clocked` processor that didn't generate a new frame returns the same
+        # one again, which doesn't need converting.
+        generation = frame_generation(self.processor)
+        key = (self.processor, generation)
+        self.changed = generation is None or key != self.output_key
+        if self.changed:
+            frame = FrameBuffer.coerce(pixels, out=self.frame)
+            if frame is not pixels:
+                self.frame = frame
+            self.output = self._fit(frame, render_context.geometry)
+            self.output_key = key
+        return self.output
+
+    def _fit(self, frame, geometry):
+        """Returns `frame` sized for the floor, repeating single-pod frames across
+        every pod of a bigger floor.
+        """
+        if frame is None or len(frame) == geometry.num_pixels:
+            return frame
+        if not geometry.is_pod_sized(len(frame)):
+            raise ValueError(
+                "Frame has {} pixels, but the floor has {}".format(len(frame), geometry.num_pixels)
+            )
+        if self.fitted is None or len(self.fitted) != geometry.num_pixels:
+            self.fitted = FrameBuffer(geometry.num_pixels)
+        self.fitted.rgb[:] = frame.rgb[geometry.tile_indices]
+        self.fitted.alpha[:] = frame.alpha[geometry.tile_indices]
+        return self.fitted
 
     def set_processor(self, processor):
         self.processor = processor
@@ -100,9 +157,35 @@ class ProcessorRenderLayer(BaseRenderLayer):
 
 
 class PlaylistRenderLayer(BaseRenderLayer):
-    """A RenderLayer that encapsulates a Playlist."""
-
-    def __init__(self, playlist_manager, all_processors):
+    """A RenderLayer that encapsulates a Playlist.
+
+    When an item with a `transition` starts, the previous item's processor keeps
+    rendering alongside the new one until the transition is over, and their frames
+    are mixed. If rendering both takes more than `TRANSITION_BUDGET_FRACTION` of a
+    frame, the transition falls back to mixing in the previous processor's last
+    frame instead, and if even that is over budget, to a cut.
+    """
+
+    # Start building the next item's processor this long before the current item ends.
+    PREWARM_SECONDS = 2.0
+    # How much of each frame a transition may spend rendering.
+    TRANSITION_BUDGET_FRACTION = 0.5
+
+    def __init__(
+        self,
+        playlist_manager,
+        all_processors,
+        processor_pool=None,
+        processor_layer_cls=ProcessorRenderLayer,
+    ):
+        """Constructor.
+
+        Keyword Arguments:
+            processor_pool {floor.controller.processor_pool.ProcessorPool} -- Builds and
+                keeps processors for the playlist.
+            processor_layer_cls {class} -- The `ProcessorRenderLayer` to render items'
+                processors with, eg a `floor.controller.render_worker.WorkerRenderLayer`.
+        """
         super(PlaylistRenderLayer, self).__init__()
         self.playlist_manager = playlist_manager
         self.all_processors = all_processors
@@ -110,7 +193,20 @@ class PlaylistRenderLayer(BaseRenderLayer):
 
         self.current_playlist_item = None
         self.current_processor = None
-        self.processor_render_layer = ProcessorRenderLayer()
+        self.processor_render_layer = processor_layer_cls()
+        self.processor_pool = processor_pool or ProcessorPool()
+        self.prewarmed_item = None
+
+        # The running transition, if any, and the previous item's processor.
+        self.transition = None
+        self.transition_start = None
+        self.transition_seconds = None
+        self.outgoing_render_layer = processor_layer_cls()
+        # The previous processor's last frame, once it's no longer rendered.
+        self.held_frame = None
+        self.mixer = TransitionMixer()
+        self.transition_frame = FrameBuffer()
+        self.timer = time.perf_counter
 
     def set_enabled(self, enabled):
         """Suspend/unsuspend the playlist when the layer is enabled/disabled."""
@@ -121,6 +217,11 @@ class PlaylistRenderLayer(BaseRenderLayer):
         elif not self.enabled and current_playlist.is_running():
             current_playlist.stop_playlist()
 
+    def set_frame_seconds(self, frame_seconds):
+        super(PlaylistRenderLayer, self).set_frame_seconds(frame_seconds)
+        self.processor_render_layer.set_frame_seconds(frame_seconds)
+        self.outgoing_render_layer.set_frame_seconds(frame_seconds)
+
     def on_ranged_value_change(self, num, val):
         return self.processor_render_layer.on_ranged_value_change(num, val)
 
@@ -130,13 +231,35 @@ class PlaylistRenderLayer(BaseRenderLayer):
     def get_processor_name(self):
         return self.processor_render_layer.get_processor_name()
 
+    def prepare(self, render_context):
+        current_playlist = self.playlist_manager.get_current_playlist()
+        if not current_playlist.is_running():
+            return
+        self._check_playlist(current_playlist, render_context)
+        if self.transition is None:
+            self.processor_render_layer.prepare(render_context)
+            return
+        progress = self._transition_progress(render_context)
+        if self.held_frame is None and progress < 1.0:
+            self.outgoing_render_layer.prepare(render_context)
+        if progress >= 0:
+            self.processor_render_layer.prepare(render_context)
+
     def render(self, render_context):
         current_playlist = self.playlist_manager.get_current_playlist()
+        self.changed = True
         if not current_playlist.is_running():
             return None
         self._check_playlist(current_playlist, render_context)
+        if self.transition is not None:
+            return self._render_transition(current_playlist, render_context)
+        return self._render_current(current_playlist, render_context)
+
+    def _render_current(self, playlist, render_context):
         try:
-            return self.processor_render_layer.render(render_context)
+            frame = self.processor_render_layer.render(render_context)
+            self.changed = self.processor_render_layer.changed
+            return frame
         except KeyboardInterrupt:
             raise
         except Exception:
@@ -144,8 +267,81 @@ class PlaylistRenderLayer(BaseRenderLayer):
                 "Error generating frame for processor {}".format(self.current_processor)
             )
             self.logger.warning("Removing processor due to error.")
-            current_playlist.remove(current_playlist.position)
+            self.processor_pool.discard(self.current_playlist_item)
+            playlist.remove(playlist.position)
+            # Nothing to transition from.
+            self.current_processor = None
+            self._end_transition()
+            return None
+
+    def _render_outgoing(self, render_context):
+        if self.held_frame is not None:
+            return self.held_frame
+        try:
+            return self.outgoing_render_layer.render(render_context)
+        except KeyboardInterrupt:
+            raise
+        except Exception:
+            self.logger.exception(
+                "Error generating frame for processor {}".format(
+                    self.outgoing_render_layer.get_processor()
+                )
+            )
+            return None
+
+    def _transition_progress(self, render_context):
+        if self.transition_seconds <= 0:
+            return 1.0
+        return (render_context.clock - self.transition_start) / self.transition_seconds
+
+    def _render_transition(self, playlist, render_context):
+        progress = self._transition_progress(render_context)
+        if progress >= 1.0:
+            self._end_transition()
+            return self._render_current(playlist, render_context)
+
+        started = self.timer()
+        outgoing = self._render_outgoing(render_context)
+        if outgoing is None:
+            self._end_transition()
+            return self._render_current(playlist, render_context)
+        if progress < 0:
+            # Waiting for the beat to start on.
+            self.changed = True
+            return outgoing
+
+        incoming = self._render_current(playlist, render_context)
+        if incoming is None:
             return None
+        geometry = render_context.geometry
+        if self.mixer.geometry != geometry:
+            self.mixer = TransitionMixer(geometry)
+            self.transition_frame = FrameBuffer(geometry.num_pixels)
+        frame = self.mixer.mix(
+            self.transition.kind, outgoing, incoming, progress, self.transition_frame
+        )
+        self.changed = True
+        self._check_transition_budget(self.timer() - started, outgoing)
+        return frame
+
+    def _check_transition_budget(self, elapsed, outgoing):
+        """Falls back to a cheaper transition if this one took too long to render."""
+        if (
+            not self.frame_seconds
+            or elapsed <= self.frame_seconds * self.TRANSITION_BUDGET_FRACTION
+        ):
+            return
+        if self.held_frame is None:
+            self.logger.info(
+                "Transition took {:.1f}ms, holding last frame of {}".format(
+                    elapsed * 1000, self.outgoing_render_layer.get_processor_name()
+                )
+            )
+            self.held_frame = outgoing.copy()
+            self.outgoing_render_layer.set_processor(None)
+        else:
+            self.logger.info("Transition took {:.1f}ms, cutting".format(elapsed * 1000))
+            self._end_transition()
 
     def _check_playlist(self, playlist, render_context):
         item = playlist.get_current()
@@ -154,22 +350,62 @@ class PlaylistRenderLayer(BaseRenderLayer):
 
         if item is not self.current_playlist_item:
             self.logger.debug("Loading playlist item {}".format(item))
-            self._set_current_item(item)
+            try:
+                self._set_current_item(item, render_context)
+            except KeyboardInterrupt:
+                raise
+            except Exception:
+                # Whether built now or prewarmed, the processor couldn't be created.
+                # Carry on with the current one until the next item loads.
+                self.logger.exception("Error loading playlist item {}".format(item))
+                self.logger.warning("Removing processor due to error.")
+                self.processor_pool.discard(item)
+                playlist.remove(playlist.position)
+                return
+        self._check_prewarm(playlist)
+
+    def _check_prewarm(self, playlist):
+        """Starts building the next item's processor, if the current item ends soon."""
+        if playlist.next_advance is None:
+            return
+        if playlist.next_advance - playlist.clocksource.time() > self.PREWARM_SECONDS:
+            return
+        next_item = playlist.peek_next()
+        if next_item is not None and next_item is not self.prewarmed_item:
+            self.prewarmed_item = next_item
+            self.processor_pool.prewarm(next_item)
+
+    def _set_current_item(self, item, render_context=None):
+        """Sets the active playlist item, starting its transition if it has one."""
+        previous_processor = self.current_processor
+        self.current_processor = self.processor_pool.get(item)
+        self.current_playlist_item = item
+
+        self._end_transition()
+        transition = item.transition
+        if not (
+            transition is None
+            or transition.kind == Transition.CUT
+            or render_context is None
+            or previous_processor is None
+            or previous_processor is self.current_processor
+        ):
+            self.transition = transition
+            self.transition_start = transition.get_start_time(
+                render_context.clock, render_context.downbeat, render_context.bpm
+            )
+            self.transition_seconds = transition.get_seconds(render_context.bpm)
+            # The layer rendering the previous processor carries on with it, so that
+            # nothing is lost if that's happening in another process.
+            self.outgoing_render_layer, self.processor_render_layer = (
+                self.processor_render_layer,
+                self.outgoing_render_layer,
+            )
 
-    def _set_current_item(self, item):
-        """Sets the active playlist item."""
-        self.current_processor = self._build_processor(item)
         self.processor_render_layer.set_processor(self.current_processor)
         self.logger.info("Started processor '{}'".format(self.current_processor))
-        self.current_playlist_item = item
 
-    def _build_processor(self, item):
-        """Builds a processor instance."""
-        processor_cls = item.processor_cls
-        processor_args = item.processor_args
-        try:
-            return processor_cls(**processor_args)
-        except Exception as e:
-            raise ValueError(
-                'Processor "{}" could not be created: {}'.format(processor_cls, str(e))
-            )
+    def _end_transition(self):
+        self.transition = None
+        self.held_frame = None
+        self.outgoing_render_layer.set_processor(None)
@@ -0,0 +1,174 @@
+from __future__ import absolute_import, division, print_function, unicode_literals
+
+import logging
+import math
+import time
+from builtins import object
+
+logger = logging.getLogger("scheduler")
+
+
+class FrameScheduler(object):
+    """Paces the render loop against absolute frame deadlines.
+
+    Frame `n` is due at `start + n * frame_seconds` on a monotonic clock, so a
+    frame that wakes up a little late doesn't push back every frame after it.
+    Waiting for a deadline sleeps until just before it, then spins for the last
+    `spin_seconds`, since `sleep()` routinely oversleeps by a fraction of a
+    millisecond.
+
+    When a frame finishes after its deadline, the next one starts right away,
+    and what happens then depends on the policy:
+
+        POLICY_DROP         -- Give up on any frames whose whole period has passed,
+                               aiming for the next deadline still in the future.
+        POLICY_SKIP_RENDER  -- Keep to every deadline, but skip rendering (just
+                               sending the previous frame to the hardware, and
+                               reading new weights) until caught up. If more than
+                               `MAX_CATCH_UP_FRAMES` behind, give up as for
+                               POLICY_DROP.
+    """
+
+    POLICY_DROP = "drop"
+    POLICY_SKIP_RENDER = "skip_render"
+    POLICIES = (POLICY_DROP, POLICY_SKIP_RENDER)
+    DEFAULT_POLICY = POLICY_DROP
+
+    # Spin for this long before each deadline, when using the real clock.
+    DEFAULT_SPIN_SECONDS = 0.0005
+
+    MAX_CATCH_UP_FRAMES = 8
+
+    def __init__(
+        self,
+        frame_seconds,
+        clocksource=time,
+        policy=DEFAULT_POLICY,
+        spin_seconds=None,
+        metrics=None,
+    ):
+        """Constructor.
+
+        Arguments:
+            frame_seconds {float} -- The period of a frame.
+
+        Keyword Arguments:
+            clocksource {object} -- An object with `.sleep()` and `.monotonic()` (or
+                `.time()`) methods (default: {time})
+            policy {str} -- What to do when falling behind; one of `POLICIES`.
+            spin_seconds {float} -- How long to spin before each deadline. Defaults to
+                `DEFAULT_SPIN_SECONDS` for the real clock, and 0 otherwise, since a fake
+                clock wouldn't advance while spinning.
+            metrics {floor.util.instrumentation.Metrics} -- Where to record late frames
+                and jitter, in addition to this object's counters.
+        """
+        if policy not in self.POLICIES:
+            raise ValueError("Unknown frame policy: {}".format(policy))
+        if spin_seconds is None:
+            spin_seconds = self.DEFAULT_SPIN_SECONDS if clocksource is time else 0.0
+
+        self.frame_seconds = frame_seconds
+        self.clocksource = clocksource
+        self.clock = getattr(clocksource, "monotonic", clocksource.time)
+        self.policy = policy
+        self.spin_seconds = spin_seconds
+        self.metrics = metrics
+
+        # The deadline for the current frame, or None before the first frame.
+        self.deadline = None
+        self.reset_counters()
+
+    def reset_counters(self):
+        self.frames = 0
+        # Frames that finished after their deadline.
+        self.late_frames = 0
+        # Frame slots skipped entirely, under POLICY_DROP.
+        self.dropped_frames = 0
+        # Frames sent without rendering, under POLICY_SKIP_RENDER.
+        self.skipped_renders = 0
+        # How late `wait()` returned after a deadline, in seconds.
+        self.max_jitter = 0.0
+        self.total_jitter = 0.0
+
+    def set_frame_seconds(self, frame_seconds):
+        self.frame_seconds = frame_seconds
+
+    def start_frame(self):
+        """Called at the start of every frame.
+
+        Returns:
+            bool -- Whether this frame should be rendered. False when behind under
+            POLICY_SKIP_RENDER.
+        """
+        now = self.clock()
+        if self.deadline is None:
+            self.deadline = now + self.frame_seconds
+            return True
+
+        if self.policy == self.POLICY_SKIP_RENDER and now > self.deadline:
+            self.skipped_renders += 1
+            if self.metrics:
+                self.metrics.increment("skipped_renders")
+            return False
+        return True
+
+    def wait(self):
+        """Waits until the current frame's deadline, and moves on to the next one."""
+        if self.deadline is None:
+            self.start_frame()
+
+        self.frames += 1
+        deadline = self.deadline
+        now = self.clock()
+
+        if now > deadline:
+            self.on_late(now, deadline)
+            return
+
+        remaining = deadline - now
+        if remaining > self.spin_seconds:
+            self.clocksource.sleep(remaining - self.spin_seconds)
+        now = self.clock()
+        while now < deadline:
+            now = self.clock()
+
+        jitter = now - deadline
+        self.total_jitter += jitter
+        self.max_jitter = max(self.max_jitter, jitter)
+        if self.metrics:
+            self.metrics.record("jitter", int(jitter * 1e9))
+
+        self.deadline = deadline + self.frame_seconds
+
+    def on_late(self, now, deadline):
+        late = now - deadline
+        self.late_frames += 1
+        if self.metrics:
+            self.metrics.increment("overruns")
+            self.metrics.record("overrun", int(late * 1e9))
+        logger.debug("Over by {}".format(late))
+
+        missed = int(math.floor(late / self.frame_seconds))
+        if self.policy == self.POLICY_SKIP_RENDER and missed <= self.MAX_CATCH_UP_FRAMES:
+            # Run the next frame right away; `start_frame` will skip rendering it.
+            self.deadline = deadline + self.frame_seconds
+            return
+
+        self.dropped_frames += missed
+        if self.metrics and missed:
+            self.metrics.increment("dropped_frames", missed)
+
+        # Stay on the same grid of deadlines: start the next frame right away,
+        # aiming for the next deadline that hasn't passed yet.
+        self.deadline = deadline + (missed + 1) * self.frame_seconds
+
+    def to_object(self):
+        return {
+            "policy": self.policy,
+            "frames": self.frames,
+            "late_frames": self.late_frames,
+            "dropped_frames": self.dropped_frames,
+            "skipped_renders": self.skipped_renders,
+            "mean_jitter_ns": int(self.total_jitter / max(1, self.frames - self.late_frames) * 1e9),
+            "max_jitter_ns": int(self.max_jitter * 1e9),
+        }
@@ -0,0 +1,112 @@
+from __future__ import absolute_import, division, print_function, unicode_literals
+
+from builtins import object, range
+from unittest import TestCase
+
+from floor.controller.scheduler import FrameScheduler
+from floor.util.fake_clock import FakeClock
+from floor.util.instrumentation import Metrics
+
+
+class OversleepingClock(FakeClock):
+    """A fake clock whose `sleep()` always wakes up late."""
+
+    def __init__(self, oversleep):
+        super(OversleepingClock, self).__init__()
+        self.oversleep = oversleep
+        self.reads = 0
+
+    def sleep(self, seconds):
+        self.advance(seconds + self.oversleep)
+
+    def monotonic(self):
+        # Time passes a little on every read, so spinning finishes.
+        self.reads += 1
+        self.now += 0.00001
+        return self.now
+
+
+class FrameSchedulerTest(TestCase):
+    def setUp(self):
+        self.clock = FakeClock(start=100.0)
+        self.metrics = Metrics(enabled=True)
+
+    def new_scheduler(self, **kwargs):
+        return FrameScheduler(0.01, clocksource=self.clock, metrics=self.metrics, **kwargs)
+
+    def run_frames(self, scheduler, work_seconds):
+        rendered = []
+        for seconds in work_seconds:
+            rendered.append(scheduler.start_frame())
+            self.clock.advance(seconds)
+            scheduler.wait()
+        return rendered
+
+    def test_deadlines_do_not_drift(self):
+        scheduler = self.new_scheduler()
+        self.run_frames(scheduler, [0.001, 0.004, 0.009, 0.0] * 25)
+        self.assertAlmostEqual(101.0, self.clock.now)
+        self.assertEqual(0, scheduler.late_frames)
+        self.assertEqual(0.0, scheduler.max_jitter)
+
+    def test_unknown_policy(self):
+        with self.assertRaises(ValueError):
+            self.new_scheduler(policy="panic")
+
+    def test_drop_policy(self):
+        scheduler = self.new_scheduler()
+        rendered = self.run_frames(scheduler, [0.001, 0.035, 0.001, 0.001])
+        self.assertEqual([True] * 4, rendered)
+        self.assertEqual(1, scheduler.late_frames)
+        self.assertEqual(2, scheduler.dropped_frames)
+        # Still on the original grid of deadlines: 2 frames on time, 1 late and
+        # 2 dropped, then 2 more.
+        self.assertAlmostEqual(100.06, self.clock.now)
+
+        counters = self.metrics.to_object()["counters"]
+        self.assertEqual(1, counters["overruns"])
+        self.assertEqual(2, counters["dropped_frames"])
+
+    def test_slightly_late_frame_catches_up(self):
+        scheduler = self.new_scheduler()
+        self.run_frames(scheduler, [0.012, 0.001, 0.001])
+        self.assertEqual(1, scheduler.late_frames)
+        self.assertEqual(0, scheduler.dropped_frames)
+        self.assertAlmostEqual(100.03, self.clock.now)
+
+    def test_skip_render_policy(self):
+        scheduler = self.new_scheduler(policy=FrameScheduler.POLICY_SKIP_RENDER)
+        rendered = self.run_frames(scheduler, [0.001, 0.025, 0.001, 0.001, 0.001, 0.001])
+        self.assertEqual([True, True, False, True, True, True], rendered)
+        self.assertEqual(1, scheduler.skipped_renders)
+        self.assertEqual(0, scheduler.dropped_frames)
+        self.assertAlmostEqual(100.06, self.clock.now)
+
+    def test_skip_render_gives_up_when_far_behind(self):
+        scheduler = self.new_scheduler(policy=FrameScheduler.POLICY_SKIP_RENDER)
+        rendered = self.run_frames(scheduler, [0.001, 0.505, 0.001])
+        self.assertEqual([True, True, True], rendered)
+        self.assertEqual(49, scheduler.dropped_frames)
+
+    def test_spins_after_oversleeping_sleep(self):
+        clock = OversleepingClock(oversleep=0.0)
+        scheduler = FrameScheduler(0.01, clocksource=clock, spin_seconds=0.002)
+        scheduler.start_frame()
+        deadline = scheduler.deadline
+        scheduler.wait()
+        # Slept until 2ms before the deadline, then spun.
+        self.assertTrue(clock.reads > 100)
+        self.assertTrue(deadline <= clock.now < deadline + 0.0001)
+
+    def test_jitter(self):
+        clock = OversleepingClock(oversleep=0.003)
+        scheduler = FrameScheduler(0.01, clocksource=clock, spin_seconds=0.0)
+        for _ in range(3):
+            scheduler.start_frame()
+            scheduler.wait()
+        self.assertTrue(0.003 <= scheduler.max_jitter < 0.0031)
+        self.assertEqual(3, scheduler.to_object()["frames"])
+
+    def test_real_clock_spins_by_default(self):
+        self.assertEqual(FrameScheduler.DEFAULT_SPIN_SECONDS, FrameScheduler(0.01).spin_seconds)
+        self.assertEqual(0.0, self.new_scheduler().spin_seconds)
@@ -0,0 +1,123 @@
+"""
+Transitions between playlist items.
+
+A playlist item can say how it takes over from the item before it, with a
+`transition` field in the playlist JSON: either just a type, eg
+`"crossfade"`, or an object such as
+
+    {"type": "wipe", "beats": 4, "quantize": true}
+
+which wipes in the new item over four beats, starting on the next beat.
+While a transition runs, both items' processors render, and their frames are
+mixed with whole-frame numpy operations.
+"""
+
+from __future__ import absolute_import, division
+
+import math
+from builtins import object
+
+import numpy as np
+
+from floor.util.geometry import DEFAULT_GEOMETRY
+
+
+class Transition(object):
+    CUT = "cut"
+    CROSSFADE = "crossfade"
+    WIPE = "wipe"
+    TYPES = (CUT, CROSSFADE, WIPE)
+
+    DEFAULT_SECONDS = 1.0
+
+    def __init__(self, kind=CROSSFADE, seconds=None, beats=None, quantize=False):
+        """Constructor.
+
+        Keyword Arguments:
+            kind {str} -- One of `TYPES`.
+            seconds {float} -- How long the transition takes.
+            beats {float} -- How long the transition takes, in beats. Takes precedence
+                over `seconds`.
+            quantize {bool} -- Whether to hold off starting until the next beat.
+        """
+        if kind not in self.TYPES:
+            raise ValueError('Unknown transition type "{}"'.format(kind))
+        self.kind = kind
+        self.seconds = float(seconds) if seconds is not None else None
+        self.beats = float(beats) if beats is not None else None
+        self.quantize = bool(quantize)
+
+    @classmethod
+    def from_object(cls, obj):
+        if obj is None:
+            return None
+        if not isinstance(obj, dict):
+            return cls(obj)
+        return cls(
+            obj.get("type", cls.CROSSFADE),
+            seconds=obj.get("seconds"),
+            beats=obj.get("beats"),
+            quantize=obj.get("quantize", False),
+        )
+
+    def to_object(self):
+        obj = {"type": self.kind}
+        if self.seconds is not None:
+            obj["seconds"] = self.seconds
+        if self.beats is not None:
+            obj["beats"] = self.beats
+        if self.quantize:
+            obj["quantize"] = True
+        return obj
+
+    def get_seconds(self, bpm):
+        """Returns how long the transition takes at `bpm`."""
+        if self.beats is not None:
+            return self.beats * 60.0 / (bpm or 120.0)
+        if self.seconds is not None:
+            return self.seconds
+        return self.DEFAULT_SECONDS
+
+    def get_start_time(self, now, downbeat, bpm):
+        """Returns when a transition asked for at `now` should start."""
+        if not self.quantize:
+            return now
+        beat_seconds = 60.0 / (bpm or 120.0)
+        beats = math.ceil((now - (downbeat or 0.0)) / beat_seconds - 1e-9)
+        return (downbeat or 0.0) + beats * beat_seconds
+
+
+class TransitionMixer(object):
+    """Mixes an outgoing and incoming frame according to a transition's progress."""
+
+    def __init__(self, geometry=DEFAULT_GEOMETRY):
+        self.geometry = geometry
+        # How far along the wipe each pixel's row is, on (0, 1].
+        self.wipe_positions = (geometry.ys + 1) / float(geometry.rows)
+
+    def mix(self, kind, outgoing, incoming, progress, out):
+        """Writes the mix of `outgoing` and `incoming` frames into `out`.
+
+        Arguments:
+            kind {str} -- The type of transition.
+            outgoing {FrameBuffer} -- The frame being transitioned from.
+            incoming {FrameBuffer} -- The frame being transitioned to.
+            progress {float} -- How far along the transition is, on [0, 1].
+            out {FrameBuffer} -- Where to write the result.
+        """
+        progress = min(1.0, max(0.0, progress))
+        if kind == Transition.CROSSFADE:
+            np.multiply(outgoing.rgb, 1.0 - progress, out=out.rgb)
+            out.rgb += incoming.rgb * progress
+            np.multiply(outgoing.alpha, 1.0 - progress, out=out.alpha)
+            out.alpha += incoming.alpha * progress
+        elif kind == Transition.WIPE:
+            incoming_pixels = self.wipe_positions <= progress
+            np.copyto(out.rgb, outgoing.rgb)
+            np.copyto(out.rgb, incoming.rgb, where=incoming_pixels[:, np.newaxis])
+            np.copyto(out.alpha, outgoing.alpha)
+            np.copyto(out.alpha, incoming.alpha, where=incoming_pixels)
+        else:
+            np.copyto(out.rgb, incoming.rgb)
+            np.copyto(out.alpha, incoming.alpha)
+        return out
@@ -0,0 +1,146 @@
+from __future__ import absolute_import, division, print_function, unicode_literals
+
+from unittest import TestCase
+
+import numpy as np
+
+from floor.controller.playlist import Playlist, PlaylistItem, PlaylistManager
+from floor.controller.processor_pool import InlineExecutor, ProcessorPool
+from floor.controller.rendering import PlaylistRenderLayer
+from floor.controller.transitions import Transition, TransitionMixer
+from floor.processor import all_processors
+from floor.processor.base import Base as BaseProcessor
+from floor.processor.base import RenderContext
+from floor.util.fake_clock import FakeClock
+from floor.util.frame_buffer import FrameBuffer
+
+
+class SolidTransitionProcessor(BaseProcessor):
+    def __init__(self, **kwargs):
+        self.color = kwargs.pop("color", 0)
+        super(SolidTransitionProcessor, self).__init__(**kwargs)
+        self.frames = 0
+
+    def get_next_frame(self, context):
+        self.frames += 1
+        return [(self.color, 0, 0)] * 64
+
+
+class TransitionTest(TestCase):
+    def test_from_object(self):
+        self.assertIsNone(Transition.from_object(None))
+        self.assertEqual(Transition.WIPE, Transition.from_object("wipe").kind)
+
+        transition = Transition.from_object({"beats": 4, "quantize": True})
+        self.assertEqual(Transition.CROSSFADE, transition.kind)
+        self.assertEqual(2.0, transition.get_seconds(120))
+        self.assertEqual(
+            {"type": "crossfade", "beats": 4.0, "quantize": True}, transition.to_object()
+        )
+
+        with self.assertRaises(ValueError):
+            Transition.from_object("dissolve")
+
+    def test_get_seconds(self):
+        self.assertEqual(Transition.DEFAULT_SECONDS, Transition().get_seconds(120))
+        self.assertEqual(3.0, Transition(seconds=3).get_seconds(120))
+        self.assertEqual(1.0, Transition(seconds=3, beats=2).get_seconds(120))
+
+    def test_get_start_time(self):
+        self.assertEqual(10.2, Transition().get_start_time(10.2, 0.1, 120))
+        quantized = Transition(quantize=True)
+        self.assertAlmostEqual(10.6, quantized.get_start_time(10.2, 0.1, 120))
+        self.assertAlmostEqual(10.1, quantized.get_start_time(10.1, 0.1, 120))
+
+
+class TransitionMixerTest(TestCase):
+    def setUp(self):
+        self.mixer = TransitionMixer()
+        self.outgoing = FrameBuffer()
+        self.outgoing.fill((100, 0, 0))
+        self.incoming = FrameBuffer()
+        self.incoming.fill((0, 200, 0), alpha=0.5)
+        self.out = FrameBuffer()
+
+    def test_crossfade(self):
+        self.mixer.mix(Transition.CROSSFADE, self.outgoing, self.incoming, 0.25, self.out)
+        np.testing.assert_allclose([75, 50, 0], self.out.rgb[0])
+        np.testing.assert_allclose(0.875, self.out.alpha)
+
+    def test_wipe(self):
+        self.mixer.mix(Transition.WIPE, self.outgoing, self.incoming, 0.25, self.out)
+        # The first two rows are wiped in.
+        self.assertEqual((0, 200, 0), self.out[15])
+        self.assertEqual((100, 0, 0), self.out[16])
+        self.assertEqual(0.5, self.out.alpha[0])
+        self.assertEqual(1.0, self.out.alpha[63])
+
+    def test_cut(self):
+        self.mixer.mix(Transition.CUT, self.outgoing, self.incoming, 0.25, self.out)
+        self.assertEqual((0, 200, 0), self.out[63])
+
+
+class PlaylistTransitionTest(TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.playlist = Playlist(
+            "Test",
+            items=[
+                PlaylistItem(SolidTransitionProcessor, duration=10, processor_args={"color": 100}),
+                PlaylistItem(
+                    SolidTransitionProcessor,
+                    duration=10,
+                    processor_args={"color": 200},
+                    transition=Transition(seconds=1.0),
+                ),
+            ],
+            clocksource=self.clock,
+        )
+        pool = ProcessorPool(executor=InlineExecutor())
+        self.layer = PlaylistRenderLayer(PlaylistManager(self.playlist), all_processors(), pool)
+        self.layer.set_frame_seconds(1.0 / 100)
+        self.elapsed = 0.0
+        self.now = 0.0
+
+        def timer():
+            self.now += self.elapsed
+            return self.now
+
+        self.layer.timer = timer
+
+    def render(self):
+        context = RenderContext(self.clock.time(), 0, [0] * 64, 120, [0] * 4, [False] * 4)
+        return self.layer.render(context)
+
+    def test_crossfade(self):
+        self.assertEqual((100, 0, 0), self.render()[0])
+        self.clock.advance(10.5)
+        self.assertEqual((100, 0, 0), self.render()[0])
+        self.clock.advance(0.25)
+        self.assertEqual((125, 0, 0), self.render()[0])
+        self.clock.advance(0.5)
+        self.assertEqual((175, 0, 0), self.render()[0])
+        self.clock.advance(0.25)
+        self.assertEqual((200, 0, 0), self.render()[0])
+        self.assertIsNone(self.layer.transition)
+
+    def test_over_budget(self):
+        self.render()
+        outgoing = self.layer.current_processor
+        self.clock.advance(10.5)
+        self.render()
+
+        # Over budget: the outgoing processor stops rendering, and its last frame is mixed in.
+        self.elapsed = 0.008
+        self.clock.advance(0.5)
+        self.assertEqual((150, 0, 0), self.render()[0])
+        rendered = outgoing.frames
+        self.clock.advance(0.25)
+        self.assertEqual((175, 0, 0), self.render()[0])
+        self.assertEqual(rendered, outgoing.frames)
+
+        # Still over budget: cut.
+        self.clock.advance(0.01)
+        self.render()
+        self.assertIsNone(self.layer.transition)
+        self.assertEqual((200, 0, 0), self.render()[0])
@@ -1,26 +1,76 @@
-from builtins import object, range
+from builtins import object
 
 from floor.controller import Layout
+from floor.util.frame_buffer import FrameBuffer
+from floor.util.geometry import DEFAULT_GEOMETRY
 
 
 class Base(object):
+    # When the LEDs haven't changed, resend them at least this often, in seconds.  None
+    # sends every frame.  Can be overridden with the `keepalive_seconds` driver arg.
+    KEEPALIVE_SECONDS = None
+
     def __init__(self, driver_args):
         self.weights = []
-        self.leds = [[0, 0, 0, 0] for _ in range(64)]
         self.args = driver_args
         self.layout = None
+        # The part of the floor this driver looks after, if not all of it; picked from the
+        # layout's shards by the `shard` driver arg.
+        self.shard = None
+        self.geometry = DEFAULT_GEOMETRY
+        self.leds = FrameBuffer(self.geometry.num_pixels)
+
+        self.keepalive_seconds = driver_args.get("keepalive_seconds", self.KEEPALIVE_SECONDS)
+        # Whether `leds` has been set since the last send.
+        self.dirty = True
+        self.last_send_time = None
 
     def init_layout(self, layout_name=None):
-        if layout_name:
-            self.layout = Layout(config_dir=self.args.config_dir, config_name=layout_name)
+        """
+        Sets the floor layout, sizing the driver for it, or for its shard of it
+        :param layout_name: A `Layout`, or the name of one; probes the floor if not given
+        :return:
+        """
+        if isinstance(layout_name, Layout):
+            self.layout = layout_name
+        elif layout_name:
+            self.layout = Layout(config_dir=self.args["config_dir"], config_name=layout_name)
         else:
             num_squares = self.probe_floor()
             self.layout = Layout.from_squares(
                 config_dir=self.args["config_dir"], num_squares=num_squares
             )
+        shard_name = self.args.get("shard")
+        if shard_name:
+            self.shard = self.layout.get_shard(shard_name)
+            self.set_geometry(self.shard.geometry)
+        else:
+            self.shard = None
+            self.set_geometry(self.layout.geometry)
+
+    def set_geometry(self, geometry):
+        """
+        Sizes the driver for a floor of the given shape
+        :param geometry: A `floor.util.geometry.Geometry`
+        :return:
+        """
+        self.geometry = geometry
+        self.leds = FrameBuffer(geometry.num_pixels)
+        self.dirty = True
+
+    def get_tile_order(self, geometry):
+        """
+        Returns the order in which the tiles of a floor of the given shape are chained
+        together: the layout's, if it's the whole floor, or pod by pod
+        :param geometry: A `floor.util.geometry.Geometry`
+        :return: A list of pixel indices
+        """
+        if self.shard is None and self.layout is not None and geometry == self.layout.geometry:
+            return self.layout.tile_order()
+        return geometry.chain_order()
 
     def probe_floor(self):
-        return 64
+        return self.geometry.num_pixels
 
     def get_weights(self):
         """
@@ -30,13 +80,43 @@ class Base(object):
         """
         return self.weights
 
+    def get_pressures(self):
+        """
+        Returns the last retrieved list of pressure values.
+
+        Pressures are a float between 0.0 (not stepped on) and 1.0 (hardest step seen). Drivers
+        without analog sensors report their weights.
+        """
+        return self.get_weights()
+
     def set_leds(self, values):
         """
-        Set a list of LED objects representing the next set of color values
-        :param values:
+        Set the next set of color values
+        :param values: A FrameBuffer, or a list of (r, g, b) tuples
+        :return:
+        """
+        self.leds = FrameBuffer.coerce(values)
+        self.dirty = True
+
+    def needs_send(self, now):
+        """
+        Whether `send_data` should be called: when the LEDs have changed since the last
+        send, or when the last send was over `keepalive_seconds` ago
+        :param now: The current time
         :return:
         """
-        self.leds = values
+        if self.dirty or self.keepalive_seconds is None or self.last_send_time is None:
+            return True
+        return now - self.last_send_time >= self.keepalive_seconds
+
+    def mark_sent(self, now):
+        """
+        Record that the current LEDs were sent
+        :param now: The current time
+        :return:
+        """
+        self.dirty = False
+        self.last_send_time = now
 
     def test_support(self):
         """
@@ -58,3 +138,10 @@ class Base(object):
         :return:
         """
         pass
+
+    def close(self):
+        """
+        Overridden by driver; releases anything the driver holds when the show stops
+        :return:
+        """
+        pass
@@ -0,0 +1,63 @@
+import logging
+
+from floor.driver.base import Base
+from floor.util.frame_file import FrameFileWriter
+
+logger = logging.getLogger("capture")
+
+
+class Capture(Base):
+    """Writes every frame sent to it to a frame file; see `floor.util.frame_file`.
+
+    Driver args:
+        filename -- The file to write (default: `DEFAULT_FILENAME`).
+        fps -- The frame rate the show runs at (default: `DEFAULT_FPS`).
+        bpm -- The tempo the show starts at, recorded in the file.
+
+    Weights are whatever was last passed to `set_inputs`, eg by the offline renderer.
+    """
+
+    DEFAULT_FILENAME = "capture.frames"
+    DEFAULT_FPS = 120
+
+    def __init__(self, args):
+        super(Capture, self).__init__(args)
+        self.weights = [0] * self.geometry.num_pixels
+        self.pressures = None
+        self.filename = args.get("filename", self.DEFAULT_FILENAME)
+        self.fps = args.get("fps", self.DEFAULT_FPS)
+        self.bpm = args.get("bpm", 0.0)
+        self.writer = None
+        logger.info("Capturing frames to {}".format(self.filename))
+
+    def set_geometry(self, geometry):
+        super(Capture, self).set_geometry(geometry)
+        self.weights = [0] * geometry.num_pixels
+
+    def set_inputs(self, weights, pressures=None):
+        """Sets the weights (and optionally pressures) to report from now on."""
+        self.weights = weights
+        self.pressures = pressures
+
+    def get_pressures(self):
+        if self.pressures is None:
+            return self.get_weights()
+        return self.pressures
+
+    def needs_send(self, now):
+        # Every frame is written, changed or not, to keep the file in step with the clock.
+        return True
+
+    def get_writer(self):
+        # Opened on the first frame, once the size of the floor is settled.
+        if self.writer is None:
+            self.writer = FrameFileWriter(
+                self.filename, fps=self.fps, num_pixels=len(self.leds), bpm=self.bpm
+            )
+        return self.writer
+
+    def send_data(self):
+        self.get_writer().write(self.leds)
+
+    def close(self):
+        self.get_writer().close()
@@ -1,10 +1,7 @@
-from builtins import map
-
 from gevent import monkey
 
 monkey.patch_all()
 
-import collections
 import json
 import logging
 import os
@@ -13,13 +10,14 @@ import time
 
 logger = logging.getLogger("devserver")
 
-import gevent
 from flask import Flask, render_template, request
 from flask_sock import Sock
 from gevent.pywsgi import WSGIServer
 
 from floor.driver.base import Base
-from floor.processor.constants import COLOR_MAXIMUM
+from floor.driver.preview import PreviewClient, PreviewFrame
+from floor.util.frame_codec import to_rgb8
+from floor.util.geometry import DEFAULT_GEOMETRY
 
 BASE_DIR = os.path.dirname(os.path.realpath(__file__))
 TEMPLATE_DIR = os.path.join(BASE_DIR, "devserver")
@@ -27,34 +25,43 @@ TEMPLATE_DIR = os.path.join(BASE_DIR, "devserver")
 app = Flask(__name__, root_path=BASE_DIR, template_folder=TEMPLATE_DIR)
 sockets_app = Sock(app)
 
-WAITER = gevent.event.Event()
-MESSAGE_QUEUE = collections.deque()
-SOCKETS = set()
+# Each connected socket's `PreviewClient`.
+CLIENTS = {}
 
-FAKE_WEIGHTS = [0] * 64
+# The floor being shown; see `Devserver.set_geometry`.
+GEOMETRY = DEFAULT_GEOMETRY
+# When each tile was last clicked.
+FAKE_WEIGHTS = [0] * GEOMETRY.num_pixels
 WEIGHT_ON_SECONDS = 1.0
 
 
 @sockets_app.route("/events")
 def echo_socket(ws):
     logger.info("Socket connected: {}".format(ws))
-    SOCKETS.add(ws)
+    client = PreviewClient(ws)
+    CLIENTS[ws] = client
+    client.start()
     try:
-        while ws.connected:
-            message = ws.receive()
+        # Wakes up now and then to notice if the client was disconnected for stalling.
+        while ws.connected and client.connected:
+            message = ws.receive(timeout=PreviewClient.SEND_TIMEOUT_SECONDS)
             if not message:
                 continue
             try:
                 message = json.loads(message)
             except ValueError:
                 logger.warning('Ignoring unparseable JSON message: "{}"'.format(message))
+                continue
             logger.info("Got message: {}".format(message))
-            if message.get("event") == "click":
+            if message.get("event") == "hello":
+                client.negotiate(message.get("payload", {}))
+            elif message.get("event") == "click":
                 pixel = message.get("payload", {}).get("pixel", None)
-                if pixel is not None and pixel <= 64 and pixel >= 0:
+                if pixel is not None and 0 <= pixel < len(FAKE_WEIGHTS):
                     FAKE_WEIGHTS[pixel] = time.time()
     finally:
-        SOCKETS.remove(ws)
+        del CLIENTS[ws]
+        client.close()
     logger.info("Socket disconnected.")
 
 
@@ -63,27 +70,18 @@ def devserver_main():
     # "Embedded" mode means the devserver is being shown in an iframe, eg
     # from the control server. The template will hide some things in this mode.
     is_embedded = request.args.get("is_embedded", "") == "true"
-    return render_template("index.html", is_embedded=is_embedded)
-
+    return render_template(
+        "index.html", is_embedded=is_embedded, rows=GEOMETRY.rows, cols=GEOMETRY.cols
+    )
 
-def sender():
-    while True:
-        WAITER.wait()
-        WAITER.clear()
-        while MESSAGE_QUEUE:
-            message = json.dumps(MESSAGE_QUEUE.popleft())
-            for socket in SOCKETS:
-                socket.send(message)
 
-
-def _broadcast(message):
-    MESSAGE_QUEUE.append(message)
-    WAITER.set()
+def _broadcast(frame):
+    for client in list(CLIENTS.values()):
+        client.offer(frame)
 
 
 def serve_forever(port=1979):
     logger.info("Starting devserver on port {}".format(port))
-    gevent.spawn(sender)
     server = WSGIServer(("", port), app)
     server.serve_forever()
 
@@ -91,25 +89,26 @@ def serve_forever(port=1979):
 class Devserver(Base):
     """Floor driver interface."""
 
+    # Browsers only need unchanged frames resent occasionally, eg after reconnecting.
+    KEEPALIVE_SECONDS = 1.0
+
     def __init__(self, args):
         super(Devserver, self).__init__(args)
-        self.weights = [0] * 64
+        self.weights = [0] * self.geometry.num_pixels
         self.thr = threading.Thread(target=serve_forever)
         self.thr.daemon = True
         self.thr.start()
 
-    @classmethod
-    def rescale_color_value(cls, color_value):
-        """Convert processor pixels to CSS-compatible values on [0, 256)."""
-        return (color_value / float(COLOR_MAXIMUM)) * 256.0
+    def set_geometry(self, geometry):
+        global GEOMETRY
+        super(Devserver, self).set_geometry(geometry)
+        GEOMETRY = geometry
+        FAKE_WEIGHTS[:] = [0] * geometry.num_pixels
+        self.weights = [0] * geometry.num_pixels
 
     def send_data(self):
-        leds = [list(map(self.rescale_color_value, pixel)) for pixel in self.leds]
-        message = {
-            "event": "leds",
-            "payload": leds,
-        }
-        _broadcast(message)
+        # A new array every frame, since clients' encoders hold on to the last one sent.
+        _broadcast(PreviewFrame(to_rgb8(self.leds)))
 
     def read_data(self):
         pass
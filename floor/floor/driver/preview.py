@@ -0,0 +1,158 @@
+"""
+Browsers previewing the floor from the devserver.
+
+Each `PreviewClient` sends frames from a greenlet of its own, and only ever
+holds the latest frame it hasn't sent yet. Offering a client a frame never
+blocks, so the render loop doesn't pay for slow viewers, and a viewer that
+falls behind skips frames rather than queueing them up. Clients that stop
+accepting frames altogether are disconnected.
+"""
+
+from __future__ import absolute_import, division
+
+import json
+import logging
+import time
+from builtins import object
+
+import gevent
+import gevent.event
+
+from floor.util.frame_codec import FrameEncoder
+
+logger = logging.getLogger("devserver")
+
+# Frame protocols, in order of preference. Browsers say which they understand when they
+# connect, and get JSON until then.
+BINARY = "binary"
+JSON = "json"
+PROTOCOLS = [BINARY, JSON]
+
+
+class StalledClient(Exception):
+    """A client took too long to accept a frame."""
+
+
+class PreviewFrame(object):
+    """A frame of RGB8 pixels, shared by every client it's sent to."""
+
+    def __init__(self, rgb8):
+        """Constructor.
+
+        Arguments:
+            rgb8 {numpy.ndarray} -- The pixels, from `floor.util.frame_codec.to_rgb8`.
+        """
+        self.rgb8 = rgb8
+        self.json = None
+
+    def to_json(self):
+        """Returns the frame as a JSON message, encoding it the first time it's asked for."""
+        if self.json is None:
+            self.json = json.dumps({"event": "leds", "payload": self.rgb8.tolist()})
+        return self.json
+
+
+class PreviewClient(object):
+    """A connected browser."""
+
+    # The most frames per second a client may ask for, and what it gets if it doesn't.
+    MAX_FPS = 120
+    # Clients that take longer than this to accept a message are disconnected.
+    SEND_TIMEOUT_SECONDS = 5.0
+
+    def __init__(self, ws, clock=time.time):
+        """Constructor.
+
+        Arguments:
+            ws {simple_websocket.Server} -- The client's socket.
+
+        Keyword Arguments:
+            clock {callable} -- Returns the current time, in seconds.
+        """
+        self.ws = ws
+        self.clock = clock
+        self.protocol = JSON
+        self.encoder = FrameEncoder()
+        self.frame_seconds = 1.0 / self.MAX_FPS
+        self.connected = True
+        # The latest frame not yet sent, and a reply to the client's hello.
+        self.pending = None
+        self.hello = None
+        self.ready = gevent.event.Event()
+        self.last_send_time = None
+        self.greenlet = None
+
+    def start(self):
+        self.greenlet = gevent.spawn(self.run)
+
+    def negotiate(self, payload):
+        """Handles the client's hello: picks the best of the protocols it understands,
+        and the frame rate it asked for.
+        """
+        protocols = payload.get("protocols", [])
+        self.protocol = next((p for p in PROTOCOLS if p in protocols), JSON)
+        try:
+            fps = min(max(float(payload.get("fps", self.MAX_FPS)), 1.0), self.MAX_FPS)
+        except (TypeError, ValueError):
+            fps = self.MAX_FPS
+        self.frame_seconds = 1.0 / fps
+        self.encoder.reset()
+        self.hello = json.dumps(
+            {"event": "hello", "payload": {"protocol": self.protocol, "fps": fps}}
+        )
+        self.ready.set()
+
+    def offer(self, frame):
+        """Queues `frame` to be sent, replacing any frame still waiting. Never blocks."""
+        if not self.connected:
+            return
+        self.pending = frame
+        self.ready.set()
+
+    def run(self):
+        try:
+            while self.connected:
+                self.ready.wait()
+                self.ready.clear()
+                if self.hello is not None:
+                    hello, self.hello = self.hello, None
+                    self.send(hello)
+                if self.pending is None:
+                    continue
+
+                # Frames that arrive while we wait replace the one we were going to send.
+                if self.last_send_time is not None:
+                    delay = self.last_send_time + self.frame_seconds - self.clock()
+                    if delay > 0:
+                        gevent.sleep(delay)
+                frame, self.pending = self.pending, None
+                if frame is None:
+                    continue
+                self.last_send_time = self.clock()
+                if self.protocol == BINARY:
+                    self.send(self.encoder.encode(frame.rgb8))
+                else:
+                    self.send(frame.to_json())
+        except StalledClient:
+            logger.warning("Disconnecting stalled client {}".format(self.ws))
+        except Exception as e:
+            logger.info("Client {} disconnected: {}".format(self.ws, e))
+        finally:
+            self.close()
+
+    def send(self, message):
+        with gevent.Timeout(self.SEND_TIMEOUT_SECONDS, StalledClient):
+            self.ws.send(message)
+
+    def close(self):
+        """Stops sending frames, and closes the socket."""
+        if not self.connected:
+            return
+        self.connected = False
+        self.pending = None
+        self.ready.set()
+        try:
+            with gevent.Timeout(self.SEND_TIMEOUT_SECONDS, StalledClient):
+                self.ws.close()
+        except Exception:
+            pass
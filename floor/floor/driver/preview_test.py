@@ -0,0 +1,90 @@
+from __future__ import absolute_import, division, print_function, unicode_literals
+
+import json
+from builtins import object
+from unittest import TestCase
+
+import gevent
+import numpy as np
+
+from floor.driver.preview import BINARY, JSON, PreviewClient, PreviewFrame
+from floor.util.frame_codec import decode
+
+
+class FakeSocket(object):
+    def __init__(self, send_seconds=0):
+        self.send_seconds = send_seconds
+        self.sent = []
+        self.closed = False
+
+    def send(self, message):
+        gevent.sleep(self.send_seconds)
+        self.sent.append(message)
+
+    def close(self):
+        self.closed = True
+
+
+def frame(value):
+    return PreviewFrame(np.full((64, 3), value, dtype=np.uint8))
+
+
+class PreviewClientTest(TestCase):
+    def start_client(self, ws):
+        client = PreviewClient(ws)
+        client.start()
+        self.addCleanup(client.close)
+        return client
+
+    def test_sends_latest_frame(self):
+        ws = FakeSocket()
+        client = self.start_client(ws)
+        client.offer(frame(1))
+        client.offer(frame(2))
+        gevent.sleep(0.01)
+        self.assertEqual(1, len(ws.sent))
+        self.assertEqual([2, 2, 2], json.loads(ws.sent[0])["payload"][0])
+
+    def test_negotiation(self):
+        ws = FakeSocket()
+        client = self.start_client(ws)
+        client.negotiate({"protocols": ["json", "binary"], "fps": 1000})
+        client.offer(frame(3))
+        gevent.sleep(0.01)
+        hello = json.loads(ws.sent[0])["payload"]
+        self.assertEqual({"protocol": BINARY, "fps": PreviewClient.MAX_FPS}, hello)
+        self.assertEqual([3, 3, 3], decode(ws.sent[1])[0].tolist())
+
+        client.negotiate({"protocols": ["smoke-signals"]})
+        self.assertEqual(JSON, client.protocol)
+
+    def test_frame_rate(self):
+        ws = FakeSocket()
+        client = self.start_client(ws)
+        client.negotiate({"fps": 10})
+        client.offer(frame(1))
+        gevent.sleep(0.01)
+        for value in range(2, 5):
+            client.offer(frame(value))
+            gevent.sleep(0.01)
+        # Only the first frame, and the hello, so far.
+        self.assertEqual(2, len(ws.sent))
+
+        gevent.sleep(0.15)
+        self.assertEqual(3, len(ws.sent))
+        self.assertEqual([4, 4, 4], json.loads(ws.sent[2])["payload"][0])
+
+    def test_stalled_client_is_disconnected(self):
+        ws = FakeSocket(send_seconds=10)
+        client = self.start_client(ws)
+        client.SEND_TIMEOUT_SECONDS = 0.02
+        client.offer(frame(1))
+        gevent.sleep(0.1)
+        self.assertFalse(client.connected)
+        self.assertTrue(ws.closed)
+        self.assertEqual([], ws.sent)
+
+        # Frames for clients on their way out are dropped.
+        client.offer(frame(2))
+        gevent.sleep(0.01)
+        self.assertEqual([], ws.sent)
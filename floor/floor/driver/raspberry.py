@@ -2,10 +2,19 @@ from __future__ import absolute_import
 
 import importlib
 import logging
+import threading
 import time
 from builtins import range
 
+import numpy as np
+
+from floor.util.double_buffer import DoubleBuffer
+from floor.util.frame_buffer import FrameBuffer
 from floor.util.serial_read import SerialRead
+from floor.util.spi_packet import SpiPacketEncoder, write_packet
+from floor.util.step_filter import StepFilter
+from floor.util.weight_decoder import WeightDecoder
+from floor.util.weight_log import WeightLogWriter
 
 from .base import Base
 
@@ -30,7 +39,8 @@ class Raspberry(Base):
     # The number of bytes in a packet of data for weight values
     WEIGHT_PACKET_SIZE = 2
 
-    # The number of packets in a message from the floor
+    # The number of packets in a message from a single pod; larger floors send one
+    # per tile (see `tile_order`).
     WEIGHT_PACKETS = 64
 
     # Weight sensors are measured using 10-bit ADC.  2^10 - 1 == 1023
@@ -42,8 +52,9 @@ class Raspberry(Base):
     # to about 700-800 max.
     DEFAULT_FLOOR_THRESHOLD = 200
 
-    # Define the order in which we output the LEDs.  This could be calculated
-    # but spelling it out here to reduce the time to display a frame
+    # Define the order in which we output the LEDs on a single pod.  This could be
+    # calculated but spelling it out here to reduce the time to display a frame.  Other
+    # floor sizes are chained pod by pod (see `Layout.tile_order`).
     TILE_ORDER = [
         00,  1,  2,  3,  4,  5,  6,  7,
         15, 14, 13, 12, 11, 10,  9,  8,
@@ -57,6 +68,14 @@ class Raspberry(Base):
 
     NUM_TILES = len(TILE_ORDER)
 
+    # Weight data is shifted out of the floor as LED data is shifted in, so unchanged
+    # frames are still resent often enough to keep weights coming back.
+    KEEPALIVE_SECONDS = 1 / 60.0
+
+    # When running with a separate I/O thread, how long it waits for a new LED frame
+    # before polling the serial port for weights anyway.
+    IO_POLL_SECONDS = 0.002
+
     def __init__(self, args):
         super(Raspberry, self).__init__(args)
 
@@ -69,16 +88,78 @@ class Raspberry(Base):
 
         self.spi = module.SpiDev()
         self.spi.open(0, 0)
-        self.spi.max_speed_hz = MAX_DATA_RATE
+        self.spi.max_speed_hz = self.MAX_DATA_RATE
+
+        self.reader = SerialRead()
 
-        self.weights = [0] * self.NUM_TILES
-        self.raw_weights = [0] * self.NUM_TILES
+        # With `record_weights` set to a filename, every weight frame read is appended to
+        # that log, for playing back later with the replay driver.
+        record_weights = args.get("record_weights")
+        self.weight_log = WeightLogWriter(record_weights) if record_weights else None
 
-        # The maximum value seen after filtering.
-        self.value_ceiling = [0] * self.NUM_TILES
-        self.value_floor = [0] * self.NUM_TILES
+        # With `io_thread` set, SPI writes and serial reads happen on a background thread
+        # so that they overlap with rendering of the next frame.  LED frames go out, and
+        # weight frames come back, through lock-free double buffers.
+        self.use_io_thread = bool(args.get("io_thread", False))
+        self.io_thread = None
+        self.io_stopped = threading.Event()
+        self.frame_ready = threading.Event()
+        self.outbound_frames = DoubleBuffer(FrameBuffer)
+        self.weights_published = 0
 
-        self.reader = SerialRead()
+        self.init_tiles(self.TILE_ORDER)
+
+    def init_tiles(self, tile_order):
+        """
+        Sets up encoding, decoding and buffers for a floor whose tiles are chained
+        together in `tile_order`.
+        """
+        self.tile_order = tile_order
+        num_tiles = len(tile_order)
+
+        self.encoder = SpiPacketEncoder(tile_order, self.shard or self.layout)
+
+        self.decoder = WeightDecoder(
+            tile_order,
+            self.floor_threshold,
+            self.MAX_FLOOR_VALUE,
+            step_filter=self.make_step_filter(num_tiles),
+        )
+
+        self.weights = [0] * num_tiles
+        self.pressures = self.decoder.pressures.copy()
+
+        # These are updated in place by the decoder.
+        self.raw_weights = self.decoder.raw_weights
+        self.value_ceiling = self.decoder.value_ceiling
+        self.value_floor = self.decoder.value_floor
+
+        self.reader.set_packets(num_tiles)
+
+        # Row 0 holds the weights, row 1 the pressures.
+        self.inbound_weights = DoubleBuffer(lambda: np.zeros((2, num_tiles), np.float32))
+
+    def init_layout(self, layout_name=None):
+        super(Raspberry, self).init_layout(layout_name)
+        # A shard maps its own tiles to the floor's bypassed ones.
+        self.encoder.set_layout(self.shard or self.layout)
+        self.decoder.step_filter = self.make_step_filter(len(self.tile_order))
+
+    def make_step_filter(self, num_tiles):
+        """
+        Builds the filter deciding when tiles are stepped on, from the layout's
+        `step_filter` settings if it has any
+        """
+        settings = self.layout.step_filter if self.layout else {}
+        return StepFilter.from_object(num_tiles, settings, on_threshold=self.floor_threshold)
+
+    def set_geometry(self, geometry):
+        super(Raspberry, self).set_geometry(geometry)
+        tile_order = self.get_tile_order(geometry)
+        if tile_order != self.tile_order:
+            if self.io_thread is not None:
+                raise RuntimeError("Can't change the floor's size while the I/O thread is running")
+            self.init_tiles(tile_order)
 
     def probe_floor(self):
         """
@@ -98,7 +179,7 @@ class Raspberry(Base):
             logger.info("Probed floor: {} tiles connected".format(num_squares))
         except ProbeException as e:
             logger.error("Failed to probe floor, using default tile count: {}".format(e))
-            num_squares = self.NUM_TILES
+            num_squares = len(self.tile_order)
 
         return num_squares
 
@@ -116,8 +197,8 @@ class Raspberry(Base):
     def read_probe_data(self):
         result = self.read_frame_once()
 
-        marker = ord(result[-2])
-        value = ord(result[-1])
+        marker = result[-2]
+        value = result[-1]
 
         # If there's no probe marker, there are 64 floor tiles configured that consumed
         # all the probe values we sent
@@ -132,38 +213,64 @@ class Raspberry(Base):
 
     def send_data(self):
         """
+        Packs the current LED values (see `SpiPacketEncoder`) and writes them to the floor
         :return:
         """
-        data = list()
-        for led in self.TILE_ORDER:
-            # Don't add this data to the list if this tile has been bypassed
-            if self.layout and self.layout.is_bypassed(led):
-                continue
-
-            rgb = self.leds[led]
-
-            # Repack 3 10-bit values into 4 8-bit values
-            data.append(int(rgb[0]) >> 4)
-            data.append(((int(rgb[0]) & 0x00F) << 4) | (int(rgb[1]) >> 6))
-            data.append(((int(rgb[1]) & 0x3F) << 2) | ((int(rgb[2]) & 0x300) >> 8))
-            data.append(int(rgb[2]) & 0x0FF)
-
-        """ DEBUGGING
-        byte = 0
-        square = 0
-        for v in data:
-            if byte == 0:
-                sys.stdout.write("{:02d})".format(square))
-                square += 1
-
-            sys.stdout.write(" / {:02x}".format(v))
-
-            byte = (byte + 1) % 4
-            if byte == 0:
-                print("")
-        """
+        if self.use_io_thread:
+            self.start_io_thread()
+            self.outbound_frames.write(self._copy_leds)
+            self.frame_ready.set()
+            return
 
-        self.spi.xfer(data)
+        write_packet(self.spi, self.encoder.encode(self.leds))
+
+    def _copy_leds(self, frame):
+        np.copyto(frame.rgb, self.leds.rgb)
+
+    def _copy_weights(self, values):
+        values[0] = self.decoder.weights
+        values[1] = self.decoder.pressures
+
+    def start_io_thread(self):
+        if self.io_thread:
+            return
+        logger.info("Starting I/O thread")
+        self.io_stopped.clear()
+        self.io_thread = threading.Thread(target=self._run_io_thread, name="raspberry-io")
+        self.io_thread.daemon = True
+        self.io_thread.start()
+
+    def stop_io_thread(self):
+        if not self.io_thread:
+            return
+        self.io_stopped.set()
+        self.frame_ready.set()
+        self.io_thread.join()
+        self.io_thread = None
+
+    def close(self):
+        self.stop_io_thread()
+        if self.weight_log:
+            self.weight_log.close()
+
+    def _run_io_thread(self):
+        """
+        Owns the SPI and serial devices: writes each new LED frame as it is published and
+        polls for weight frames in between
+        :return:
+        """
+        while not self.io_stopped.is_set():
+            try:
+                if self.frame_ready.wait(self.IO_POLL_SECONDS):
+                    self.frame_ready.clear()
+                    data = self.outbound_frames.read(self.encoder.encode)
+                    if data is not None:
+                        write_packet(self.spi, data)
+
+                if self.read_weights() is not None:
+                    self.inbound_weights.write(self._copy_weights)
+            except Exception:
+                logger.exception("Error in I/O thread")
 
     def read_frame_once(self):
         start = time.time()
@@ -176,33 +283,57 @@ class Raspberry(Base):
 
     def read_data(self):
         """
-        The thread running in read_serial_data should be updating the weight values
-        :return:
+        Updates self.weights if a new frame of weights has arrived
+        :return: True if the weights were updated
         """
+        if self.use_io_thread:
+            published = self.inbound_weights.published
+            if published == self.weights_published:
+                return False
+            self.weights_published = published
+            values = self.inbound_weights.read(np.copy)
+            self.weights = values[0].astype(int).tolist()
+            self.pressures = values[1]
+            return True
+
+        values = self.read_weights()
+        if values is None:
+            return False
 
-        # Read whatever we can
+        # Setting a member variable should be atomic
+        self.weights = values
+        self.pressures = self.decoder.pressures.copy()
+        return True
+
+    def read_weights(self):
+        """
+        Reads whatever serial data is available
+        :return: The decoded weights if a full frame has arrived, otherwise None
+        """
         self.reader.read()
 
         if not self.reader.data_ready:
-            return False
+            return None
 
         data_bytes = self.reader.get_frame()
+        if self.weight_log:
+            self.weight_log.write(time.time(), data_bytes)
         values = self.process_bytes(data_bytes)
 
         self.print_weights(values)
 
-        # Setting a member variable should be atomic
-        self.weights = values
-
         self.debug_skip_read -= 1
         if self.debug_skip_read < 0:
             self.debug_skip_read = self.DEBUG_SKIP_RESET
 
-        return True
+        return values
 
     def get_weights(self):
         return self.weights
 
+    def get_pressures(self):
+        return self.pressures
+
     def print_weights(self, values):
         # Only output 1 out of DEBUG_SKIP_RESET times
         if self.debug_skip_read != 0:
@@ -214,52 +345,24 @@ class Raspberry(Base):
 
         log_line = "\n | "
 
-        for packet in range(self.WEIGHT_PACKETS):
-            position = self.TILE_ORDER[packet]
+        for packet, position in enumerate(self.tile_order):
 
             log_line += "{}: {:>2} ({:>2}/{:>2}) | ".format(
                 position, values[position], self.value_floor[position], self.value_ceiling[position]
             )
 
-            if packet % 8 == 7:
+            if packet % self.geometry.cols == self.geometry.cols - 1:
                 log_line += " | \n"
 
         log_line += "-----------------------------------------\n"
         logger.debug(log_line)
 
     def process_bytes(self, data_bytes):
-        # Pre-fill a 64 byte list
-        new_buf = [0] * self.NUM_TILES
-
-        for packet in range(self.WEIGHT_PACKETS):
-            value = self.value_from_packet(data_bytes, packet)
-
-            # Use TILE_ORDER to map the single stream back to a left to right, left to right orders
-            position = self.TILE_ORDER[packet]
-
-            self.raw_weights[position] = value
-
-            self.value_ceiling[position] = max(self.value_ceiling[position], value)
-            self.value_floor[position] = min(self.value_floor[position], value)
-
-            new_buf[position] = 1 if value else 0
-
-        return new_buf
-
-    def value_from_packet(self, data_bytes, packet):
-        idx = packet * self.WEIGHT_PACKET_SIZE
-        if idx + 1 >= len(data_bytes):
-            return 0
-
-        hi = ord(data_bytes[idx])
-        lo = ord(data_bytes[idx + 1])
-        value = (hi << 8) + lo
-
-        if value < self.floor_threshold or value > self.MAX_FLOOR_VALUE:
-            return 0
-
-        scaled_value = float(value) / self.MAX_FLOOR_VALUE
-        return scaled_value
+        """
+        Decodes a frame of weight data (see `WeightDecoder`)
+        :return: The binary weights, in tile order
+        """
+        return self.decoder.decode(data_bytes)
 
 
 class ProbeException(Exception):
@@ -0,0 +1,304 @@
+from __future__ import absolute_import, division, print_function, unicode_literals
+
+import os
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import types
+from builtins import object, range
+from unittest import TestCase
+
+import mock
+
+from floor.controller.layout import Layout
+from floor.util.frame_buffer import FrameBuffer
+from floor.util.geometry import Geometry
+from floor.util.weight_log import WeightLog
+
+BASE_DIR = os.path.dirname(os.path.realpath(__file__))
+CONFIG_DIR = os.path.join(BASE_DIR, "..", "..", "config")
+
+
+class LegacySpiDev(object):
+    """Stands in for an older `spidev.SpiDev` that lacks `writebytes2`."""
+
+    def __init__(self):
+        self.written = []
+        self.max_speed_hz = None
+
+    def open(self, bus, device):
+        pass
+
+    def xfer(self, data):
+        self.written.append(bytes(data))
+        self.writer_thread = threading.current_thread()
+        return list(data)
+
+
+class FakeSpiDev(LegacySpiDev):
+    """Stands in for `spidev.SpiDev`, recording everything written to it."""
+
+    def writebytes2(self, data):
+        self.written.append(bytes(data))
+        self.writer_thread = threading.current_thread()
+
+
+def fake_spidev_module(spidev_cls=FakeSpiDev):
+    module = types.ModuleType("spidev")
+    module.SpiDev = spidev_cls
+    return module
+
+
+def legacy_encode(leds, tile_order, layout):
+    """The per-tile encoder `SpiPacketEncoder` replaced."""
+    data = list()
+    for led in tile_order:
+        if layout and layout.is_bypassed(led):
+            continue
+        rgb = leds[led]
+        data.append(int(rgb[0]) >> 4)
+        data.append(((int(rgb[0]) & 0x00F) << 4) | (int(rgb[1]) >> 6))
+        data.append(((int(rgb[1]) & 0x3F) << 2) | ((int(rgb[2]) & 0x300) >> 8))
+        data.append(int(rgb[2]) & 0x0FF)
+    return bytes(data)
+
+
+class FakeReader(object):
+    """Stands in for `SerialRead`, handing out queued weight frames."""
+
+    def __init__(self):
+        self.frames = []
+        self.data_ready = False
+
+    def read(self):
+        self.data_ready = bool(self.frames)
+
+    def get_frame(self):
+        self.data_ready = False
+        return self.frames.pop(0)
+
+
+def weight_frame(values):
+    """Encodes raw 10-bit sensor values, in floor order, as sent by the floor."""
+    data = bytearray()
+    for value in values:
+        data.extend([value >> 8, value & 0xFF])
+    return bytes(data)
+
+
+class RaspberryTestCase(TestCase):
+    spidev_cls = FakeSpiDev
+    driver_args = {}
+
+    def setUp(self):
+        patchers = [
+            mock.patch.dict(sys.modules, {"spidev": fake_spidev_module(self.spidev_cls)}),
+            mock.patch("floor.util.serial_read.serial.Serial"),
+        ]
+        for patcher in patchers:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+        from floor.driver.raspberry import Raspberry
+
+        driver_args = {"config_dir": CONFIG_DIR}
+        driver_args.update(self.driver_args)
+        self.driver = Raspberry(driver_args)
+        self.addCleanup(self.driver.stop_io_thread)
+
+    def random_leds(self):
+        return [tuple(random.randint(0, 1023) for _ in range(3)) for _ in range(64)]
+
+
+class SendDataTest(RaspberryTestCase):
+    def assert_encodes_like_legacy(self, layout):
+        random.seed(64)
+        for _ in range(20):
+            leds = self.random_leds()
+            self.driver.set_leds(FrameBuffer.from_pixels(leds))
+            self.driver.send_data()
+            expected = legacy_encode(leds, self.driver.TILE_ORDER, layout)
+            self.assertEqual(expected, self.driver.spi.written[-1])
+
+    def test_encoding_matches_legacy(self):
+        self.assert_encodes_like_legacy(None)
+        self.assertEqual(64 * 4, len(self.driver.spi.written[-1]))
+
+    def test_encoding_skips_bypassed_tiles(self):
+        layout = Layout(config_dir=CONFIG_DIR, config_name="two-pod-layout")
+        self.driver.layout = layout
+        self.driver.encoder.set_layout(layout)
+        self.assert_encodes_like_legacy(layout)
+        self.assertEqual(16 * 4, len(self.driver.spi.written[-1]))
+
+    def test_out_of_range_values_are_clamped(self):
+        self.driver.set_leds([(-20, 1023.9, 5000)] * 64)
+        self.driver.send_data()
+        expected = legacy_encode([(0, 1023, 1023)] * 64, self.driver.TILE_ORDER, None)
+        self.assertEqual(expected, self.driver.spi.written[-1])
+
+
+class LegacySpiDevSendDataTest(RaspberryTestCase):
+    spidev_cls = LegacySpiDev
+
+    def test_falls_back_to_xfer(self):
+        leds = self.random_leds()
+        self.driver.set_leds(leds)
+        self.driver.send_data()
+        expected = legacy_encode(leds, self.driver.TILE_ORDER, None)
+        self.assertEqual(expected, self.driver.spi.written[-1])
+
+
+class ReadDataTest(RaspberryTestCase):
+    def test_weights_and_pressures(self):
+        self.driver.reader = FakeReader()
+        raw_values = [0] * 64
+        raw_values[0] = 1000
+        raw_values[8] = 500
+        raw_values[63] = 100
+        self.driver.reader.frames.append(weight_frame(raw_values))
+
+        self.assertTrue(self.driver.read_data())
+        self.assertFalse(self.driver.read_data())
+
+        # Packet 8 is the right-most tile of the second row, and packet 63 is below threshold.
+        expected = [0] * 64
+        expected[0] = 1
+        expected[15] = 1
+        self.assertEqual(expected, self.driver.get_weights())
+
+        pressures = self.driver.get_pressures()
+        self.assertEqual(1.0, pressures[0])
+        self.assertEqual(1.0, pressures[15])
+        self.assertEqual(0.0, pressures[56])
+
+        raw_values[8] = 900
+        self.driver.reader.frames.append(weight_frame(raw_values))
+        self.driver.read_data()
+        raw_values[8] = 550
+        self.driver.reader.frames.append(weight_frame(raw_values))
+        self.driver.read_data()
+        self.assertAlmostEqual(351.0 / 701.0, self.driver.get_pressures()[15], places=6)
+
+
+class RecordWeightsTest(RaspberryTestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmpdir)
+        self.filename = os.path.join(self.tmpdir, "show.weights")
+        self.driver_args = {"record_weights": self.filename}
+        super(RecordWeightsTest, self).setUp()
+
+    def test_frames_are_recorded(self):
+        self.driver.reader = FakeReader()
+        frames = [weight_frame([1000] + [0] * 63), weight_frame([0] * 63 + [1000])]
+        for frame in frames:
+            self.driver.reader.frames.append(frame)
+            self.driver.read_data()
+        self.driver.close()
+
+        log = WeightLog(self.filename)
+        self.assertEqual(frames, log.frames)
+        self.assertTrue(log.times[0] <= log.times[1])
+
+    def test_close_flushes(self):
+        self.driver.reader = FakeReader()
+        # Frames in quick succession are only flushed every so often...
+        for value in (1000, 900, 800):
+            self.driver.reader.frames.append(weight_frame([value] * 64))
+            self.driver.read_data()
+        self.assertLess(len(WeightLog(self.filename)), 3)
+        # ...but none are lost when the driver closes.
+        self.driver.close()
+        self.assertEqual(3, len(WeightLog(self.filename)))
+        self.assertTrue(self.driver.weight_log.fp.closed)
+
+
+class IoThreadTest(RaspberryTestCase):
+    driver_args = {"io_thread": True}
+
+    def wait_for(self, condition, timeout=2.0):
+        deadline = time.time() + timeout
+        while not condition():
+            if time.time() > deadline:
+                self.fail("Timed out waiting for I/O thread")
+            time.sleep(0.001)
+
+    def test_frames_are_written_by_io_thread(self):
+        leds = self.random_leds()
+        self.driver.set_leds(leds)
+        self.driver.send_data()
+        self.wait_for(lambda: self.driver.spi.written)
+
+        expected = legacy_encode(leds, self.driver.TILE_ORDER, None)
+        self.assertEqual(expected, self.driver.spi.written[-1])
+        self.assertIs(self.driver.io_thread, self.driver.spi.writer_thread)
+
+    def test_weights_are_read_by_io_thread(self):
+        self.driver.reader = FakeReader()
+        self.driver.send_data()
+        self.assertFalse(self.driver.read_data())
+
+        raw_values = [0] * 64
+        raw_values[9] = 1000
+        self.driver.reader.frames.append(weight_frame(raw_values))
+        self.wait_for(lambda: self.driver.inbound_weights.published)
+
+        self.assertTrue(self.driver.read_data())
+        self.assertFalse(self.driver.read_data())
+        expected = [0] * 64
+        expected[self.driver.TILE_ORDER[9]] = 1
+        self.assertEqual(expected, self.driver.get_weights())
+        self.assertEqual(expected, self.driver.get_pressures().tolist())
+
+    def test_stop_io_thread(self):
+        self.driver.send_data()
+        thread = self.driver.io_thread
+        self.driver.stop_io_thread()
+        self.assertFalse(thread.is_alive())
+        self.assertIsNone(self.driver.io_thread)
+
+
+class GeometryTest(RaspberryTestCase):
+    def test_default_tile_order(self):
+        self.assertEqual(self.driver.TILE_ORDER, self.driver.geometry.serpentine_order())
+
+    def test_larger_floor(self):
+        self.driver.set_geometry(Geometry(rows=8, cols=16))
+        self.assertEqual(128, len(self.driver.leds))
+        # Chained pod by pod: the left pod's third row follows its second.
+        self.assertEqual([32, 33], self.driver.tile_order[16:18])
+
+        leds = [tuple(random.randint(0, 1023) for _ in range(3)) for _ in range(128)]
+        self.driver.set_leds(leds)
+        self.driver.send_data()
+        expected = legacy_encode(leds, self.driver.tile_order, None)
+        self.assertEqual(expected, self.driver.spi.written[-1])
+
+        self.driver.reader = FakeReader()
+        raw_values = [0] * 128
+        raw_values[16] = 1000
+        self.driver.reader.frames.append(weight_frame(raw_values))
+        self.assertTrue(self.driver.read_data())
+        self.assertEqual(128, len(self.driver.get_weights()))
+        self.assertEqual(1, self.driver.get_weights()[32])
+
+    def test_two_pod_layout(self):
+        layout = Layout(config_dir=CONFIG_DIR, config_name="side-by-side-layout")
+        self.driver.init_layout(layout)
+        # Each pod's tiles follow the single pod order, the right pod after the left.
+        left = [(i // 8) * 16 + i % 8 for i in self.driver.TILE_ORDER]
+        right = [i + 8 for i in left]
+        self.assertEqual(left + right, self.driver.tile_order)
+
+        layout.pods = [(8, 0), (0, 0)]
+        self.driver.init_layout(layout)
+        self.assertEqual(right, self.driver.tile_order[:64])
+
+    def test_shard_tile_order(self):
+        self.driver.args["shard"] = "right"
+        self.driver.init_layout(Layout(config_dir=CONFIG_DIR, config_name="side-by-side-layout"))
+        self.assertEqual(self.driver.TILE_ORDER, self.driver.tile_order)
@@ -0,0 +1,116 @@
+from __future__ import absolute_import
+
+import logging
+import time
+
+import numpy as np
+
+from floor.util.step_filter import StepFilter
+from floor.util.weight_decoder import WeightDecoder
+from floor.util.weight_log import WeightLog, WeightLogError
+
+from .base import Base
+
+logger = logging.getLogger("replay")
+
+
+class Replay(Base):
+    """Plays back weights recorded from the floor (see the `record_weights` arg of the
+    Raspberry driver), as if people were dancing on it.
+
+    Driver args:
+        replay_file -- The weight log to play.
+        replay_speed -- How fast to play it; 1.0 is real time.
+        replay_loop -- Whether to start again from the beginning at the end.
+        floor_threshold -- As for the Raspberry driver.
+    """
+
+    MAX_FLOOR_VALUE = 1023
+    DEFAULT_FLOOR_THRESHOLD = 200
+
+    def __init__(self, args):
+        super(Replay, self).__init__(args)
+        filename = args.get("replay_file")
+        if not filename:
+            raise ValueError("The replay driver needs a replay_file to play")
+        self.log = WeightLog(filename)
+        if not len(self.log):
+            raise WeightLogError("{}: no frames to replay".format(filename))
+        logger.info(
+            "Replaying {} frames ({:.1f}s) from {}".format(
+                len(self.log), self.log.duration(), filename
+            )
+        )
+
+        self.speed = float(args.get("replay_speed", 1.0))
+        if self.speed <= 0:
+            raise ValueError("replay_speed must be positive, not {}".format(self.speed))
+        self.loop = args.get("replay_loop", True)
+        self.floor_threshold = args.get("floor_threshold", self.DEFAULT_FLOOR_THRESHOLD)
+
+        self.clock = time.time
+        self.start_time = None
+        # The next frame to decode.
+        self.position = 0
+        # Added to the log's timestamps, so that they keep increasing when it loops.
+        self.loop_offset = 0.0
+        self.init_decoder()
+
+    def init_decoder(self):
+        num_tiles = self.geometry.num_pixels
+        settings = self.layout.step_filter if self.layout else {}
+        self.decoder = WeightDecoder(
+            self.get_tile_order(self.geometry),
+            self.floor_threshold,
+            self.MAX_FLOOR_VALUE,
+            step_filter=StepFilter.from_object(
+                num_tiles, settings, on_threshold=self.floor_threshold
+            ),
+        )
+        self.weights = [0] * num_tiles
+        self.pressures = np.zeros(num_tiles, dtype=np.float32)
+
+    def init_layout(self, layout_name=None):
+        super(Replay, self).init_layout(layout_name)
+        self.init_decoder()
+
+    def set_geometry(self, geometry):
+        super(Replay, self).set_geometry(geometry)
+        self.init_decoder()
+
+    def read_data(self):
+        """
+        Decodes every frame recorded up to the current playback time
+        :return: Whether the weights were updated
+        """
+        now = self.clock()
+        if self.start_time is None:
+            self.start_time = now
+        times = self.log.times
+        duration = self.log.duration()
+        elapsed = (now - self.start_time) * self.speed
+
+        if self.position >= len(times):
+            if not self.loop:
+                return False
+            # Leave a frame's gap between the end and the start.
+            gap = duration / max(1, len(times) - 1)
+            self.loop_offset += duration + gap
+            self.start_time = now
+            self.position = 0
+            elapsed = 0.0
+
+        end = int(np.searchsorted(times, times[0] + elapsed, side="right"))
+        if end <= self.position:
+            return False
+        # Every frame goes through the decoder, so that its step filter sees them all.
+        for index in range(self.position, end):
+            self.decoder.decode(self.log.frames[index], times[index] + self.loop_offset)
+        self.position = end
+
+        self.weights = self.decoder.weights.tolist()
+        self.pressures = self.decoder.pressures.copy()
+        return True
+
+    def get_pressures(self):
+        return self.pressures
@@ -0,0 +1,91 @@
+import os
+import shutil
+import struct
+import tempfile
+from unittest import TestCase
+
+from floor.driver.replay import Replay
+from floor.util.weight_log import WeightLogError, WeightLogWriter
+
+CONFIG_DIR = os.path.join(os.path.dirname(__file__), "..", "..", "config")
+
+
+def weight_frame(stepped):
+    """A raw frame, in floor order, with the given packets stepped on."""
+    values = [1000 if packet in stepped else 0 for packet in range(64)]
+    return struct.pack(">64H", *values)
+
+
+class FakeTime(object):
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+class ReplayTest(TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmpdir)
+        self.filename = os.path.join(self.tmpdir, "show.weights")
+        # Packet 0 is stepped on for the first second, then packet 1 for the next.
+        with WeightLogWriter(self.filename) as writer:
+            writer.write(50.0, weight_frame({0}))
+            writer.write(51.0, weight_frame({1}))
+            writer.write(52.0, weight_frame(set()))
+
+    def make_driver(self, **args):
+        args.update(config_dir=CONFIG_DIR, replay_file=self.filename)
+        driver = Replay(args)
+        driver.clock = FakeTime()
+        return driver
+
+    def stepped(self, driver):
+        return [i for i, weight in enumerate(driver.get_weights()) if weight]
+
+    def test_real_time(self):
+        driver = self.make_driver()
+        self.assertTrue(driver.read_data())
+        self.assertEqual([0], self.stepped(driver))
+        self.assertEqual(1.0, driver.get_pressures()[0])
+
+        driver.clock.now += 0.5
+        self.assertFalse(driver.read_data())
+        driver.clock.now += 0.5
+        self.assertTrue(driver.read_data())
+        self.assertEqual([1], self.stepped(driver))
+
+    def test_speed(self):
+        driver = self.make_driver(replay_speed=4.0)
+        driver.read_data()
+        driver.clock.now += 0.5
+        self.assertTrue(driver.read_data())
+        self.assertEqual([], self.stepped(driver))
+
+    def test_loops(self):
+        driver = self.make_driver(replay_speed=10.0)
+        driver.read_data()
+        driver.clock.now += 1.0
+        self.assertTrue(driver.read_data())
+        self.assertEqual([], self.stepped(driver))
+        self.assertTrue(driver.read_data())
+        self.assertEqual([0], self.stepped(driver))
+
+    def test_stops_without_looping(self):
+        driver = self.make_driver(replay_loop=False)
+        driver.read_data()
+        driver.clock.now += 10.0
+        self.assertTrue(driver.read_data())
+        self.assertFalse(driver.read_data())
+        self.assertEqual([], self.stepped(driver))
+
+    def test_bad_args(self):
+        with self.assertRaises(ValueError):
+            Replay({"config_dir": CONFIG_DIR})
+        with self.assertRaises(ValueError):
+            self.make_driver(replay_speed=0)
+        empty = os.path.join(self.tmpdir, "empty.weights")
+        WeightLogWriter(empty).close()
+        with self.assertRaises(WeightLogError):
+            Replay({"config_dir": CONFIG_DIR, "replay_file": empty})
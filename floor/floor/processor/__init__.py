@@ -1,24 +1,60 @@
 from __future__ import absolute_import, division, print_function, unicode_literals
 
-import os.path
-from collections import OrderedDict
-from glob import glob
+import importlib
+from collections.abc import Mapping
 
 from .base import Base, ProcessorRegistry
+from .manifest import load_manifest
 
 
-def _import_all():
-    """Import all processors, to trigger registration."""
-    pwd = os.path.dirname(__file__)
-    for filename in glob(os.path.join(pwd, "*.py")):
-        name, ext = os.path.splitext(os.path.basename(filename))
-        __import__("floor.processor.{}".format(name), globals(), locals())
+class ProcessorCatalog(Mapping):
+    """A dict of processor name -> processor class, that only imports a processor's
+    module when its class is first looked up.
+
+    Names come from the processor manifest (see `floor.processor.manifest`), plus any
+    processor classes that have been imported from elsewhere, eg by tests.
+    Membership checks and iterating over names never import anything.
+    """
+
+    def __init__(self, modules):
+        """Constructor.
+
+        Arguments:
+            modules {dict} -- Processor name -> name of the module defining it.
+        """
+        self.modules = modules
+
+    def names(self):
+        return sorted(set(self.modules) | set(ProcessorRegistry.names()))
+
+    def __getitem__(self, name):
+        cls = ProcessorRegistry.ALL_PROCESSORS.get(name)
+        if cls is None and name in self.modules:
+            importlib.import_module("floor.processor.{}".format(self.modules[name]))
+            cls = ProcessorRegistry.ALL_PROCESSORS.get(name)
+        if cls is None:
+            raise KeyError(name)
+        return cls
+
+    def __contains__(self, name):
+        return name in self.modules or name in ProcessorRegistry.ALL_PROCESSORS
+
+    def __iter__(self):
+        return iter(self.names())
+
+    def __len__(self):
+        return len(self.names())
+
+
+_catalog = None
 
 
 def all_processors():
-    """Returns a dict of processor name -> processor class"""
-    _import_all()
-    return OrderedDict(sorted(ProcessorRegistry.ALL_PROCESSORS.items()))
+    """Returns a dict of processor name -> processor class; see `ProcessorCatalog`."""
+    global _catalog
+    if _catalog is None:
+        _catalog = ProcessorCatalog(load_manifest())
+    return _catalog
 
 
 __all__ = ["all_processors"]
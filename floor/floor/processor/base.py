@@ -3,31 +3,47 @@ from __future__ import absolute_import, division, print_function, unicode_litera
 import colorsys
 import logging
 import sys
+import threading
 from builtins import object, range
 
+import numpy as np
+
 from floor.processor.constants import COLOR_MAXIMUM, RANGED_INPUT_MAX
+from floor.util.geometry import DEFAULT_GEOMETRY
+from floor.util.weight_events import events_since
 
 
 class ProcessorRegistry(type):
     """Python metaclass which automatically adds the class to `ALL_PROCESSORS`."""
 
     ALL_PROCESSORS = {}
+    # Processor modules may be imported on any thread (eg by the processor pool), so
+    # classes are added under this, and readers iterate over copies taken under it.
+    LOCK = threading.Lock()
 
     def __new__(cls, clsname, bases, attrs):
         new_class = super(ProcessorRegistry, cls).__new__(cls, clsname, bases, attrs)
         class_name = new_class.__name__
         if class_name != "Base":
-            if class_name in cls.ALL_PROCESSORS:
-                existing_class = cls.ALL_PROCESSORS[class_name]
+            with cls.LOCK:
+                existing_class = cls.ALL_PROCESSORS.get(class_name)
+                if existing_class is None:
+                    cls.ALL_PROCESSORS[class_name] = new_class
+            if existing_class is not None:
                 file1 = sys.modules[existing_class.__module__].__file__
                 file2 = sys.modules[new_class.__module__].__file__
                 files = ", ".join((file1, file2))
                 raise ValueError(
                     'Multiple processors with name "{}" declared: {}'.format(class_name, files)
                 )
-            cls.ALL_PROCESSORS[class_name] = new_class
         return new_class
 
+    @classmethod
+    def names(cls):
+        """Returns the names of every processor class so far, safe from any thread."""
+        with cls.LOCK:
+            return list(cls.ALL_PROCESSORS)
+
 
 class RenderContext(object):
     """An object that a `Controller` will pass to `Processor.get_next_frame`.
@@ -44,13 +60,46 @@ class RenderContext(object):
         AUX1 = 2
         AUX2 = 3
 
-    def __init__(self, clock, downbeat, weights, bpm, ranged_values, switches):
+    def __init__(
+        self,
+        clock,
+        downbeat,
+        weights,
+        bpm,
+        ranged_values,
+        switches,
+        pressures=None,
+        geometry=DEFAULT_GEOMETRY,
+        weight_array=None,
+        weight_events=(),
+        weight_history=(),
+    ):
         self.clock = clock
         self.downbeat = downbeat
         self.weights = weights
+        # `weights` as a numpy array, eg for `numpy.flatnonzero(context.weight_array)`.
+        # Shared between processors, so don't modify it.
+        self.weight_array = weight_array if weight_array is not None else np.asarray(weights)
+        # Tiles stepped on or off since the last frame, as `StepEvent`s; see
+        # `floor.util.weight_events`.
+        self.weight_events = weight_events
+        self.weight_history = weight_history
+        # Analog counterpart to `weights`: how hard each tile is pressed, on [0.0, 1.0].
+        self.pressures = pressures if pressures is not None else [float(w) for w in weights]
         self.bpm = bpm
         self.ranged_values = ranged_values
         self.switches = switches
+        # The shape of the floor; see `floor.util.geometry.Geometry`. `weights` and
+        # `pressures` have one value per pixel, and frames should too.
+        self.geometry = geometry
+
+    def weight_events_since(self, clock):
+        """Returns the step events after time `clock`, oldest first.
+
+        Processors that don't render every frame (eg `clocked` ones) can pass the
+        clock of the last frame they rendered, so as not to miss any steps.
+        """
+        return events_since(self.weight_history, clock)
 
     @classmethod
     def ranged_selection(cls, ranged_value, choices):
@@ -87,9 +136,11 @@ class RenderContext(object):
 class Base(metaclass=ProcessorRegistry):
     CONTROLS = []
 
-    FLOOR_WIDTH = 8
-    FLOOR_HEIGHT = 8
-    PIXELS_ALL_OFF = [[0 for _ in range(3)] for _ in range(64)]
+    # The size of a single pod, for processors that don't look at `context.geometry`.
+    # Their frames are repeated across every pod of a bigger floor.
+    FLOOR_WIDTH = DEFAULT_GEOMETRY.cols
+    FLOOR_HEIGHT = DEFAULT_GEOMETRY.rows
+    PIXELS_ALL_OFF = [[0, 0, 0] for _ in range(DEFAULT_GEOMETRY.num_pixels)]
 
     def __init__(self, **kwargs):
         self.logger = logging.getLogger(self.__class__.__name__)
@@ -188,5 +239,5 @@ class Base(metaclass=ProcessorRegistry):
         return [self.hsv_to_rgb(p) for p in pixels]
 
     @staticmethod
-    def zeroed_pixel_array():
-        return [[0, 0, 0] for _ in range(64)]
+    def zeroed_pixel_array(geometry=DEFAULT_GEOMETRY):
+        return [[0, 0, 0] for _ in range(geometry.num_pixels)]
@@ -1,5 +1,7 @@
 from builtins import range
 
+import numpy as np
+
 from floor.processor.base import Base
 from floor.processor.utils import clocked
 
@@ -87,11 +89,12 @@ class HeatStep(Base):
 
         self.cool_floor()
 
-        for y in range(8):
-            for x in range(8):
-                idx = (x * self.FLOOR_WIDTH) + y
-                if weights[idx] > 0:
-                    self.pixels[idx] = [self.HUE, self.SAT, self.value]
-                    self.heat_squares(weights, x, y)
+        # Only look at the tiles stepped on, column by column, the order the loop over all
+        # tiles took (its x and y are transposed), so that overlapping heat comes out the same.
+        active = np.flatnonzero(context.weight_array[: len(self.pixels)]).tolist()
+        for idx in sorted(active, key=lambda idx: (idx % self.FLOOR_WIDTH, idx)):
+            x, y = divmod(idx, self.FLOOR_WIDTH)
+            self.pixels[idx] = [self.HUE, self.SAT, self.value]
+            self.heat_squares(weights, x, y)
 
         return self.hsv_to_rgb_pixels(self.pixels)
@@ -15,15 +15,24 @@ class Kaleidoscope(Base):
         self.times = [0 for _ in range(64)]
         self.palette = color.get_random_palette()
         self.palette_length = len(self.palette)
+        # Clock of the last frame rendered, to catch steps on frames in between.
+        self.last_clock = None
 
         for x in range(0, 64):
             self.active_px.append((0, 0, 0))
             self.times.append(0)
 
     def handle_weight_input(self, context):
-        # Weight values are either 0 or 1.  If 1 consider it a step and add a pixel
-        for i in range(0, 64):
-            if context.weights[i] > 0 and self.times[i] == 0:
+        # Each step onto a tile adds a pixel there, unless one is still fading.  Only
+        # every few frames are rendered, so look at every step since the last one.
+        if self.last_clock is None:
+            events = context.weight_events
+        else:
+            events = context.weight_events_since(self.last_clock)
+        self.last_clock = context.clock
+        for event in events:
+            i = event.index
+            if event.on and i < 64 and self.times[i] == 0:
                 col = random.randint(0, self.palette_length - 1)
                 self.active_px[i] = self.palette[col]
                 self.times[i] = context.clock
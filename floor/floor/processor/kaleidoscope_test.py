@@ -0,0 +1,54 @@
+from __future__ import absolute_import, division, print_function, unicode_literals
+
+from builtins import range
+from unittest import TestCase
+
+from floor.processor.base import RenderContext
+from floor.processor.kaleidoscope import Kaleidoscope
+from floor.util.weight_events import WeightTracker
+
+FPS = 120
+
+
+class KaleidoscopeTest(TestCase):
+    def setUp(self):
+        self.processor = Kaleidoscope()
+        self.tracker = WeightTracker(64)
+        self.clock = 100.0
+
+    def render(self, stepped=()):
+        weights = [1 if i in stepped else 0 for i in range(64)]
+        events = self.tracker.update(weights, self.clock)
+        context = RenderContext(
+            clock=self.clock,
+            downbeat=0,
+            weights=self.tracker.weight_list,
+            bpm=120.0,
+            ranged_values=[0] * 4,
+            switches=[False] * 4,
+            weight_array=self.tracker.weights,
+            weight_events=events,
+            weight_history=tuple(self.tracker.history),
+        )
+        frame = self.processor.get_next_frame(context)
+        self.clock += 1.0 / FPS
+        return frame
+
+    def lit(self, frame):
+        return [i for i, pixel in enumerate(frame) if pixel != (0, 0, 0)]
+
+    def test_step_between_rendered_frames(self):
+        self.render()
+        # A quick step, on and off again before the processor's next frame.
+        self.render(stepped={9})
+        self.render()
+        for _ in range(4):
+            frame = self.render()
+        # Lit, and mirrored into the other quarters of the floor.
+        self.assertEqual([9, 14, 49, 54], [i for i in self.lit(frame) if i in (9, 14, 49, 54)])
+        self.assertNotEqual(0, self.processor.times[9])
+
+    def test_holding_a_tile_lights_it_once(self):
+        for _ in range(FPS * 2):
+            frame = self.render(stepped={0})
+        self.assertEqual([], self.lit(frame))
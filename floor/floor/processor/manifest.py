@@ -0,0 +1,115 @@
+"""
+Finds processors without importing them.
+
+Every module in the processor package is parsed (not imported) to find the
+classes that derive from `Base`, directly or through another processor.
+The result maps each processor name to its module, and is cached on disk
+next to the processors, along with the modification time of every module,
+so it's only rebuilt when a processor changes.
+"""
+
+from __future__ import absolute_import
+
+import ast
+import glob
+import json
+import logging
+import os
+from collections import OrderedDict
+
+logger = logging.getLogger("manifest")
+
+PROCESSOR_DIR = os.path.dirname(os.path.realpath(__file__))
+CACHE_FILENAME = os.path.join(PROCESSOR_DIR, ".manifest.json")
+CACHE_VERSION = 1
+
+# Modules that can't hold processors.
+IGNORED_MODULES = {"__init__", "base", "constants", "manifest", "utils"}
+
+
+def module_mtimes(processor_dir=PROCESSOR_DIR):
+    """Returns a dict of module name -> modification time, for every module that may
+    hold processors.
+    """
+    mtimes = {}
+    for filename in glob.glob(os.path.join(processor_dir, "*.py")):
+        name = os.path.splitext(os.path.basename(filename))[0]
+        if name in IGNORED_MODULES or name.endswith("_test"):
+            continue
+        mtimes[name] = os.path.getmtime(filename)
+    return mtimes
+
+
+def _base_name(node):
+    """Returns the name a base class is referred to by, eg `Base` for `base.Base`."""
+    if isinstance(node, ast.Name):
+        return node.id
+    if isinstance(node, ast.Attribute):
+        return node.attr
+    return None
+
+
+def scan_module(filename):
+    """Returns a list of `(class name, [base class names])` for the top-level classes
+    in a module.
+    """
+    with open(filename) as fp:
+        tree = ast.parse(fp.read(), filename)
+    return [
+        (node.name, [_base_name(base) for base in node.bases])
+        for node in tree.body
+        if isinstance(node, ast.ClassDef)
+    ]
+
+
+def build_manifest(processor_dir=PROCESSOR_DIR):
+    """Returns a dict of processor name -> module name."""
+    classes = {}
+    for module in module_mtimes(processor_dir):
+        for name, bases in scan_module(os.path.join(processor_dir, module + ".py")):
+            classes[name] = (module, bases)
+
+    # A class is a processor if any of its bases is, starting from `Base`.
+    processors = {}
+    found = True
+    while found:
+        found = False
+        for name, (module, bases) in classes.items():
+            if name not in processors and any(
+                base == "Base" or base in processors for base in bases
+            ):
+                processors[name] = module
+                found = True
+    return OrderedDict(sorted(processors.items()))
+
+
+def _read_cache(cache_filename, mtimes):
+    try:
+        with open(cache_filename) as fp:
+            cache = json.load(fp)
+    except (IOError, OSError, ValueError):
+        return None
+    if cache.get("version") != CACHE_VERSION or cache.get("modules") != mtimes:
+        return None
+    return OrderedDict(sorted(cache["processors"].items()))
+
+
+def _write_cache(cache_filename, mtimes, processors):
+    cache = {"version": CACHE_VERSION, "modules": mtimes, "processors": processors}
+    try:
+        with open(cache_filename, "w") as fp:
+            json.dump(cache, fp, indent=2, sort_keys=True)
+    except (IOError, OSError) as e:
+        logger.debug("Could not cache processor manifest: {}".format(e))
+
+
+def load_manifest(processor_dir=PROCESSOR_DIR, cache_filename=CACHE_FILENAME):
+    """Returns a dict of processor name -> module name, from the cache if it's up to
+    date, and otherwise rebuilding and re-caching it.
+    """
+    mtimes = module_mtimes(processor_dir)
+    processors = _read_cache(cache_filename, mtimes)
+    if processors is None:
+        processors = build_manifest(processor_dir)
+        _write_cache(cache_filename, mtimes, processors)
+    return processors
@@ -0,0 +1,108 @@
+import os
+import shutil
+import tempfile
+import threading
+from unittest import TestCase
+
+import mock
+
+from floor import processor
+from floor.processor import ProcessorCatalog, manifest
+from floor.processor.base import Base, ProcessorRegistry
+
+MODULE_A = """
+from floor.processor.base import Base
+
+
+class Alpha(Base):
+    pass
+
+
+class Helper(object):
+    pass
+"""
+
+MODULE_B = """
+from floor.processor import module_a
+
+
+class Beta(module_a.Alpha):
+    pass
+"""
+
+
+class ManifestTest(TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmpdir)
+        self.cache_filename = os.path.join(self.tmpdir, ".manifest.json")
+        for name, source in (("module_a", MODULE_A), ("module_b", MODULE_B)):
+            with open(os.path.join(self.tmpdir, name + ".py"), "w") as fp:
+                fp.write(source)
+        with open(os.path.join(self.tmpdir, "module_a_test.py"), "w") as fp:
+            fp.write("class TestProcessor(Base):\n    pass\n")
+
+    def test_build_manifest(self):
+        self.assertEqual(
+            {"Alpha": "module_a", "Beta": "module_b"}, manifest.build_manifest(self.tmpdir)
+        )
+
+    def test_cache(self):
+        expected = manifest.load_manifest(self.tmpdir, self.cache_filename)
+        self.assertTrue(os.path.exists(self.cache_filename))
+
+        with mock.patch.object(manifest, "build_manifest") as build_manifest:
+            self.assertEqual(expected, manifest.load_manifest(self.tmpdir, self.cache_filename))
+            build_manifest.assert_not_called()
+
+            # Changing a module invalidates the cache.
+            filename = os.path.join(self.tmpdir, "module_b.py")
+            os.utime(filename, (0, os.path.getmtime(filename) + 10))
+            build_manifest.return_value = {}
+            self.assertEqual({}, manifest.load_manifest(self.tmpdir, self.cache_filename))
+
+    def test_manifest_matches_registry(self):
+        processors = manifest.build_manifest()
+        catalog = ProcessorCatalog(processors)
+        for name, module in processors.items():
+            cls = catalog[name]
+            self.assertEqual("floor.processor.{}".format(module), cls.__module__)
+        self.assertIn("Animator", processors)
+        self.assertIn("RipplePulse", processors)
+
+
+class ProcessorCatalogTest(TestCase):
+    def test_imports_lazily(self):
+        catalog = ProcessorCatalog({"Spiral": "spiral", "Missing": "missing_module"})
+        with mock.patch("importlib.import_module") as import_module:
+            self.assertIn("Spiral", catalog)
+            self.assertIn("Spiral", list(catalog))
+            import_module.assert_not_called()
+
+    def test_lookup(self):
+        catalog = ProcessorCatalog({"Spiral": "spiral"})
+        self.assertIs(ProcessorRegistry.ALL_PROCESSORS["Spiral"], catalog["Spiral"])
+        self.assertIsNone(catalog.get("Unknown"))
+        self.assertNotIn("Unknown", catalog)
+
+    def test_names_while_registering(self):
+        catalog = ProcessorCatalog({})
+        names = ["CatalogRace{}".format(i) for i in range(2000)]
+        for name in names:
+            self.addCleanup(ProcessorRegistry.ALL_PROCESSORS.pop, name, None)
+        done = threading.Event()
+
+        def register():
+            for name in names:
+                ProcessorRegistry(name, (Base,), {})
+            done.set()
+
+        thread = threading.Thread(target=register)
+        thread.start()
+        while not done.is_set():
+            catalog.names()
+        thread.join()
+        self.assertTrue(set(names) <= set(catalog.names()))
+
+    def test_all_processors_is_cached(self):
+        self.assertIs(processor.all_processors(), processor.all_processors())
@@ -0,0 +1,101 @@
+from __future__ import absolute_import, division
+
+import math
+import os
+
+from floor.processor.base import Base
+from floor.util.frame_buffer import FrameBuffer
+from floor.util.frame_file import FrameFile
+
+BASE_DIR = os.path.dirname(os.path.realpath(__file__))
+
+
+class Playback(Base):
+    """Plays back a pre-rendered frame file, eg from `bin/render.py`.
+
+    Frames are returned straight out of the memory-mapped file, so playback
+    costs the same small amount of CPU however expensive the frames were to
+    render, and only the frames around the current one need to be in memory.
+
+    If the file records the tempo it was rendered at, playback follows the
+    beat: at twice that tempo, the file plays twice as fast. On a tempo change,
+    playback carries on from the nearest beat of the file.
+
+    Args:
+        filename -- The frame file. Relative paths are looked up in `FRAMES_DIR`
+            if not found in the current directory.
+        loop -- Whether to start over at the end of the file, or hold the last
+            frame (default: True).
+        follow_tempo -- Whether to follow the beat, if the file has a tempo
+            (default: True).
+    """
+
+    FRAMES_DIR = os.path.join(BASE_DIR, "..", "..", "config", "frames")
+
+    def __init__(self, **kwargs):
+        super(Playback, self).__init__(**kwargs)
+        self.loop = kwargs.get("loop", True)
+        self.file = None
+        self.frame = FrameBuffer()
+
+        filename = kwargs.get("filename")
+        if filename:
+            self.file = FrameFile(self.resolve_filename(filename))
+            self.file.advise_sequential()
+            self.frame = FrameBuffer(num_pixels=self.file.num_pixels)
+        else:
+            self.logger.warning("No frame file given, playing nothing")
+        self.follow_tempo = bool(kwargs.get("follow_tempo", True) and self.file and self.file.bpm)
+
+        # Position in the file, in frames, including loops.
+        self.position = None
+        # Clock time of the first frame, when not following the tempo.
+        self.start_time = None
+        # Beats of the file played before `downbeat`, and the tempo since then.
+        self.beats = 0
+        self.bpm = None
+        self.downbeat = None
+
+    @classmethod
+    def resolve_filename(cls, filename):
+        if os.path.isabs(filename) or os.path.exists(filename):
+            return filename
+        return os.path.join(cls.FRAMES_DIR, filename)
+
+    def get_seconds(self, context):
+        """Returns how far into the file to play, in seconds of the file's show time."""
+        if not self.follow_tempo:
+            if self.start_time is None:
+                self.start_time = context.clock
+            return context.clock - self.start_time
+
+        if (context.bpm, context.downbeat) != (self.bpm, self.downbeat):
+            if self.bpm is not None:
+                # Carry on from the file's beat nearest to the new downbeat.
+                elapsed = context.downbeat - self.downbeat
+                self.beats = round(self.beats + elapsed * self.bpm / 60.0)
+            self.bpm = context.bpm
+            self.downbeat = context.downbeat
+
+        beats = self.beats + (context.clock - self.downbeat) * self.bpm / 60.0
+        return self.file.downbeat + beats * 60.0 / self.file.bpm
+
+    def get_frame_generation(self):
+        return self.position
+
+    def get_next_frame(self, context):
+        if not self.file or not len(self.file):
+            self.frame.clear()
+            return self.frame
+
+        # Allow for rounding, so that a clock landing on a frame starts it.
+        position = max(0, int(math.floor(self.get_seconds(context) * self.file.fps + 1e-6)))
+        num_frames = len(self.file)
+        if self.loop:
+            idx = position % num_frames
+        else:
+            position = idx = min(position, num_frames - 1)
+
+        self.position = position
+        self.frame.rgb = self.file.frames[idx]
+        return self.frame
@@ -0,0 +1,91 @@
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+
+import mock
+import numpy as np
+
+from floor.processor.base import RenderContext
+from floor.processor.playback import Playback
+from floor.processor.utils import frame_generation
+from floor.util.frame_file import FrameFileWriter
+
+
+def context(clock, bpm=120.0, downbeat=0.0):
+    return RenderContext(clock, downbeat, [0] * 64, bpm, [0] * 4, [False] * 4)
+
+
+class PlaybackTest(TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmpdir)
+
+    def write_frames(self, num_frames=20, fps=10, bpm=120.0, name="test.frames"):
+        """Writes a file where frame `n` has red value `n`."""
+        filename = os.path.join(self.tmpdir, name)
+        with FrameFileWriter(filename, fps=fps, bpm=bpm) as writer:
+            for n in range(num_frames):
+                writer.write([(n, 0, 0)] * 64)
+        return filename
+
+    def frame_number(self, processor, *args, **kwargs):
+        return int(processor.get_next_frame(context(*args, **kwargs)).rgb[0, 0])
+
+    def test_follows_tempo(self):
+        processor = Playback(filename=self.write_frames())
+        self.assertEqual(3, self.frame_number(processor, 0.35))
+
+        processor = Playback(filename=self.write_frames())
+        self.assertEqual(7, self.frame_number(processor, 0.35, bpm=240.0))
+
+    def test_tempo_change_continues_from_nearest_beat(self):
+        processor = Playback(filename=self.write_frames())
+        self.assertEqual(6, self.frame_number(processor, 0.6))
+
+        # 1.2 beats in, so the new downbeat starts from the file's second beat.
+        self.assertEqual(5, self.frame_number(processor, 0.6, bpm=240.0, downbeat=0.6))
+        self.assertEqual(7, self.frame_number(processor, 0.725, bpm=240.0, downbeat=0.6))
+
+    def test_ignores_tempo(self):
+        processor = Playback(filename=self.write_frames(), follow_tempo=False)
+        self.assertEqual(0, self.frame_number(processor, 100.0, bpm=240.0))
+        self.assertEqual(3, self.frame_number(processor, 100.3, bpm=240.0))
+
+        processor = Playback(filename=self.write_frames(bpm=0.0))
+        self.assertEqual(0, self.frame_number(processor, 100.0))
+        self.assertEqual(3, self.frame_number(processor, 100.3))
+
+    def test_loop(self):
+        processor = Playback(filename=self.write_frames())
+        self.assertEqual(5, self.frame_number(processor, 2.5))
+
+        processor = Playback(filename=self.write_frames(), loop=False)
+        self.assertEqual(19, self.frame_number(processor, 2.5))
+
+    def test_frames_are_views(self):
+        processor = Playback(filename=self.write_frames())
+        frame = processor.get_next_frame(context(0.0))
+        self.assertTrue(np.shares_memory(frame.rgb, processor.file.frames))
+
+    def test_frame_generation(self):
+        processor = Playback(filename=self.write_frames())
+        processor.get_next_frame(context(0.1))
+        generation = frame_generation(processor)
+        processor.get_next_frame(context(0.15))
+        self.assertEqual(generation, frame_generation(processor))
+        processor.get_next_frame(context(0.2))
+        self.assertNotEqual(generation, frame_generation(processor))
+        # Looping back to the first frame is still a new frame.
+        processor.get_next_frame(context(2.1))
+        self.assertNotEqual(generation, frame_generation(processor))
+
+    def test_frames_dir(self):
+        self.write_frames(name="in_frames_dir.frames")
+        with mock.patch.object(Playback, "FRAMES_DIR", self.tmpdir):
+            processor = Playback(filename="in_frames_dir.frames")
+        self.assertEqual(20, len(processor.file))
+
+    def test_no_file(self):
+        processor = Playback()
+        self.assertFalse(processor.get_next_frame(context(0.0)).rgb.any())
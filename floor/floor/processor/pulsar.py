@@ -1,6 +1,8 @@
 import random
 from builtins import range
 
+import numpy as np
+
 from floor.processor.base import Base
 from floor.processor.constants import COLOR_MAXIMUM
 from floor.processor.utils import clocked
@@ -54,15 +56,14 @@ class Pulsar(Base):
 
         return sum
 
-    def handle_weight_input(self, weights):
+    def handle_weight_input(self, weight_array):
         # Weight values are either 0 or 1.  If 1 consider it a step and add a pixel
-        for i in range(0, 64):
-            if weights[i] > 0:
-                self.pixels[i] = (
-                    COLOR_MAXIMUM * random.random(),
-                    COLOR_MAXIMUM * random.random(),
-                    COLOR_MAXIMUM * random.random(),
-                )
+        for i in np.flatnonzero(weight_array[:64]).tolist():
+            self.pixels[i] = (
+                COLOR_MAXIMUM * random.random(),
+                COLOR_MAXIMUM * random.random(),
+                COLOR_MAXIMUM * random.random(),
+            )
 
     def random_weight_input(self):
         count = random.randint(1, 5)
@@ -77,8 +78,6 @@ class Pulsar(Base):
 
     @clocked(frames_per_second=24)
     def get_next_frame(self, context):
-        weights = context.weights
-
         if self.last_time is None:
             self.last_time = context.clock
         next_time = context.clock
@@ -87,7 +86,7 @@ class Pulsar(Base):
         reset_time = 1.2
 
         # Read from weight input
-        self.handle_weight_input(weights)
+        self.handle_weight_input(context.weight_array)
 
         # whenever we hit the reset time, wipe the board and choose more sources
         if next_time - self.last_time > reset_time:
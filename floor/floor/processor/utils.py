@@ -1,6 +1,10 @@
+import math
+import weakref
 from builtins import object
 
-BLANK_FRAME = [(0, 0, 0)] * 64
+from floor.util.geometry import DEFAULT_GEOMETRY
+
+BLANK_FRAME = DEFAULT_GEOMETRY.blank_frame()
 
 
 class clocked(object):
@@ -8,7 +12,9 @@ class clocked(object):
 
     You can think of this decorator as providing a TTL cache decorator for
     the method it decorates, the TTL being dynamically computed from
-    `context.bpm`.
+    `context.bpm`. Each instance has its own cache, and frames start on a grid
+    measured from `context.downbeat`, so a `frames_per_beat=1` processor renders
+    on every beat.
 
     Here is an example of a trivial processor which changes colors once per
     quarter note:
@@ -20,7 +26,7 @@ class clocked(object):
             self.position += 1
             self.position %= len(COLORS)
             color = COLORS[self.position]
-            return [color] * 64
+            return [color] * context.geometry.num_pixels
     """
 
     def __init__(self, frames_per_beat=None, frames_per_second=None):
@@ -39,43 +45,118 @@ class clocked(object):
             raise ValueError("Must provide frames_per_beat and/or frames_per_second")
         self.frames_per_beat = frames_per_beat
         self.frames_per_second = frames_per_second
-        self.last_retval = None
-        self.next_time = None
+        self.states = weakref.WeakKeyDictionary()
+        # State for instances that can't be weakly referenced, such as `None`.
+        self.shared_state = _ClockState()
+
+    def state_for(self, instance):
+        """Returns the cached frame and deadline of `instance`."""
+        try:
+            state = self.states.get(instance)
+        except TypeError:
+            return self.shared_state
+        if state is None:
+            state = self.states[instance] = _ClockState()
+        return state
+
+    def next_deadline(self, context):
+        """Returns the start of the next frame after `context.clock`.
+
+        Frames are laid out on a grid starting at `context.downbeat`, so that they
+        land on beat boundaries however late the decorated method gets called.
+        """
+        now = context.clock
+        downbeat = context.downbeat or 0.0
 
-    def __call__(self, fn, *args, **kwargs):
+        next_time = None
+        if self.frames_per_beat:
+            bpm = context.bpm or 120.0
+            next_time = _next_grid_time(now, downbeat, 60.0 / bpm / float(self.frames_per_beat))
         if self.frames_per_second:
-            fps_frame_period = 1.0 / self.frames_per_second
+            fps_deadline = _next_grid_time(now, downbeat, 1.0 / self.frames_per_second)
+            if next_time is None or fps_deadline < next_time:
+                next_time = fps_deadline
+        return next_time
+
+    def __call__(self, fn):
+        name = getattr(fn, "__name__", None)
 
         def new_fn(*args, **kwargs):
+            instance = args[0]
             context = args[1]
-            now = context.clock
-
-            # Too soon, return current frame.
-            if self.next_time and now < self.next_time:
-                return self.last_retval
-
-            bps_deadline = None
-            if self.frames_per_beat:
-                bpm = context.bpm or 120.0
-                beats_per_second = 60.0 / bpm
-                bps_frame_period = beats_per_second / float(self.frames_per_beat)
-                bps_deadline = now + bps_frame_period
-
-            fps_deadline = None
-            if self.frames_per_second:
-                fps_deadline = now + fps_frame_period
-
-            if bps_deadline is not None and fps_deadline is not None:
-                next_time = min(bps_deadline, fps_deadline)
-            elif bps_deadline is not None:
-                next_time = bps_deadline
-            else:
-                next_time = fps_deadline
 
-            self.next_time = next_time
+            # A clocked override calling a clocked method of its superclass (or vice
+            # versa): only the outermost clock applies.
+            key = (id(instance), name)
+            if key in _running:
+                return fn(*args, **kwargs)
 
-            # Generate a new frame and return it.
-            self.last_retval = fn(*args, **kwargs)
-            return self.last_retval
+            state = self.state_for(instance)
+
+            # Too soon, return current frame. A new tempo or downbeat means a new grid,
+            # so the deadline no longer applies.
+            tempo = (context.bpm, context.downbeat)
+            if (
+                state.next_time is not None
+                and context.clock + _EPSILON < state.next_time
+                and state.tempo == tempo
+            ):
+                return state.last_retval
+
+            state.next_time = self.next_deadline(context)
+            state.tempo = tempo
 
+            # Generate a new frame and return it.
+            _running.add(key)
+            try:
+                state.last_retval = fn(*args, **kwargs)
+            finally:
+                _running.discard(key)
+            state.generation += 1
+            return state.last_retval
+
+        new_fn.clocked = self
         return new_fn
+
+
+class _ClockState(object):
+    """The frame cache of a single instance, for a single `clocked` method."""
+
+    __slots__ = ("last_retval", "next_time", "tempo", "generation")
+
+    def __init__(self):
+        self.last_retval = None
+        self.next_time = None
+        # The `(bpm, downbeat)` that `next_time` was computed for.
+        self.tempo = None
+        # Incremented whenever a new frame is generated; see `frame_generation`.
+        self.generation = 0
+
+
+# `(id(instance), method name)` of every clocked method being called.
+_running = set()
+
+# Allowance for rounding, in seconds, so that a clock landing exactly on a frame boundary
+# counts as being in the new frame.
+_EPSILON = 1e-9
+
+
+def _next_grid_time(now, origin, period):
+    """Returns the first `origin + n * period` that is after `now`."""
+    return origin + (math.floor((now - origin + _EPSILON) / period) + 1) * period
+
+
+def frame_generation(processor):
+    """Returns a counter that changes whenever `processor.get_next_frame` generates a new
+    frame, if it is `clocked`. While the counter stays the same, the same frame is being
+    returned.
+
+    Processors that aren't `clocked` can provide the same counter from a
+    `get_frame_generation()` method. Returns `None` for other processors, which may
+    return a new frame on every call.
+    """
+    decorator = getattr(getattr(processor, "get_next_frame", None), "clocked", None)
+    if decorator is None:
+        get_frame_generation = getattr(processor, "get_frame_generation", None)
+        return get_frame_generation() if get_frame_generation else None
+    return decorator.state_for(processor).generation
@@ -4,8 +4,36 @@ from unittest import TestCase
 
 import mock
 
+from floor.processor.base import Base as BaseProcessor
 from floor.processor.base import RenderContext
-from floor.processor.utils import clocked
+from floor.processor.utils import clocked, frame_generation
+
+
+class ClockedGenerationProcessor(BaseProcessor):
+    @clocked(frames_per_second=10)
+    def get_next_frame(self, context):
+        return [(context.clock, 0, 0)] * 64
+
+
+class ClockedBeatProcessor(BaseProcessor):
+    def __init__(self, **kwargs):
+        super(ClockedBeatProcessor, self).__init__(**kwargs)
+        self.calls = 0
+
+    @clocked(frames_per_beat=1)
+    def get_next_frame(self, context):
+        self.calls += 1
+        return [(self.calls, 0, 0)] * 64
+
+
+class ClockedBeatSubclassProcessor(ClockedBeatProcessor):
+    @clocked(frames_per_beat=2)
+    def get_next_frame(self, context):
+        return super(ClockedBeatSubclassProcessor, self).get_next_frame(context)
+
+
+def beat_context(clock, downbeat=0, bpm=120):
+    return RenderContext(clock, downbeat, [0] * 64, bpm, [0] * 4, [False] * 4)
 
 
 class UtilsTestCase(TestCase):
@@ -157,3 +185,72 @@ class UtilsTestCase(TestCase):
             fn(processor, RenderContext(clock, downbeat, weights, bpm, ranged_values, switches)),
         )
         self.assertEqual(4, wrapped_fn.call_count)
+
+    def test_frame_generation(self):
+        processor = ClockedGenerationProcessor()
+        weights = [0] * 64
+
+        def render(clock):
+            return processor.get_next_frame(
+                RenderContext(clock, 0, weights, 120, [0] * 4, [False] * 4)
+            )
+
+        render(0)
+        generation = frame_generation(processor)
+        render(0.05)
+        self.assertEqual(generation, frame_generation(processor))
+        render(0.1)
+        self.assertNotEqual(generation, frame_generation(processor))
+
+    def test_frame_generation_unclocked(self):
+        self.assertIsNone(frame_generation(BaseProcessor()))
+
+    def test_clocked_instances_are_independent(self):
+        first = ClockedBeatProcessor()
+        second = ClockedBeatProcessor()
+
+        for clock in (0, 0.1, 0.5, 0.6, 1.0):
+            first.get_next_frame(beat_context(clock))
+            second.get_next_frame(beat_context(clock))
+
+        self.assertEqual(3, first.calls)
+        self.assertEqual(3, second.calls)
+        self.assertEqual(frame_generation(first), frame_generation(second))
+
+    def test_clocked_aligns_to_downbeat(self):
+        processor = ClockedBeatProcessor()
+
+        # Beats at 120 bpm are 0.5 seconds apart, starting from the downbeat at
+        # 0.3; rendering late in a beat doesn't push back the next one.
+        processor.get_next_frame(beat_context(0.75, downbeat=0.3))
+        processor.get_next_frame(beat_context(0.79, downbeat=0.3))
+        self.assertEqual(1, processor.calls)
+        processor.get_next_frame(beat_context(0.8, downbeat=0.3))
+        self.assertEqual(2, processor.calls)
+        processor.get_next_frame(beat_context(1.29, downbeat=0.3))
+        self.assertEqual(2, processor.calls)
+        processor.get_next_frame(beat_context(1.3, downbeat=0.3))
+        self.assertEqual(3, processor.calls)
+
+    def test_clocked_override_only_clocks_once(self):
+        processor = ClockedBeatSubclassProcessor()
+
+        # The subclass renders twice per beat; the superclass's once-per-beat
+        # clock shouldn't hold it back.
+        frames = [processor.get_next_frame(beat_context(clock)) for clock in (0, 0.25, 0.5)]
+        self.assertEqual(3, processor.calls)
+        self.assertEqual([1, 2, 3], [frame[0][0] for frame in frames])
+
+    def test_clocked_tempo_change(self):
+        processor = ClockedBeatProcessor()
+        processor.get_next_frame(beat_context(0, bpm=60))
+        processor.get_next_frame(beat_context(0.5, bpm=60))
+        self.assertEqual(1, processor.calls)
+
+        # A new tempo starts a new grid of beats right away.
+        processor.get_next_frame(beat_context(0.6, downbeat=0.6, bpm=240))
+        self.assertEqual(2, processor.calls)
+        processor.get_next_frame(beat_context(0.8, downbeat=0.6, bpm=240))
+        self.assertEqual(2, processor.calls)
+        processor.get_next_frame(beat_context(0.85, downbeat=0.6, bpm=240))
+        self.assertEqual(3, processor.calls)
@@ -44,7 +44,7 @@ def view_tempo(bpm, downbeat):
 
 def view_processors(processors):
     ret = {}
-    for k, v in processors.items():
+    for k in processors:
         ret[k] = {
             "name": k,
         }
@@ -242,6 +242,23 @@ def api_brightness():
     return jsonify({"brightness": float(controller.brightness)})
 
 
+@app.route("/api/metrics", methods=["GET", "POST"])
+def api_metrics():
+    metrics = app.controller.metrics
+    if request.method == "POST":
+        content = request.get_json(silent=True) or {}
+        enabled = content.get("enabled")
+        if enabled is not None:
+            metrics.set_enabled(enabled)
+        if content.get("reset"):
+            metrics.reset()
+
+    result = metrics.to_object()
+    result["frame_budget_ns"] = int(app.controller.frame_seconds * 1e9)
+    result["scheduler"] = app.controller.scheduler.to_object()
+    return jsonify(result)
+
+
 @app.route("/api/layout", methods=["POST"])
 def api_layout():
     """
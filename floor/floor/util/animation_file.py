@@ -0,0 +1,101 @@
+"""
+Compiles animations to frame files, and loads them for `Animator`.
+
+Animations are drawn in [Piskel](http://www.piskelapp.com/) and exported as C
+source, which used to be converted to Python modules holding one big list
+literal. Loading such a module builds the whole list, and every pixel then
+needs scaling from `[0, 255]` to `[0, COLOR_MAXIMUM]` on every frame.
+
+Compiled animations are frame files (see `floor.util.frame_file`), with
+colors already scaled, next to their sources in `ANIMATIONS_DIR`. They are
+memory-mapped, so loading one costs next to nothing, and frames are returned
+straight out of the file. See `bin/compile-animations.py`.
+"""
+
+from __future__ import division
+
+import importlib
+import logging
+import os
+import re
+import runpy
+
+import numpy as np
+
+from floor.processor.constants import COLOR_MAXIMUM
+from floor.util.frame_file import FrameFile, FrameFileWriter
+
+logger = logging.getLogger("animation_file")
+
+BASE_DIR = os.path.dirname(os.path.realpath(__file__))
+ANIMATIONS_DIR = os.path.normpath(os.path.join(BASE_DIR, "..", "processor", "animations"))
+ANIMATIONS_PACKAGE = "floor.processor.animations"
+
+COMPILED_EXT = ".frames"
+
+# The rate `Animator` plays animations at.
+ANIMATION_FPS = 12
+
+PISKEL_START_RE = re.compile(r"static const uint32_t [^\[]+\[\d+\]\[\d+\] = \{")
+# Piskel colors are 0xAABBGGRR.
+PISKEL_COLOR_RE = re.compile(r"0x[0-9a-fA-F]{2}([0-9a-fA-F]{2})([0-9a-fA-F]{2})([0-9a-fA-F]{2})")
+
+
+def parse_piskel(source):
+    """Returns the frames of a Piskel C export, as lists of `(r, g, b)` on `[0, 255]`."""
+    match = PISKEL_START_RE.search(source)
+    if not match:
+        raise ValueError("No Piskel frame data found")
+
+    frames = []
+    for block in source[match.end() :].split("}")[:-1]:
+        frame = [(int(r, 16), int(g, 16), int(b, 16)) for b, g, r in PISKEL_COLOR_RE.findall(block)]
+        if frame:
+            frames.append(frame)
+    return frames
+
+
+def load_source(filename):
+    """Returns the frames of an animation source: a Piskel `.c` export, or a `.py`
+    module with an `anim()` function.
+    """
+    if filename.endswith(".py"):
+        return runpy.run_path(filename)["anim"]()
+    with open(filename) as fp:
+        return parse_piskel(fp.read())
+
+
+def scale_frames(frames):
+    """Scales frames on `[0, 255]` to a `(num_frames, num_pixels, 3)` array on
+    `[0, COLOR_MAXIMUM]`, truncated as the compositor would.
+    """
+    return np.trunc(np.asarray(frames, dtype=np.float64) * (COLOR_MAXIMUM / 255.0))
+
+
+def compile_animation(frames, filename, fps=ANIMATION_FPS):
+    """Writes frames on `[0, 255]` to the frame file `filename`."""
+    scaled = scale_frames(frames)
+    with FrameFileWriter(filename, fps=fps, num_pixels=scaled.shape[1]) as writer:
+        for frame in scaled:
+            writer.write(frame)
+    return len(scaled)
+
+
+def compiled_filename(name, animations_dir=ANIMATIONS_DIR):
+    return os.path.join(animations_dir, name + COMPILED_EXT)
+
+
+def load_animation(name, animations_dir=ANIMATIONS_DIR):
+    """Returns the frames of animation `name`, as a `(num_frames, num_pixels, 3)` array
+    on `[0, COLOR_MAXIMUM]`.
+
+    Memory-maps the compiled animation if there is one, and otherwise falls back to
+    importing the animation's module.
+    """
+    filename = compiled_filename(name, animations_dir)
+    if os.path.exists(filename):
+        return FrameFile(filename).frames
+
+    logger.info("{} is not compiled, see bin/compile-animations.py".format(name))
+    module = importlib.import_module("{}.{}".format(ANIMATIONS_PACKAGE, name))
+    return scale_frames(module.anim())
@@ -0,0 +1,79 @@
+import glob
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+
+import numpy as np
+
+from floor.processor.animator import Animator
+from floor.processor.base import RenderContext
+from floor.processor.constants import COLOR_MAXIMUM
+from floor.util import animation_file
+from floor.util.color_utils import scale_color
+from floor.util.frame_file import FrameFile
+
+PISKEL_SOURCE = """
+#include <stdint.h>
+
+static const uint32_t new_piskel_data[2][2] = {
+{
+0x00000000, 0xff0000ff
+},
+{
+0xffff0000, 0xff804020
+}
+};
+"""
+
+
+class AnimationFileTest(TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmpdir)
+
+    def test_parse_piskel(self):
+        self.assertEqual(
+            [[(0, 0, 0), (255, 0, 0)], [(0, 0, 255), (32, 64, 128)]],
+            animation_file.parse_piskel(PISKEL_SOURCE),
+        )
+        with self.assertRaises(ValueError):
+            animation_file.parse_piskel("int main() {}")
+
+    def test_compile_and_load(self):
+        frames = animation_file.parse_piskel(PISKEL_SOURCE)
+        filename = animation_file.compiled_filename("tiny", self.tmpdir)
+        self.assertEqual(2, animation_file.compile_animation(frames, filename))
+
+        loaded = animation_file.load_animation("tiny", self.tmpdir)
+        self.assertEqual((2, 2, 3), loaded.shape)
+        self.assertEqual([COLOR_MAXIMUM, 0, 0], loaded[0, 1].tolist())
+        self.assertEqual([128, 256, 513], loaded[1, 1].tolist())
+        self.assertEqual(animation_file.ANIMATION_FPS, FrameFile(filename).fps)
+
+    def test_falls_back_to_module(self):
+        loaded = animation_file.load_animation("gods_eye", self.tmpdir)
+        self.assertEqual(animation_file.load_animation("gods_eye").tolist(), loaded.tolist())
+
+    def test_compiled_animations_are_up_to_date(self):
+        sources = glob.glob(os.path.join(animation_file.ANIMATIONS_DIR, "*.c"))
+        self.assertTrue(sources)
+        for source in sources:
+            name = os.path.splitext(os.path.basename(source))[0]
+            expected = animation_file.scale_frames(animation_file.load_source(source))
+            compiled = FrameFile(animation_file.compiled_filename(name))
+            self.assertEqual(expected.tolist(), compiled.frames.tolist(), name)
+
+    def test_animator_matches_scaled_animation(self):
+        animator = Animator(animation="radiating")
+        source = animation_file.load_source(
+            os.path.join(animation_file.ANIMATIONS_DIR, "radiating.py")
+        )
+
+        for n in range(48):
+            context = RenderContext(n / 24.0, 0, [0] * 64, 120, [0] * 4, [False] * 4)
+            frame = animator.get_next_frame(context)
+            expected = [
+                scale_color(p, COLOR_MAXIMUM / 255.0) for p in source[(n + 1) // 2 % len(source)]
+            ]
+            self.assertEqual(np.trunc(expected).tolist(), frame.rgb.tolist())
@@ -0,0 +1,457 @@
+"""
+Render benchmarks for processors, with saved baselines to catch regressions.
+
+Each processor is driven through a `ProcessorRenderLayer`, exactly as the
+`Controller` would, on a fake clock so that a benchmark of a few seconds of
+show time runs as fast as the processor allows. Weight inputs follow a fixed
+script of feet wandering around the floor, or weights recorded from a real
+show (see `floor.util.weight_log`). See `bin/benchmark.py`.
+"""
+
+from __future__ import division
+
+import gc
+import json
+import logging
+import math
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+import tracemalloc
+from builtins import object, range
+
+import numpy as np
+
+from floor.controller.rendering import ProcessorRenderLayer
+from floor.processor.base import RenderContext
+from floor.util.fake_clock import FakeClock
+from floor.util.geometry import DEFAULT_GEOMETRY
+from floor.util.step_filter import StepFilter
+from floor.util.weight_decoder import WeightDecoder
+from floor.util.weight_events import WeightTracker
+from floor.util.weight_log import WeightLog
+
+logger = logging.getLogger("benchmark")
+
+DEFAULT_FPS = 120
+DEFAULT_BPMS = (90.0, 120.0, 160.0)
+
+# Measured frames per BPM, after warming up.
+DEFAULT_FRAMES = 600
+DEFAULT_WARMUP_FRAMES = 30
+
+# Measuring allocations is slow, so only this many frames per BPM are traced.
+DEFAULT_ALLOCATION_FRAMES = 120
+
+# A processor regresses when a metric grows by more than this fraction of its baseline...
+DEFAULT_THRESHOLD = 0.25
+
+# ...and by more than these absolute amounts, below which differences are noise.
+MIN_REGRESSION_NS = 2000
+MIN_REGRESSION_BYTES = 1024
+MIN_REGRESSION_BLOCKS = 16
+
+BASELINE_VERSION = 1
+
+BASE_DIR = os.path.dirname(os.path.realpath(__file__))
+ROOT_DIR = os.path.normpath(os.path.join(BASE_DIR, "..", ".."))
+DEFAULT_PLAYLIST = os.path.join(ROOT_DIR, "config", "playlists", "default.json")
+DEFAULT_STARTUP_RUNS = 5
+
+# Run in a fresh interpreter by `measure_startup`, with the playlist as its argument.
+STARTUP_SCRIPT = """
+import sys
+import time
+
+start = time.perf_counter()
+from floor.controller import Controller, Playlist, PlaylistManager
+from floor.driver.base import Base
+from floor.processor import all_processors
+
+playlist = Playlist.from_file(sys.argv[1], all_processors())
+controller = Controller([Base({})], PlaylistManager(playlist))
+controller.generate_frame()
+print(time.perf_counter() - start)
+"""
+
+
+def scripted_weights(
+    num_frames,
+    fps=DEFAULT_FPS,
+    num_feet=3,
+    steps_per_second=2.0,
+    seed=0,
+    geometry=DEFAULT_GEOMETRY,
+):
+    """Returns `num_frames` of `(weights, pressures)` for a few feet stepping around the floor.
+
+    Each foot moves to a neighboring tile once per step and stays down for the
+    first half of it, pressing less hard as it lifts. The same arguments always
+    produce the same script.
+    """
+    rng = random.Random(seed)
+    num_tiles = geometry.num_pixels
+    feet = [rng.randrange(num_tiles) for _ in range(num_feet)]
+    frames_per_step = max(2, int(fps / steps_per_second))
+    frames_down = frames_per_step // 2
+
+    script = []
+    for frame in range(num_frames):
+        weights = [0] * num_tiles
+        pressures = [0.0] * num_tiles
+        for foot in range(num_feet):
+            # Stagger the feet so they don't all land at once.
+            phase = (frame + foot * frames_per_step // num_feet) % frames_per_step
+            if phase == 0:
+                x, y = geometry.coordinates[feet[foot]]
+                x = min(max(x + rng.choice((-1, 0, 1)), 0), geometry.cols - 1)
+                y = min(max(y + rng.choice((-1, 0, 1)), 0), geometry.rows - 1)
+                feet[foot] = geometry.index(x, y)
+            if phase < frames_down:
+                position = feet[foot]
+                weights[position] = 1
+                pressures[position] = max(pressures[position], 1.0 - phase / frames_down)
+        script.append((weights, pressures))
+    return script
+
+
+def logged_weights(
+    filename,
+    num_frames,
+    fps=DEFAULT_FPS,
+    geometry=DEFAULT_GEOMETRY,
+    step_filter=None,
+    threshold=200,
+):
+    """Returns `num_frames` of `(weights, pressures)` played back from a weight log,
+    looping it if it's too short.
+
+    Arguments:
+        filename {str} -- The weight log, as recorded by the Raspberry driver.
+        num_frames {int} -- How many frames to return.
+
+    Keyword Arguments:
+        step_filter {dict} -- Step filter settings, as in a layout.
+        threshold {int} -- The floor threshold the log was recorded with.
+    """
+    log = WeightLog(filename)
+    if not len(log):
+        raise ValueError("{}: no frames to play".format(filename))
+    decoder = WeightDecoder(
+        geometry.chain_order(),
+        threshold,
+        step_filter=StepFilter.from_object(
+            geometry.num_pixels, step_filter, on_threshold=threshold
+        ),
+    )
+    # Leave a frame's gap between the end of the log and the start.
+    period = log.duration() + log.duration() / max(1, len(log) - 1)
+    script = []
+    position = 0
+    for frame in range(num_frames):
+        frame_time = frame / fps
+        loops, offset = divmod(frame_time, period) if period else (frame, 0.0)
+        end = int(np.searchsorted(log.times, log.times[0] + offset, side="right"))
+        if end < position:
+            position = 0
+        for index in range(position, end):
+            decoder.decode(log.frames[index], log.times[index] + loops * period)
+        position = end
+        script.append((decoder.weights.tolist(), decoder.pressures.tolist()))
+    return script
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0
+    rank = int(math.ceil(pct / 100.0 * len(sorted_values)))
+    return sorted_values[min(max(rank, 1), len(sorted_values)) - 1]
+
+
+class ProcessorResult(object):
+    """Benchmark results for a single processor."""
+
+    def __init__(
+        self,
+        name,
+        ns_per_frame,
+        p50_ns,
+        p99_ns,
+        peak_bytes_per_frame=None,
+        frames=0,
+        alloc_blocks_per_frame=None,
+    ):
+        self.name = name
+        self.ns_per_frame = ns_per_frame
+        self.p50_ns = p50_ns
+        self.p99_ns = p99_ns
+        # The peak memory in use while rendering a frame, above what was in use before it,
+        # averaged over the traced frames.
+        self.peak_bytes_per_frame = peak_bytes_per_frame
+        # Memory blocks allocated while rendering a frame and still held after it, eg
+        # by growing lists or caches, averaged over the traced frames.
+        self.alloc_blocks_per_frame = alloc_blocks_per_frame
+        self.frames = frames
+
+    @classmethod
+    def from_samples(cls, name, samples_ns, peak_samples=None, block_samples=None):
+        samples_ns = sorted(samples_ns)
+        peak_bytes = None
+        if peak_samples:
+            peak_bytes = sum(peak_samples) // len(peak_samples)
+        alloc_blocks = None
+        if block_samples:
+            alloc_blocks = sum(block_samples) // len(block_samples)
+        return cls(
+            name,
+            ns_per_frame=sum(samples_ns) // max(1, len(samples_ns)),
+            p50_ns=percentile(samples_ns, 50),
+            p99_ns=percentile(samples_ns, 99),
+            peak_bytes_per_frame=peak_bytes,
+            frames=len(samples_ns),
+            alloc_blocks_per_frame=alloc_blocks,
+        )
+
+    @classmethod
+    def from_object(cls, name, obj):
+        return cls(
+            name,
+            ns_per_frame=obj["ns_per_frame"],
+            p50_ns=obj["p50_ns"],
+            p99_ns=obj["p99_ns"],
+            peak_bytes_per_frame=obj.get("peak_bytes_per_frame"),
+            frames=obj.get("frames", 0),
+            alloc_blocks_per_frame=obj.get("alloc_blocks_per_frame"),
+        )
+
+    def to_object(self):
+        return {
+            "ns_per_frame": self.ns_per_frame,
+            "p50_ns": self.p50_ns,
+            "p99_ns": self.p99_ns,
+            "peak_bytes_per_frame": self.peak_bytes_per_frame,
+            "alloc_blocks_per_frame": self.alloc_blocks_per_frame,
+            "frames": self.frames,
+        }
+
+
+class Regression(object):
+    """A metric of a processor that got worse compared to its baseline."""
+
+    def __init__(self, name, metric, baseline_value, value):
+        self.name = name
+        self.metric = metric
+        self.baseline_value = baseline_value
+        self.value = value
+
+    def __str__(self):
+        return "{}: {} went from {} to {} ({:+.0%})".format(
+            self.name,
+            self.metric,
+            self.baseline_value,
+            self.value,
+            self.value / max(1, self.baseline_value) - 1,
+        )
+
+
+def build_contexts(script, bpm, fps=DEFAULT_FPS, clock=None):
+    """Builds a `RenderContext` for every frame of `script`, one frame period apart."""
+    clock = clock or FakeClock()
+    downbeat = clock.time()
+    contexts = []
+    tracker = WeightTracker(len(script[0][0]) if script else 0)
+    for weights, pressures in script:
+        # As the `Controller` does, so that processors get the same weight events.
+        weight_events = tracker.update(weights, clock.time())
+        contexts.append(
+            RenderContext(
+                clock=clock.time(),
+                downbeat=downbeat,
+                weights=tracker.weight_list,
+                bpm=bpm,
+                ranged_values=[0] * 4,
+                switches=[False] * 4,
+                pressures=pressures,
+                weight_array=tracker.weights,
+                weight_events=weight_events,
+                weight_history=tuple(tracker.history),
+            )
+        )
+        clock.sleep(1.0 / fps)
+    return contexts
+
+
+def _new_layer(processor_cls, seed):
+    # Processors that use randomness should do the same work on every run.
+    random.seed(seed)
+    np.random.seed(seed)
+    return ProcessorRenderLayer(processor_cls())
+
+
+def benchmark_processor(
+    processor_cls,
+    bpms=DEFAULT_BPMS,
+    frames=DEFAULT_FRAMES,
+    fps=DEFAULT_FPS,
+    warmup_frames=DEFAULT_WARMUP_FRAMES,
+    allocation_frames=DEFAULT_ALLOCATION_FRAMES,
+    disable_gc=False,
+    seed=0,
+    weights_log=None,
+):
+    """Benchmarks rendering `frames` frames of `processor_cls` at each of `bpms`.
+
+    Arguments:
+        processor_cls {class} -- The processor to benchmark.
+
+    Keyword Arguments:
+        allocation_frames {int} -- How many frames per BPM to trace allocations of; 0 to skip.
+        disable_gc {bool} -- Whether to disable garbage collection while timing.
+        weights_log {str} -- Play weights back from this weight log, instead of the
+            scripted feet.
+
+    Returns:
+        ProcessorResult -- Timings across all frames of all BPMs.
+    """
+    if weights_log:
+        script = logged_weights(weights_log, warmup_frames + frames, fps=fps)
+    else:
+        script = scripted_weights(warmup_frames + frames, fps=fps, seed=seed)
+    timer = time.perf_counter_ns
+    samples = []
+    peak_samples = []
+    block_samples = []
+
+    for bpm in bpms:
+        contexts = build_contexts(script, bpm, fps=fps)
+        warmup, measured = contexts[:warmup_frames], contexts[warmup_frames:]
+
+        layer = _new_layer(processor_cls, seed)
+        for context in warmup:
+            layer.render(context)
+
+        gc.collect()
+        if disable_gc:
+            gc.disable()
+        try:
+            for context in measured:
+                start = timer()
+                layer.render(context)
+                samples.append(timer() - start)
+        finally:
+            gc.enable()
+
+        if not allocation_frames:
+            continue
+
+        # A second run, since tracing slows everything down.
+        layer = _new_layer(processor_cls, seed)
+        for context in warmup:
+            layer.render(context)
+        # Without collections in the middle of a frame freeing earlier frames' garbage.
+        gc.collect()
+        gc.disable()
+        tracemalloc.start()
+        try:
+            for context in measured[:allocation_frames]:
+                tracemalloc.reset_peak()
+                before = tracemalloc.get_traced_memory()[0]
+                blocks_before = sys.getallocatedblocks()
+                layer.render(context)
+                block_samples.append(sys.getallocatedblocks() - blocks_before)
+                peak_samples.append(tracemalloc.get_traced_memory()[1] - before)
+        finally:
+            tracemalloc.stop()
+            gc.enable()
+
+    return ProcessorResult.from_samples(
+        processor_cls.__name__, samples, peak_samples, block_samples
+    )
+
+
+def benchmark_processors(processors, **kwargs):
+    """Benchmarks each of a dict of processor name -> class; see `benchmark_processor`.
+
+    Returns:
+        dict -- Processor name -> `ProcessorResult`.
+    """
+    results = {}
+    for name in sorted(processors):
+        logger.info("Benchmarking {} ...".format(name))
+        results[name] = benchmark_processor(processors[name], **kwargs)
+    return results
+
+
+def measure_startup(playlist=DEFAULT_PLAYLIST, runs=DEFAULT_STARTUP_RUNS):
+    """Measures how long a show takes to start: importing the controller, loading
+    `playlist` and rendering the first frame, each time in a fresh interpreter.
+
+    Returns:
+        list -- The startup time of each run, in seconds.
+    """
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(p for p in (ROOT_DIR, env.get("PYTHONPATH")) if p)
+    times = []
+    for _ in range(runs):
+        output = subprocess.check_output(
+            [sys.executable, "-c", STARTUP_SCRIPT, playlist], env=env, cwd=ROOT_DIR
+        )
+        times.append(float(output.split()[-1]))
+    return times
+
+
+def save_baseline(filename, results):
+    """Saves a dict of `ProcessorResult`s as a JSON baseline."""
+    baseline = {
+        "version": BASELINE_VERSION,
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "processors": {name: result.to_object() for name, result in results.items()},
+    }
+    with open(filename, "w") as fp:
+        fp.write(json.dumps(baseline, indent=2, sort_keys=True))
+        fp.write("\n")
+
+
+def load_baseline(filename):
+    """Loads a baseline saved by `save_baseline`, as a dict of `ProcessorResult`s."""
+    with open(filename) as fp:
+        baseline = json.load(fp)
+    if baseline.get("version") != BASELINE_VERSION:
+        raise ValueError("Unsupported baseline version: {}".format(baseline.get("version")))
+    return {
+        name: ProcessorResult.from_object(name, obj) for name, obj in baseline["processors"].items()
+    }
+
+
+def find_regressions(results, baseline, threshold=DEFAULT_THRESHOLD):
+    """Compares `results` to `baseline`, both dicts of `ProcessorResult`s.
+
+    Processors missing from either are ignored.
+
+    Returns:
+        list -- A `Regression` for every metric that got worse by more than `threshold`.
+    """
+    metrics = (
+        ("ns_per_frame", MIN_REGRESSION_NS),
+        ("p99_ns", MIN_REGRESSION_NS),
+        ("peak_bytes_per_frame", MIN_REGRESSION_BYTES),
+        ("alloc_blocks_per_frame", MIN_REGRESSION_BLOCKS),
+    )
+    regressions = []
+    for name in sorted(results):
+        if name not in baseline:
+            continue
+        for metric, min_difference in metrics:
+            value = getattr(results[name], metric)
+            baseline_value = getattr(baseline[name], metric)
+            if value is None or baseline_value is None:
+                continue
+            difference = value - baseline_value
+            if difference > min_difference and difference > baseline_value * threshold:
+                regressions.append(Regression(name, metric, baseline_value, value))
+    return regressions
@@ -0,0 +1,147 @@
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+
+from floor.processor.base import Base as BaseProcessor
+from floor.processor.utils import clocked
+from floor.util import benchmark
+from floor.util.benchmark import ProcessorResult
+from floor.util.weight_log import WeightLogWriter
+
+
+class StepProcessor(BaseProcessor):
+    """Lights up stepped-on tiles, once per beat."""
+
+    def __init__(self, **kwargs):
+        super(StepProcessor, self).__init__(**kwargs)
+        self.frames = 0
+        self.bpms = set()
+
+    @clocked(frames_per_beat=1)
+    def get_next_frame(self, context):
+        self.frames += 1
+        self.bpms.add(context.bpm)
+        return [(0, 0, 1000 * p) for p in context.pressures]
+
+
+class HoardingProcessor(BaseProcessor):
+    """Keeps a little of every frame it renders."""
+
+    def __init__(self, **kwargs):
+        super(HoardingProcessor, self).__init__(**kwargs)
+        self.history = []
+
+    def get_next_frame(self, context):
+        self.history.append([object() for _ in range(50)])
+        return [(0, 0, 0)] * 64
+
+
+class ScriptedWeightsTest(TestCase):
+    def test_deterministic(self):
+        self.assertEqual(benchmark.scripted_weights(200), benchmark.scripted_weights(200))
+        self.assertNotEqual(
+            benchmark.scripted_weights(200), benchmark.scripted_weights(200, seed=1)
+        )
+
+    def test_feet(self):
+        script = benchmark.scripted_weights(240, num_feet=3)
+        self.assertEqual(240, len(script))
+        for weights, pressures in script:
+            self.assertEqual(64, len(weights))
+            self.assertTrue(1 <= sum(weights) <= 3)
+            for weight, pressure in zip(weights, pressures):
+                self.assertEqual(bool(weight), pressure > 0)
+
+
+class LoggedWeightsTest(TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmpdir)
+        self.filename = os.path.join(self.tmpdir, "show.weights")
+
+    def test_plays_back_and_loops(self):
+        # The first tile is stepped on for half a second, then nothing for half a second.
+        with WeightLogWriter(self.filename) as writer:
+            writer.write(10.0, b"\x03\xe8" + b"\x00" * 126)
+            writer.write(10.5, b"\x00" * 128)
+        script = benchmark.logged_weights(self.filename, 80, fps=40)
+        self.assertEqual(80, len(script))
+        stepped = [weights[0] for weights, _ in script]
+        self.assertEqual([1] * 20 + [0] * 20 + [1] * 20 + [0] * 20, stepped)
+        self.assertEqual(1.0, script[0][1][0])
+
+
+class BenchmarkTest(TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmpdir)
+
+    def test_percentile(self):
+        values = list(range(1, 101))
+        self.assertEqual(50, benchmark.percentile(values, 50))
+        self.assertEqual(99, benchmark.percentile(values, 99))
+        self.assertEqual(7, benchmark.percentile([7], 99))
+        self.assertEqual(0, benchmark.percentile([], 50))
+
+    def test_benchmark_processor(self):
+        result = benchmark.benchmark_processor(
+            StepProcessor, bpms=(60.0, 120.0), frames=50, warmup_frames=10, allocation_frames=5
+        )
+        self.assertEqual("StepProcessor", result.name)
+        self.assertEqual(100, result.frames)
+        self.assertTrue(0 < result.p50_ns <= result.p99_ns)
+        self.assertTrue(result.ns_per_frame > 0)
+        self.assertTrue(result.peak_bytes_per_frame > 0)
+        self.assertTrue(result.alloc_blocks_per_frame < 16)
+
+    def test_alloc_blocks(self):
+        result = benchmark.benchmark_processor(
+            HoardingProcessor, bpms=(120.0,), frames=20, warmup_frames=5, allocation_frames=10
+        )
+        self.assertTrue(result.alloc_blocks_per_frame >= 50)
+
+    def test_clock_advances_by_frame(self):
+        contexts = benchmark.build_contexts(benchmark.scripted_weights(121), 120.0, fps=120)
+        self.assertAlmostEqual(1.0, contexts[-1].clock - contexts[0].clock)
+        self.assertEqual(contexts[0].downbeat, contexts[-1].downbeat)
+
+    def test_baseline_round_trip(self):
+        filename = os.path.join(self.tmpdir, "baseline.json")
+        results = {"StepProcessor": ProcessorResult("StepProcessor", 1000, 900, 5000, 64, 10, 3)}
+        benchmark.save_baseline(filename, results)
+
+        loaded = benchmark.load_baseline(filename)
+        self.assertEqual(results["StepProcessor"].to_object(), loaded["StepProcessor"].to_object())
+
+    def test_find_regressions(self):
+        baseline = {
+            "Fast": ProcessorResult("Fast", 1000, 1000, 2000, 100),
+            "Slow": ProcessorResult("Slow", 100000, 90000, 200000, 10000),
+        }
+        results = {
+            # Big relative change, but within noise.
+            "Fast": ProcessorResult("Fast", 2000, 2000, 3000, 1000),
+            "Slow": ProcessorResult("Slow", 130000, 90000, 210000, 20000),
+            "New": ProcessorResult("New", 100000, 90000, 200000, 10000),
+        }
+        baseline["Fast"].alloc_blocks_per_frame = 0
+        results["Fast"].alloc_blocks_per_frame = 100
+        regressions = benchmark.find_regressions(results, baseline, threshold=0.25)
+        self.assertEqual(
+            [
+                ("Fast", "alloc_blocks_per_frame"),
+                ("Slow", "ns_per_frame"),
+                ("Slow", "peak_bytes_per_frame"),
+            ],
+            [(r.name, r.metric) for r in regressions],
+        )
+        self.assertEqual(
+            [("Fast", "alloc_blocks_per_frame")],
+            [(r.name, r.metric) for r in benchmark.find_regressions(results, baseline, 1.0)],
+        )
+
+    def test_measure_startup(self):
+        times = benchmark.measure_startup(runs=1)
+        self.assertEqual(1, len(times))
+        self.assertTrue(0 < times[0] < 60)
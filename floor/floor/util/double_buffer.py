@@ -0,0 +1,67 @@
+from builtins import object
+
+
+class DoubleBuffer(object):
+    """Hands the most recent value from one writer thread to one reader thread,
+    without locks.
+
+    The writer fills two preallocated buffers alternately, so it never touches
+    the buffer holding the latest published value. Each buffer carries a
+    sequence number that the writer bumps before and after filling it (a
+    "seqlock"): odd means a write is in progress. A reader copies out of the
+    latest buffer and then checks that its sequence number didn't move; if the
+    writer lapped it mid-copy, the copy is simply retried. The writer never
+    waits on the reader.
+
+    This relies on the GIL making single reads and writes of attributes and
+    list items atomic, and on there being exactly one writer.
+
+    Example:
+
+        frames = DoubleBuffer(FrameBuffer)
+
+        # Writer thread
+        frames.write(lambda buf: np.copyto(buf.rgb, next_frame.rgb))
+
+        # Reader thread
+        encoded = frames.read(encoder.encode)
+    """
+
+    def __init__(self, factory):
+        """Constructor.
+
+        Arguments:
+            factory {callable} -- Called twice, to create the two buffers.
+        """
+        self._buffers = [factory(), factory()]
+        self._sequences = [0, 0]
+        self._latest = None
+        self.published = 0
+
+    def write(self, fill):
+        """Fills the next buffer by calling `fill(buffer)`, then publishes it."""
+        idx = 1 if self._latest == 0 else 0
+        self._sequences[idx] += 1
+        fill(self._buffers[idx])
+        self._sequences[idx] += 1
+        self._latest = idx
+        self.published += 1
+
+    def read(self, copy):
+        """Returns `copy(buffer)` for the most recently published buffer, or `None`
+        if nothing has been published yet.
+
+        `copy` must not keep a reference to the buffer it is given; it may be
+        called more than once if a write races with it.
+        """
+        while True:
+            idx = self._latest
+            if idx is None:
+                return None
+            sequence = self._sequences[idx]
+            if sequence % 2:
+                # The writer has already lapped us and is refilling this buffer.
+                continue
+            result = copy(self._buffers[idx])
+            if self._sequences[idx] == sequence:
+                return result
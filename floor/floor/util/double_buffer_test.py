@@ -0,0 +1,61 @@
+from __future__ import absolute_import, division, print_function, unicode_literals
+
+import sys
+import threading
+from builtins import range
+from unittest import TestCase
+
+from .double_buffer import DoubleBuffer
+
+
+class DoubleBufferTest(TestCase):
+    def test_read_before_write(self):
+        buf = DoubleBuffer(list)
+        self.assertIsNone(buf.read(list))
+        self.assertEqual(0, buf.published)
+
+    def test_read_returns_latest(self):
+        buf = DoubleBuffer(lambda: [0] * 4)
+
+        def fill_with(value):
+            def fill(values):
+                values[:] = [value] * 4
+
+            return fill
+
+        buf.write(fill_with(1))
+        buf.write(fill_with(2))
+        self.assertEqual([2] * 4, buf.read(list))
+        self.assertEqual([2] * 4, buf.read(list))
+        buf.write(fill_with(3))
+        self.assertEqual([3] * 4, buf.read(list))
+        self.assertEqual(3, buf.published)
+
+    def test_reads_are_never_torn(self):
+        buf = DoubleBuffer(lambda: [0] * 64)
+        done = threading.Event()
+
+        # Switch threads as often as possible to provoke races.
+        switch_interval = sys.getswitchinterval()
+        sys.setswitchinterval(1e-6)
+        self.addCleanup(sys.setswitchinterval, switch_interval)
+
+        def writer():
+            for value in range(5000):
+
+                def fill(values):
+                    # Fill one item at a time, giving readers a chance to race.
+                    for idx in range(len(values)):
+                        values[idx] = value
+
+                buf.write(fill)
+            done.set()
+
+        thread = threading.Thread(target=writer)
+        thread.start()
+        while not done.is_set():
+            # Likewise, copy one item at a time.
+            values = buf.read(lambda values: [value for value in values])
+            if values is not None:
+                self.assertEqual(64, values.count(values[0]))
+        thread.join()
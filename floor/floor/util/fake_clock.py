@@ -0,0 +1,28 @@
+from builtins import object
+
+
+class FakeClock(object):
+    """A clock that only moves when told to.
+
+    Can be passed anywhere a `clocksource` is accepted in place of the `time`
+    module, eg to run a `Controller` faster than real time:
+
+        clock = FakeClock()
+        controller = Controller(drivers, playlist_manager, clocksource=clock)
+        controller.run_one_frame()  # "Sleeps" by advancing `clock`.
+    """
+
+    def __init__(self, start=0.0):
+        self.now = float(start)
+
+    def time(self):
+        return self.now
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.advance(seconds)
+
+    def advance(self, seconds):
+        self.now += max(0.0, seconds)
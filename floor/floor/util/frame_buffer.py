@@ -0,0 +1,136 @@
+"""
+A fixed-size frame of pixels backed by numpy arrays.
+"""
+
+from __future__ import division
+
+from builtins import object
+
+import numpy as np
+
+from floor.processor.constants import COLOR_MAXIMUM
+
+DEFAULT_NUM_PIXELS = 64
+
+
+class FrameBuffer(object):
+    """A frame of pixels, stored as a contiguous `(num_pixels, 3)` color array
+    and a `(num_pixels,)` alpha plane.
+
+    Processors may return a `FrameBuffer` from `get_next_frame` in place of the
+    traditional list of `(r, g, b)` or `(r, g, b, a)` tuples; legacy lists are
+    converted with `FrameBuffer.coerce`. Color values use the same scale as
+    everywhere else, `[0, COLOR_MAXIMUM]`, and alpha values are on `[0.0, 1.0]`.
+
+    The arrays are exposed directly as `rgb` and `alpha` so that callers can
+    operate on whole frames at once, eg:
+
+        frame = FrameBuffer()
+        frame.rgb[:, 0] = COLOR_MAXIMUM  # Everything red.
+    """
+
+    DTYPE = np.float32
+
+    def __init__(self, num_pixels=DEFAULT_NUM_PIXELS, rgb=None, alpha=None):
+        """Constructor.
+
+        Keyword Arguments:
+            num_pixels {int} -- Number of pixels to allocate, when `rgb` is not given.
+            rgb {numpy.ndarray} -- An existing `(num_pixels, 3)` array to wrap without
+                copying. Any numeric dtype is accepted (eg `uint16` frames read from disk).
+            alpha {numpy.ndarray} -- An existing `(num_pixels,)` alpha plane to wrap.
+                Defaults to fully opaque.
+        """
+        if rgb is None:
+            rgb = np.zeros((num_pixels, 3), dtype=self.DTYPE)
+        if alpha is None:
+            alpha = np.ones(len(rgb), dtype=self.DTYPE)
+        self.rgb = rgb
+        self.alpha = alpha
+
+    @classmethod
+    def from_pixels(cls, pixels, out=None):
+        """Builds a frame from a legacy list of `(r, g, b)` or `(r, g, b, a)` pixels.
+
+        Arguments:
+            pixels {iterable} -- The pixels to convert.
+
+        Keyword Arguments:
+            out {FrameBuffer} -- If given, the pixels are written into this frame
+                instead of allocating a new one.
+        """
+        if not hasattr(pixels, "__len__"):
+            pixels = list(pixels)
+        try:
+            values = np.asarray(pixels, dtype=cls.DTYPE)
+        except (TypeError, ValueError):
+            # Ragged input, eg a mix of 3- and 4-tuples.
+            values = None
+
+        if values is None or values.ndim != 2 or values.shape[1] not in (3, 4):
+            values = np.array([cls._pad_pixel(p) for p in pixels], dtype=cls.DTYPE)
+            values = values.reshape((-1, 4))
+
+        num_pixels = len(values)
+        if out is None or len(out) != num_pixels:
+            out = cls(num_pixels)
+        out.rgb[:] = values[:, :3]
+        if values.shape[1] == 4:
+            out.alpha[:] = values[:, 3]
+        else:
+            out.alpha.fill(1.0)
+        return out
+
+    @staticmethod
+    def _pad_pixel(pixel):
+        if len(pixel) == 4:
+            return pixel
+        r, g, b = pixel[:3]
+        return r, g, b, 1.0
+
+    @classmethod
+    def coerce(cls, frame, out=None):
+        """Returns `frame` as a `FrameBuffer`, converting legacy pixel lists.
+
+        `None` is passed through unchanged. `out` is only used when a conversion
+        is necessary; see `from_pixels`.
+        """
+        if frame is None or isinstance(frame, cls):
+            return frame
+        return cls.from_pixels(frame, out=out)
+
+    def __len__(self):
+        return len(self.rgb)
+
+    def __getitem__(self, idx):
+        return tuple(self.rgb[idx].tolist())
+
+    def __iter__(self):
+        return iter(self.to_pixels())
+
+    def __repr__(self):
+        return "<FrameBuffer num_pixels={}>".format(len(self))
+
+    def to_pixels(self):
+        """Returns the frame as a legacy list of `(r, g, b)` tuples."""
+        return [tuple(p) for p in self.rgb.tolist()]
+
+    def to_uint16(self, out=None):
+        """Returns the colors clamped to `[0, COLOR_MAXIMUM]` and truncated to integers,
+        as a `(num_pixels, 3)` `uint16` array.
+        """
+        clamped = np.clip(self.rgb, 0, COLOR_MAXIMUM)
+        if out is None:
+            return clamped.astype(np.uint16)
+        np.copyto(out, clamped, casting="unsafe")
+        return out
+
+    def copy(self):
+        return FrameBuffer(rgb=np.array(self.rgb, dtype=self.DTYPE), alpha=self.alpha.copy())
+
+    def fill(self, color, alpha=1.0):
+        self.rgb[:] = color[:3]
+        self.alpha.fill(alpha)
+
+    def clear(self):
+        self.fill((0, 0, 0))
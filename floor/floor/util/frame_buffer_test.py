@@ -0,0 +1,42 @@
+from __future__ import absolute_import, division, print_function, unicode_literals
+
+from unittest import TestCase
+
+import numpy as np
+
+from floor.processor.constants import COLOR_MAXIMUM
+
+from .frame_buffer import FrameBuffer
+
+
+class FrameBufferTest(TestCase):
+    def test_from_pixels(self):
+        frame = FrameBuffer.from_pixels([(1, 2, 3)] * 64)
+        self.assertEqual(64, len(frame))
+        self.assertEqual((1, 2, 3), frame[0])
+        self.assertEqual([1.0] * 64, frame.alpha.tolist())
+
+        frame = FrameBuffer.from_pixels([(1, 2, 3, 0.5)] * 64)
+        self.assertEqual([0.5] * 64, frame.alpha.tolist())
+
+        # Mixed 3- and 4-tuples are accepted too.
+        frame = FrameBuffer.from_pixels([(1, 2, 3), [4, 5, 6, 0.25]] * 32)
+        self.assertEqual((4, 5, 6), frame[1])
+        self.assertEqual([1.0, 0.25], frame.alpha[:2].tolist())
+
+    def test_from_pixels_reuses_output(self):
+        out = FrameBuffer()
+        frame = FrameBuffer.from_pixels([(1, 2, 3)] * 64, out=out)
+        self.assertIs(out, frame)
+
+    def test_coerce(self):
+        frame = FrameBuffer()
+        self.assertIs(frame, FrameBuffer.coerce(frame))
+        self.assertIsNone(FrameBuffer.coerce(None))
+        self.assertEqual([(0, 0, 0)] * 64, FrameBuffer.coerce([(0, 0, 0)] * 64).to_pixels())
+
+    def test_to_uint16(self):
+        frame = FrameBuffer.from_pixels([(-5, 511.9, 99999)] * 64)
+        values = frame.to_uint16()
+        self.assertEqual(np.uint16, values.dtype)
+        self.assertEqual([0, 511, COLOR_MAXIMUM], values[0].tolist())
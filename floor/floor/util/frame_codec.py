@@ -0,0 +1,99 @@
+"""
+Compact binary frames for previewing the floor over a WebSocket.
+
+Browsers only show 8 bits a channel, so frames are sent as RGB8. Each message
+starts with a one byte type:
+
+    FULL  -- followed by every pixel's `r, g, b` bytes, in floor order.
+    DELTA -- followed by a 5 byte record for each pixel that changed since the
+             last frame sent: a big-endian `uint16` pixel index, then `r, g, b`.
+
+A `FrameEncoder` keeps the last frame it sent to one client, and sends
+whichever of the two is smaller. The matching decoder is in
+`floor/driver/devserver/index.html`.
+"""
+
+from __future__ import absolute_import, division
+
+from builtins import object
+
+import numpy as np
+
+from floor.processor.constants import COLOR_MAXIMUM
+
+FULL = b"F"
+DELTA = b"D"
+
+DELTA_DTYPE = np.dtype([("index", ">u2"), ("rgb", "u1", 3)])
+
+
+def to_rgb8(frame, out=None):
+    """Converts a `FrameBuffer` to a `(num_pixels, 3)` array of `uint8`.
+
+    Keyword Arguments:
+        out {numpy.ndarray} -- Write into this array instead of allocating one.
+    """
+    scaled = frame.rgb * (256.0 / COLOR_MAXIMUM)
+    np.clip(scaled, 0, 255, out=scaled)
+    if out is None:
+        return scaled.astype(np.uint8)
+    np.copyto(out, scaled, casting="unsafe")
+    return out
+
+
+def encode_full(rgb8):
+    return FULL + rgb8.tobytes()
+
+
+def encode_delta(rgb8, indices):
+    records = np.empty(len(indices), dtype=DELTA_DTYPE)
+    records["index"] = indices
+    records["rgb"] = rgb8[indices]
+    return DELTA + records.tobytes()
+
+
+def decode(message, previous=None):
+    """Decodes a message back to a `(num_pixels, 3)` array of `uint8`.
+
+    Arguments:
+        message {bytes} -- An encoded frame.
+
+    Keyword Arguments:
+        previous {numpy.ndarray} -- The last decoded frame, which `DELTA` frames apply to.
+    """
+    kind, body = message[:1], message[1:]
+    if kind == FULL:
+        return np.frombuffer(body, dtype=np.uint8).reshape((-1, 3)).copy()
+    if kind == DELTA:
+        if previous is None:
+            raise ValueError("Delta frame without a previous frame")
+        frame = previous.copy()
+        records = np.frombuffer(body, dtype=DELTA_DTYPE)
+        frame[records["index"]] = records["rgb"]
+        return frame
+    raise ValueError("Unknown frame type {!r}".format(kind))
+
+
+class FrameEncoder(object):
+    """Encodes the frames sent to one client, as deltas against the last one sent."""
+
+    def __init__(self):
+        self.previous = None
+
+    def reset(self):
+        """Sends a `FULL` frame next, eg after the client reconnects."""
+        self.previous = None
+
+    def encode(self, rgb8):
+        """Returns the smallest message that takes the client to `rgb8`.
+
+        Arguments:
+            rgb8 {numpy.ndarray} -- The frame, from `to_rgb8`. Not modified afterwards.
+        """
+        previous, self.previous = self.previous, rgb8
+        if previous is None or previous.shape != rgb8.shape:
+            return encode_full(rgb8)
+        changed = np.flatnonzero(np.any(previous != rgb8, axis=1))
+        if len(changed) * DELTA_DTYPE.itemsize >= rgb8.nbytes:
+            return encode_full(rgb8)
+        return encode_delta(rgb8, changed)
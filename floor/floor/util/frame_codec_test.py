@@ -0,0 +1,48 @@
+from __future__ import absolute_import, division, print_function, unicode_literals
+
+from unittest import TestCase
+
+import numpy as np
+
+from floor.util.frame_buffer import FrameBuffer
+from floor.util.frame_codec import DELTA, FULL, FrameEncoder, decode, to_rgb8
+
+
+class FrameCodecTest(TestCase):
+    def test_to_rgb8(self):
+        frame = FrameBuffer.from_pixels([(0, 512, 1023), (-5, 2000, 1)])
+        self.assertEqual([[0, 128, 255], [0, 255, 0]], to_rgb8(frame).tolist())
+
+    def test_encoder(self):
+        encoder = FrameEncoder()
+        frame = np.zeros((64, 3), dtype=np.uint8)
+        message = encoder.encode(frame)
+        self.assertEqual(FULL, message[:1])
+        self.assertEqual(1 + 64 * 3, len(message))
+        decoded = decode(message)
+        self.assertEqual(frame.tolist(), decoded.tolist())
+
+        frame = frame.copy()
+        frame[10] = (1, 2, 3)
+        frame[63] = (4, 5, 6)
+        message = encoder.encode(frame)
+        self.assertEqual(DELTA, message[:1])
+        self.assertEqual(1 + 2 * 5, len(message))
+        decoded = decode(message, decoded)
+        self.assertEqual(frame.tolist(), decoded.tolist())
+
+        # Nothing changed.
+        self.assertEqual(DELTA, encoder.encode(frame.copy()))
+
+        # Full frames are smaller when most pixels change.
+        frame = frame + 1
+        self.assertEqual(FULL, encoder.encode(frame)[:1])
+
+        encoder.reset()
+        self.assertEqual(FULL, encoder.encode(frame)[:1])
+
+    def test_decode_errors(self):
+        with self.assertRaises(ValueError):
+            decode(DELTA)
+        with self.assertRaises(ValueError):
+            decode(b"X")
@@ -0,0 +1,182 @@
+"""
+A compact binary file of rendered frames, readable with `mmap`.
+
+The file is a fixed-size header followed by frames of `num_pixels` x 3 little
+endian `uint16` colors, on the usual `[0, COLOR_MAXIMUM]` scale, one every
+`1 / fps` seconds:
+
+    offset  size  field
+    0       4     magic, b"DFFR"
+    4       2     version
+    6       2     header size, in bytes
+    8       2     number of pixels per frame
+    10      2     channels per pixel (always 3)
+    12      4     reserved
+    16      8     fps, float64
+    24      8     bpm the frames were rendered at, float64
+    32      8     seconds from the first frame to the first downbeat, float64
+    40      24    reserved
+
+There is no frame count: a reader takes however many whole frames there are,
+so a capture that was cut short is still readable.
+
+    with FrameFileWriter("show.frames", fps=120) as writer:
+        writer.write(frame)
+
+    frames = FrameFile("show.frames")
+    frames[10]  # A `FrameBuffer` viewing the 11th frame in the file.
+"""
+
+from __future__ import division
+
+import mmap
+import os
+import struct
+from builtins import object, range
+
+import numpy as np
+
+from floor.util.frame_buffer import DEFAULT_NUM_PIXELS, FrameBuffer
+
+MAGIC = b"DFFR"
+VERSION = 1
+
+HEADER_FORMAT = "<4sHHHH4xddd24x"
+HEADER_SIZE = struct.calcsize(HEADER_FORMAT)
+CHANNELS = 3
+
+DTYPE = np.dtype("<u2")
+
+
+class FrameFileError(Exception):
+    """Thrown when a frame file is malformed."""
+
+
+class FrameFileWriter(object):
+    """Appends frames to a new frame file."""
+
+    def __init__(self, filename, fps, num_pixels=DEFAULT_NUM_PIXELS, bpm=0.0, downbeat=0.0):
+        """Constructor.
+
+        Arguments:
+            filename {str} -- The file to create, replacing any existing file.
+            fps {float} -- How many frames will be written per second of show time.
+
+        Keyword Arguments:
+            num_pixels {int} -- Pixels per frame.
+            bpm {float} -- The tempo the frames are rendered at, if any.
+            downbeat {float} -- Seconds from the first frame to the first downbeat.
+        """
+        self.filename = filename
+        self.fps = float(fps)
+        self.num_pixels = num_pixels
+        self.num_frames = 0
+        self.buffer = np.zeros((num_pixels, CHANNELS), dtype=DTYPE)
+        self.fp = open(filename, "wb")
+        self.fp.write(
+            struct.pack(
+                HEADER_FORMAT,
+                MAGIC,
+                VERSION,
+                HEADER_SIZE,
+                num_pixels,
+                CHANNELS,
+                self.fps,
+                float(bpm),
+                float(downbeat),
+            )
+        )
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+        return False
+
+    def write(self, frame):
+        """Appends a frame.
+
+        Arguments:
+            frame -- A `FrameBuffer`, a list of pixels, or a `(num_pixels, 3)` array.
+        """
+        if isinstance(frame, np.ndarray):
+            np.copyto(self.buffer, np.clip(frame, 0, np.iinfo(DTYPE).max), casting="unsafe")
+        else:
+            FrameBuffer.coerce(frame).to_uint16(out=self.buffer)
+        self.fp.write(self.buffer.tobytes())
+        self.num_frames += 1
+
+    def flush(self):
+        self.fp.flush()
+
+    def close(self):
+        if not self.fp.closed:
+            self.fp.close()
+
+
+class FrameFile(object):
+    """A frame file, memory-mapped for reading.
+
+    Frames are read from disk as they are accessed, so opening a long file is
+    cheap, and indexing returns views into the mapping rather than copies.
+    """
+
+    def __init__(self, filename):
+        self.filename = filename
+        with open(filename, "rb") as fp:
+            header = fp.read(HEADER_SIZE)
+        if len(header) < HEADER_SIZE:
+            raise FrameFileError("{}: too short for a frame file".format(filename))
+
+        magic, version, header_size, num_pixels, channels, fps, bpm, downbeat = struct.unpack(
+            HEADER_FORMAT, header
+        )
+        if magic != MAGIC:
+            raise FrameFileError("{}: not a frame file".format(filename))
+        if version != VERSION:
+            raise FrameFileError("{}: unsupported version {}".format(filename, version))
+        if channels != CHANNELS or fps <= 0:
+            raise FrameFileError("{}: malformed header".format(filename))
+
+        self.num_pixels = num_pixels
+        self.fps = fps
+        self.bpm = bpm
+        self.downbeat = downbeat
+
+        frame_bytes = num_pixels * CHANNELS * DTYPE.itemsize
+        num_frames = (os.path.getsize(filename) - header_size) // frame_bytes
+        with open(filename, "rb") as fp:
+            self.mmap = mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ)
+        self.frames = np.frombuffer(
+            self.mmap, dtype=DTYPE, count=num_frames * num_pixels * CHANNELS, offset=header_size
+        ).reshape((num_frames, num_pixels, CHANNELS))
+
+    def __len__(self):
+        return len(self.frames)
+
+    def __getitem__(self, idx):
+        return FrameBuffer(rgb=self.frames[idx])
+
+    def __iter__(self):
+        for idx in range(len(self)):
+            yield self[idx]
+
+    def duration(self):
+        """Returns the show time covered by the file, in seconds."""
+        return len(self) / self.fps
+
+    def advise_sequential(self):
+        """Tells the OS that frames will be read in order, so that it reads ahead, and
+        can drop frames that have been played from memory.
+        """
+        if hasattr(self.mmap, "madvise") and hasattr(mmap, "MADV_SEQUENTIAL"):
+            self.mmap.madvise(mmap.MADV_SEQUENTIAL)
+
+    def close(self):
+        self.frames = np.zeros((0, self.num_pixels, CHANNELS), dtype=DTYPE)
+        try:
+            self.mmap.close()
+        except BufferError:
+            # Frames are still being viewed; the mapping goes away with them.
+            pass
@@ -0,0 +1,75 @@
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+
+import numpy as np
+
+from floor.util.frame_buffer import FrameBuffer
+from floor.util.frame_file import (
+    HEADER_SIZE,
+    FrameFile,
+    FrameFileError,
+    FrameFileWriter,
+)
+
+
+class FrameFileTest(TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmpdir)
+        self.filename = os.path.join(self.tmpdir, "test.frames")
+
+    def test_round_trip(self):
+        with FrameFileWriter(self.filename, fps=60, bpm=128.0, downbeat=0.25) as writer:
+            writer.write([(1, 2, 3)] * 64)
+            frame = FrameBuffer()
+            frame.fill((1023, 0, 2000))
+            writer.write(frame)
+            writer.write(np.full((64, 3), 7, dtype=np.uint16))
+        self.assertEqual(3, writer.num_frames)
+
+        frames = FrameFile(self.filename)
+        self.assertEqual(3, len(frames))
+        self.assertEqual(60.0, frames.fps)
+        self.assertEqual(128.0, frames.bpm)
+        self.assertEqual(0.25, frames.downbeat)
+        self.assertEqual(0.05, frames.duration())
+        self.assertEqual([(1, 2, 3)] * 64, frames[0].to_pixels())
+        # Colors are clamped to `COLOR_MAXIMUM`.
+        self.assertEqual((1023, 0, 1023), frames[1][0])
+        self.assertEqual([(7, 7, 7)] * 64, list(frames)[2].to_pixels())
+
+    def test_frames_are_views(self):
+        with FrameFileWriter(self.filename, fps=120) as writer:
+            writer.write([(1, 2, 3)] * 64)
+        frames = FrameFile(self.filename)
+        frame = frames[0]
+        self.assertFalse(frame.rgb.flags.owndata)
+        self.assertFalse(frame.rgb.flags.writeable)
+        frames.advise_sequential()
+        frames.close()
+        self.assertEqual(0, len(frames))
+        self.assertEqual((1, 2, 3), frame[0])
+
+    def test_truncated_frame_is_ignored(self):
+        with FrameFileWriter(self.filename, fps=120) as writer:
+            writer.write([(1, 2, 3)] * 64)
+            writer.write([(4, 5, 6)] * 64)
+        with open(self.filename, "r+b") as fp:
+            fp.truncate(os.path.getsize(self.filename) - 10)
+        self.assertEqual(1, len(FrameFile(self.filename)))
+
+    def test_empty(self):
+        FrameFileWriter(self.filename, fps=120).close()
+        self.assertEqual(0, len(FrameFile(self.filename)))
+
+    def test_malformed(self):
+        with open(self.filename, "wb") as fp:
+            fp.write(b"\0" * HEADER_SIZE)
+        with self.assertRaises(FrameFileError):
+            FrameFile(self.filename)
+        with open(self.filename, "wb") as fp:
+            fp.write(b"DFFR")
+        with self.assertRaises(FrameFileError):
+            FrameFile(self.filename)
@@ -0,0 +1,114 @@
+"""
+The shape of the floor.
+
+Pixels are numbered row by row from the top left, so on a floor `cols` wide,
+pixel `i` is at `x = i % cols`, `y = i // cols`. A `Geometry` works out the
+tables processors and drivers need to get around the floor once, up front,
+so nothing has to be rebuilt, or sized by a literal, on every frame.
+"""
+
+from __future__ import absolute_import, division
+
+from builtins import object, range
+
+import numpy as np
+
+# A single pod.
+DEFAULT_ROWS = 8
+DEFAULT_COLS = 8
+
+
+class Geometry(object):
+    def __init__(self, rows=DEFAULT_ROWS, cols=DEFAULT_COLS):
+        """Constructor.
+
+        Keyword Arguments:
+            rows {int} -- Height of the floor, in tiles.
+            cols {int} -- Width of the floor, in tiles.
+        """
+        if rows < 1 or cols < 1:
+            raise ValueError("Floor must be at least 1x1, not {}x{}".format(cols, rows))
+        self.rows = rows
+        self.cols = cols
+        self.num_pixels = rows * cols
+
+        indices = np.arange(self.num_pixels)
+        # The column and row of each pixel.
+        self.xs = indices % cols
+        self.ys = indices // cols
+        # The index of the pixel at each `[y, x]`.
+        self.index_grid = indices.reshape((rows, cols))
+        # `(x, y)` of each pixel, for looping over the floor in Python.
+        self.coordinates = list(zip(self.xs.tolist(), self.ys.tolist()))
+        # For each pixel, the pixel of a single-pod frame that lands on it when such
+        # frames are repeated across the floor.
+        self.tile_indices = (self.ys % DEFAULT_ROWS) * DEFAULT_COLS + self.xs % DEFAULT_COLS
+
+    def __eq__(self, other):
+        return isinstance(other, Geometry) and (self.rows, self.cols) == (other.rows, other.cols)
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __hash__(self):
+        return hash((self.rows, self.cols))
+
+    def __repr__(self):
+        return "<Geometry {}x{}>".format(self.cols, self.rows)
+
+    def index(self, x, y):
+        """Returns the index of the pixel at `(x, y)`."""
+        return y * self.cols + x
+
+    def contains(self, x, y):
+        return 0 <= x < self.cols and 0 <= y < self.rows
+
+    def serpentine_order(self):
+        """Returns pixel indices in the order tiles are chained together: left to right
+        along the first row, right to left along the next, and so on.
+        """
+        return _serpentine(self.index_grid)
+
+    def chain_order(self, pods=None):
+        """Returns pixel indices in the order the tiles of a floor built from 8x8 pods
+        are chained together: pod by pod, each in `serpentine_order`. Floors that aren't
+        a whole number of pods snake across their full width instead.
+
+        Keyword Arguments:
+            pods {list} -- `(x, y)` of each pod's top left tile, in the order the pods
+                are chained. Defaults to left to right, then top to bottom.
+        """
+        if pods is None:
+            if self.rows % DEFAULT_ROWS or self.cols % DEFAULT_COLS:
+                return self.serpentine_order()
+            pods = [
+                (x, y)
+                for y in range(0, self.rows, DEFAULT_ROWS)
+                for x in range(0, self.cols, DEFAULT_COLS)
+            ]
+        order = []
+        for x, y in pods:
+            if not (
+                self.contains(x, y) and self.contains(x + DEFAULT_COLS - 1, y + DEFAULT_ROWS - 1)
+            ):
+                raise ValueError("Pod at {}, {} does not fit on a {!r}".format(x, y, self))
+            order.extend(_serpentine(self.index_grid[y : y + DEFAULT_ROWS, x : x + DEFAULT_COLS]))
+        if len(set(order)) != len(order) or len(order) != self.num_pixels:
+            raise ValueError("Pods must cover every tile of a {!r} once".format(self))
+        return order
+
+    def is_pod_sized(self, num_pixels):
+        return num_pixels == DEFAULT_ROWS * DEFAULT_COLS
+
+    def blank_frame(self):
+        """Returns a legacy list of black pixels, one per tile."""
+        return [(0, 0, 0)] * self.num_pixels
+
+
+def _serpentine(grid):
+    grid = grid.copy()
+    grid[1::2] = grid[1::2, ::-1]
+    return grid.ravel().tolist()
+
+
+DEFAULT_GEOMETRY = Geometry()
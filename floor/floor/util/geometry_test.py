@@ -0,0 +1,58 @@
+from __future__ import absolute_import, division, print_function, unicode_literals
+
+from builtins import range
+from unittest import TestCase
+
+from floor.util.geometry import DEFAULT_GEOMETRY, Geometry
+
+
+class GeometryTest(TestCase):
+    def test_default(self):
+        self.assertEqual(64, DEFAULT_GEOMETRY.num_pixels)
+        self.assertEqual(Geometry(8, 8), DEFAULT_GEOMETRY)
+        self.assertNotEqual(Geometry(8, 16), DEFAULT_GEOMETRY)
+
+    def test_coordinates(self):
+        geometry = Geometry(rows=2, cols=3)
+        self.assertEqual(6, geometry.num_pixels)
+        self.assertEqual([(0, 0), (1, 0), (2, 0), (0, 1), (1, 1), (2, 1)], geometry.coordinates)
+        self.assertEqual(5, geometry.index(2, 1))
+        self.assertEqual(5, geometry.index_grid[1, 2])
+        self.assertTrue(geometry.contains(2, 1))
+        self.assertFalse(geometry.contains(3, 0))
+
+    def test_serpentine_order(self):
+        self.assertEqual([0, 1, 2, 5, 4, 3], Geometry(rows=2, cols=3).serpentine_order())
+
+    def test_chain_order(self):
+        self.assertEqual(DEFAULT_GEOMETRY.serpentine_order(), DEFAULT_GEOMETRY.chain_order())
+        # Not whole pods.
+        self.assertEqual([0, 1, 2, 5, 4, 3], Geometry(rows=2, cols=3).chain_order())
+
+        geometry = Geometry(rows=8, cols=16)
+        order = geometry.chain_order()
+        # Along the first row of the left pod, back along its second...
+        self.assertEqual(list(range(8)) + list(range(23, 15, -1)), order[:16])
+        # ...and on to the right pod after its last tile.
+        self.assertEqual([112, 8, 9], order[63:66])
+        self.assertEqual(list(range(128)), sorted(order))
+
+        right_first = geometry.chain_order([(8, 0), (0, 0)])
+        self.assertEqual(order[64:] + order[:64], right_first)
+
+    def test_chain_order_invalid_pods(self):
+        geometry = Geometry(rows=8, cols=16)
+        with self.assertRaises(ValueError):
+            geometry.chain_order([(0, 0)])
+        with self.assertRaises(ValueError):
+            geometry.chain_order([(0, 0), (9, 0)])
+
+    def test_tile_indices(self):
+        geometry = Geometry(rows=16, cols=16)
+        self.assertEqual(0, geometry.tile_indices[geometry.index(8, 8)])
+        self.assertEqual(63, geometry.tile_indices[geometry.index(15, 7)])
+        self.assertEqual(9, geometry.tile_indices[geometry.index(9, 9)])
+
+    def test_invalid(self):
+        with self.assertRaises(ValueError):
+            Geometry(rows=0, cols=8)
@@ -0,0 +1,189 @@
+"""
+Low-overhead latency histograms and counters for the render loop.
+
+Collection can be switched on and off at runtime. When off, timing a stage
+costs one attribute check; nothing is read from the clock or recorded.
+
+    metrics = Metrics(enabled=True)
+
+    with metrics.time("composite"):
+        composite()
+
+    metrics.increment("overruns")
+    metrics.to_object()  # Percentiles, counts etc, ready to serialize.
+"""
+
+from __future__ import division
+
+import bisect
+import os
+import threading
+import time
+from builtins import object, range
+from collections import OrderedDict
+
+# Histogram bucket upper bounds, in nanoseconds: four buckets per doubling, from
+# 1us to about 17 seconds, so that any reported percentile is within 19% of the
+# true value.
+BUCKET_BOUNDS_NS = [int(1000 * 2 ** (i / 4.0)) for i in range(97)]
+
+
+class Histogram(object):
+    """Counts of nanosecond durations, in log-scale buckets."""
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKET_BOUNDS_NS) + 1)
+        self.reset()
+
+    def reset(self):
+        for i in range(len(self.counts)):
+            self.counts[i] = 0
+        self.count = 0
+        self.total_ns = 0
+        self.min_ns = None
+        self.max_ns = None
+
+    def record(self, duration_ns):
+        self.counts[bisect.bisect_left(BUCKET_BOUNDS_NS, duration_ns)] += 1
+        self.count += 1
+        self.total_ns += duration_ns
+        if self.max_ns is None or duration_ns > self.max_ns:
+            self.max_ns = duration_ns
+        if self.min_ns is None or duration_ns < self.min_ns:
+            self.min_ns = duration_ns
+
+    def percentile(self, pct):
+        """Returns an upper bound on the `pct` percentile, or `None` if empty."""
+        if not self.count:
+            return None
+        target = pct / 100.0 * self.count
+        seen = 0
+        for idx, count in enumerate(self.counts):
+            seen += count
+            if count and seen >= target:
+                if idx == len(BUCKET_BOUNDS_NS):
+                    return self.max_ns
+                return min(BUCKET_BOUNDS_NS[idx], self.max_ns)
+        return self.max_ns
+
+    def to_object(self):
+        return {
+            "count": self.count,
+            "mean_ns": self.total_ns // self.count if self.count else None,
+            "min_ns": self.min_ns,
+            "max_ns": self.max_ns,
+            "p50_ns": self.percentile(50),
+            "p90_ns": self.percentile(90),
+            "p99_ns": self.percentile(99),
+            "buckets": [
+                [BUCKET_BOUNDS_NS[idx] if idx < len(BUCKET_BOUNDS_NS) else None, count]
+                for idx, count in enumerate(self.counts)
+                if count
+            ],
+        }
+
+
+class _StageTimer(object):
+    """Context manager that records its duration into a histogram."""
+
+    def __init__(self, histogram):
+        self.histogram = histogram
+        self.start = 0
+
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.histogram.record(time.perf_counter_ns() - self.start)
+        return False
+
+
+class _NullTimer(object):
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+NULL_TIMER = _NullTimer()
+
+
+class Metrics(object):
+    """A set of named histograms and counters.
+
+    Recording happens on the render thread, while `to_object` and `reset` are
+    usually called from the server's; new names are added under a lock, so that
+    those can take a consistent copy.
+    """
+
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self.histograms = OrderedDict()
+        self.counters = OrderedDict()
+        self._lock = threading.Lock()
+        self._timers = {}
+        self.reset_time = time.time()
+
+    def set_enabled(self, enabled):
+        self.enabled = bool(enabled)
+
+    def histogram(self, name):
+        histogram = self.histograms.get(name)
+        if histogram is None:
+            with self._lock:
+                histogram = self.histograms.setdefault(name, Histogram())
+        return histogram
+
+    def time(self, name):
+        """Returns a context manager that records its duration under `name`.
+
+        Stages with the same name must not be nested.
+        """
+        if not self.enabled:
+            return NULL_TIMER
+        timer = self._timers.get(name)
+        if timer is None:
+            timer = self._timers[name] = _StageTimer(self.histogram(name))
+        return timer
+
+    def record(self, name, duration_ns):
+        if self.enabled:
+            self.histogram(name).record(duration_ns)
+
+    def increment(self, name, amount=1):
+        if self.enabled:
+            if name not in self.counters:
+                with self._lock:
+                    self.counters.setdefault(name, 0)
+            self.counters[name] += amount
+
+    def _snapshot(self):
+        """Returns copies of the histograms and counters, safe to iterate while recording."""
+        with self._lock:
+            return list(self.histograms.items()), list(self.counters.items())
+
+    def reset(self):
+        histograms, counters = self._snapshot()
+        for _, histogram in histograms:
+            histogram.reset()
+        for name, _ in counters:
+            self.counters[name] = 0
+        self.reset_time = time.time()
+
+    def to_object(self):
+        histograms, counters = self._snapshot()
+        return {
+            "enabled": self.enabled,
+            "seconds": time.time() - self.reset_time,
+            "histograms": OrderedDict(
+                (name, histogram.to_object()) for name, histogram in histograms
+            ),
+            "counters": OrderedDict(counters),
+        }
+
+
+def enabled_from_environment():
+    """Whether collection should start out enabled, from the `PROFILE` environment variable."""
+    return bool(os.environ.get("PROFILE"))
@@ -0,0 +1,105 @@
+import threading
+from builtins import range
+from unittest import TestCase
+
+import mock
+
+from floor.util import instrumentation
+from floor.util.instrumentation import NULL_TIMER, Histogram, Metrics
+
+
+class HistogramTest(TestCase):
+    def test_empty(self):
+        histogram = Histogram()
+        self.assertIsNone(histogram.percentile(50))
+        self.assertEqual(0, histogram.to_object()["count"])
+
+    def test_percentiles(self):
+        histogram = Histogram()
+        for duration in range(1, 101):
+            histogram.record(duration * 10000)
+
+        self.assertEqual(100, histogram.count)
+        self.assertEqual(10000, histogram.min_ns)
+        self.assertEqual(1000000, histogram.max_ns)
+        # Percentiles are bucket upper bounds, within 19% of the true value.
+        for pct, expected in ((50, 500000), (90, 900000), (99, 990000)):
+            value = histogram.percentile(pct)
+            self.assertTrue(expected <= value <= expected * 1.19, (pct, value))
+        self.assertEqual(1000000, histogram.percentile(100))
+
+    def test_out_of_range(self):
+        histogram = Histogram()
+        histogram.record(0)
+        histogram.record(10**12)
+        self.assertEqual(instrumentation.BUCKET_BOUNDS_NS[0], histogram.percentile(50))
+        self.assertEqual(10**12, histogram.percentile(99))
+
+    def test_reset(self):
+        histogram = Histogram()
+        histogram.record(5000)
+        histogram.reset()
+        self.assertEqual(0, histogram.count)
+        self.assertEqual([], histogram.to_object()["buckets"])
+
+
+class MetricsTest(TestCase):
+    def test_disabled(self):
+        metrics = Metrics()
+        self.assertIs(NULL_TIMER, metrics.time("stage"))
+        with metrics.time("stage"):
+            pass
+        metrics.increment("overruns")
+        metrics.record("stage", 1000)
+        self.assertEqual({}, dict(metrics.histograms))
+        self.assertEqual({}, dict(metrics.counters))
+
+    @mock.patch("floor.util.instrumentation.time.perf_counter_ns")
+    def test_time(self, perf_counter_ns):
+        perf_counter_ns.side_effect = [1000, 6000]
+        metrics = Metrics(enabled=True)
+        with metrics.time("stage"):
+            pass
+        histogram = metrics.histograms["stage"]
+        self.assertEqual(1, histogram.count)
+        self.assertEqual(5000, histogram.total_ns)
+
+    def test_toggle_and_reset(self):
+        metrics = Metrics(enabled=True)
+        metrics.increment("overruns")
+        metrics.set_enabled(False)
+        metrics.increment("overruns")
+        self.assertEqual(1, metrics.counters["overruns"])
+
+        metrics.set_enabled(True)
+        metrics.record("stage", 1000)
+        metrics.reset()
+        result = metrics.to_object()
+        self.assertEqual(0, result["counters"]["overruns"])
+        self.assertEqual(0, result["histograms"]["stage"]["count"])
+
+    def test_to_object_while_recording(self):
+        metrics = Metrics(enabled=True)
+        done = threading.Event()
+
+        def record():
+            for i in range(5000):
+                metrics.record("stage{}".format(i), 1000)
+                metrics.increment("counter{}".format(i))
+            done.set()
+
+        thread = threading.Thread(target=record)
+        thread.start()
+        while not done.is_set():
+            metrics.to_object()
+            metrics.reset()
+        thread.join()
+        result = metrics.to_object()
+        self.assertEqual(5000, len(result["histograms"]))
+        self.assertEqual(5000, len(result["counters"]))
+
+    def test_enabled_from_environment(self):
+        with mock.patch.dict("os.environ", {"PROFILE": "1"}):
+            self.assertTrue(instrumentation.enabled_from_environment())
+        with mock.patch.dict("os.environ", {}, clear=True):
+            self.assertFalse(instrumentation.enabled_from_environment())
@@ -1,17 +1,110 @@
 import logging
-from builtins import chr, object, range
+from builtins import object
 
 import serial
 
 logger = logging.getLogger("serial_read")
 
 
+class RingBuffer(object):
+    """A fixed-capacity circular byte buffer.
+
+    Writing more than the free space overwrites the oldest bytes, so memory use
+    never grows no matter how far behind the reader falls.
+    """
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.buffer = bytearray(capacity)
+        self.start = 0
+        self.size = 0
+
+    def __len__(self):
+        return self.size
+
+    def __getitem__(self, offset):
+        if offset < 0 or offset >= self.size:
+            raise IndexError("RingBuffer index out of range")
+        return self.buffer[(self.start + offset) % self.capacity]
+
+    def clear(self):
+        self.start = 0
+        self.size = 0
+
+    def write(self, data):
+        """Appends `data`, returning how many of the oldest bytes were overwritten."""
+        length = len(data)
+        if length >= self.capacity:
+            dropped = self.size + length - self.capacity
+            self.buffer[:] = data[length - self.capacity :]
+            self.start = 0
+            self.size = self.capacity
+            return dropped
+
+        dropped = max(0, self.size + length - self.capacity)
+        self.discard(dropped)
+
+        end = (self.start + self.size) % self.capacity
+        first = min(length, self.capacity - end)
+        self.buffer[end : end + first] = data[:first]
+        self.buffer[: length - first] = data[first:]
+        self.size += length
+        return dropped
+
+    def peek(self, offset, length):
+        """Returns a copy of `length` bytes starting at `offset`."""
+        begin = (self.start + offset) % self.capacity
+        end = begin + length
+        if end <= self.capacity:
+            return bytes(self.buffer[begin:end])
+        return bytes(self.buffer[begin:]) + bytes(self.buffer[: end - self.capacity])
+
+    def discard(self, length):
+        """Drops `length` bytes from the front of the buffer."""
+        length = max(0, min(length, self.size))
+        self.start = (self.start + length) % self.capacity
+        self.size -= length
+
+    def find(self, pattern, offset=0):
+        """Returns the offset of the first `pattern` at or after `offset`, or -1."""
+        tail_length = min(self.size, self.capacity - self.start)
+        head_length = self.size - tail_length
+
+        # The contiguous run from `start` to the end of the storage...
+        if offset < tail_length:
+            idx = self.buffer.find(pattern, self.start + offset, self.start + tail_length)
+            if idx >= 0:
+                return idx - self.start
+
+        if not head_length:
+            return -1
+
+        # ...a match straddling the wrap-around point...
+        seam_begin = max(offset, tail_length - len(pattern) + 1)
+        seam_end = min(self.size, tail_length + len(pattern) - 1)
+        if seam_begin < seam_end:
+            idx = self.peek(seam_begin, seam_end - seam_begin).find(pattern)
+            if idx >= 0:
+                return seam_begin + idx
+
+        # ...and the run wrapped around to the start of the storage.
+        idx = self.buffer.find(pattern, max(0, offset - tail_length), head_length)
+        if idx >= 0:
+            return tail_length + idx
+        return -1
+
+
 class SerialRead(object):
     packets = 64
     packet_bytes = 2
     frame_bytes = packet_bytes * packets
 
-    # Don't start reading until there are a number of bytes ready
+    # Sent after every frame.  The first 6 bits of the first byte of a packet are always
+    # zero for normal data, so this can't be mistaken for a packet.
+    stop_marker = b"\xff\xff"
+
+    # Room for several frames; if reading falls further behind than this, the oldest
+    # data is dropped.
     buffer_bytes = 1024
 
     port = "/dev/ttyS0"
@@ -19,74 +112,117 @@ class SerialRead(object):
     bits = serial.EIGHTBITS
     stop_bits = serial.STOPBITS_ONE
 
-    def __init__(self):
-        self.ser = serial.Serial(
-            self.port, baudrate=self.baud, bytesize=self.bits, timeout=None, stopbits=self.stop_bits
-        )
+    def __init__(self, ser=None):
+        """Constructor.
 
-        self.read_buffer = []
+        Keyword Arguments:
+            ser {serial.Serial} -- An open serial port to read from; opens `port` if not given.
+        """
+        if ser is None:
+            ser = serial.Serial(
+                self.port,
+                baudrate=self.baud,
+                bytesize=self.bits,
+                timeout=None,
+                stopbits=self.stop_bits,
+            )
+        self.ser = ser
+
+        self.set_packets(self.packets)
+
+    def set_packets(self, packets):
+        """Expects frames of `packets` packets from now on, eg for a floor of that many
+        tiles.  Anything already read is dropped.
+        """
+        self.packets = packets
+        self.frame_bytes = self.packet_bytes * packets
+        self.ring = RingBuffer(max(self.buffer_bytes, 4 * self.frame_bytes))
+        # Whether the front of `ring` is known to be the start of a frame.
+        self.synchronized = False
+        self.frame = None
         self.data_ready = False
 
-    def synchronize(self):
+    def read(self):
         """
-        Read data until we find a stop packet to sync ourselves up to the data being sent
+        Read everything waiting on the serial port and extract any complete frames.  If
+        several frames are complete, only the latest is kept.
         :return:
         """
+        available = self.ser.in_waiting
+        if available:
+            if self.ring.write(self.ser.read(available)):
+                logger.debug("Serial buffer overrun, resynchronizing")
+                self.synchronized = False
 
-        if not self.data_ready:
-            return
-
-        packet = self.generate_null_packet()
-        while True:
-            val = self.ser.read(1)
-            # Treat packet as a FIFO until we match a stop marker
-            packet = packet[1:] + [val]
-
-            if self.is_stop_marker(packet):
-                return
-
-    @staticmethod
-    def is_stop_marker(val):
-        # The first 6 bits of the first byte should always be zero for normal data so this condition is unique
-        return ord(val[0]) == 0xFF and ord(val[1]) == 0xFF
-
-    def generate_null_packet(self):
-        return [chr(0) for _ in range(self.packet_bytes)]
+        while self.synchronized or self.synchronize():
+            if not self.read_frame() and self.synchronized:
+                # Waiting on the rest of the frame
+                break
 
-    def read(self):
-        # If the data is ready, wait for it to be read before collecting more
-        if self.data_ready:
-            return
-
-        available = self.ser.inWaiting()
-
-        while available >= self.packet_bytes:
-            data = self.ser.read(self.packet_bytes)
-            available -= self.packet_bytes
+    def synchronize(self):
+        """
+        Scan for a stop marker, and discard everything up to and including it
+        :return: True if a stop marker was found
+        """
+        ring = self.ring
+        idx = ring.find(self.stop_marker)
+        if idx < 0:
+            # Nothing to sync on; keep only a possible first half of a marker.
+            if len(ring) > 1:
+                ring.discard(len(ring) - 1)
+            return False
+
+        # The low byte of a packet may be 0xFF too, in which case the marker
+        # is the last pair in a run of 0xFF bytes.
+        end = idx + len(self.stop_marker)
+        while end < len(ring) and ring[end] == 0xFF:
+            end += 1
+        if end == len(ring):
+            # Can't tell where the run ends yet.
+            ring.discard(idx)
+            return False
+
+        ring.discard(end)
+        self.synchronized = True
+        return True
+
+    def read_frame(self):
+        """
+        Extract the frame at the front of the buffer, if it's all there
+        :return: True if a frame was read
+        """
+        ring = self.ring
+        if len(ring) < self.frame_bytes + len(self.stop_marker):
+            return False
 
-            if self.is_stop_marker(data):
-                self.data_ready = True
-                return
+        if ring.peek(self.frame_bytes, len(self.stop_marker)) != self.stop_marker:
+            logger.debug("Missing stop marker, resynchronizing")
+            self.synchronized = False
+            return False
 
-            self.read_buffer.extend(data)
+        self.frame = ring.peek(0, self.frame_bytes)
+        self.data_ready = True
+        ring.discard(self.frame_bytes + len(self.stop_marker))
+        return True
 
     def get_frame(self):
+        """
+        :return: The latest frame, as `frame_bytes` bytes
+        """
         # Reset this ready state for the next round
         self.data_ready = False
-
-        # Return only the last self.frame_bytes (in case we got extra)
-        start_index = len(self.read_buffer) - self.frame_bytes
-        return self.read_buffer[start_index:]
+        return self.frame
 
     def flush(self):
         """
         Read in any waiting data and discard
         :return:
         """
-        available = self.ser.inWaiting()
-        while available >= self.packet_bytes:
-            data = self.ser.read(self.packet_bytes)
-            available -= self.packet_bytes
+        available = self.ser.in_waiting
+        if available:
+            self.ser.read(available)
 
-        self.read_buffer = []
+        self.ring.clear()
+        self.synchronized = False
+        self.frame = None
         self.data_ready = False
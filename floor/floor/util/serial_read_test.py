@@ -0,0 +1,174 @@
+from builtins import object, range
+from unittest import TestCase
+
+from floor.util.serial_read import RingBuffer, SerialRead
+
+MARKER = b"\xff\xff"
+
+
+class FakeSerial(object):
+    """An in-memory stand-in for `serial.Serial`."""
+
+    def __init__(self):
+        self.pending = bytearray()
+        self.reads = 0
+
+    def feed(self, data):
+        self.pending.extend(data)
+
+    @property
+    def in_waiting(self):
+        return len(self.pending)
+
+    def read(self, size=1):
+        self.reads += 1
+        data = bytes(self.pending[:size])
+        del self.pending[:size]
+        return data
+
+
+def make_frame(value):
+    """A frame with every sensor reading `value`."""
+    return bytes([value >> 8, value & 0xFF]) * SerialRead.packets
+
+
+class RingBufferTest(TestCase):
+    def setUp(self):
+        self.ring = RingBuffer(8)
+
+    def wrap(self, data):
+        """Leaves `data` in the ring, straddling the end of the storage."""
+        self.ring.write(b"\x00" * 6)
+        self.ring.discard(6)
+        self.ring.write(data)
+
+    def test_write_and_peek(self):
+        self.ring.write(b"abc")
+        self.assertEqual(3, len(self.ring))
+        self.assertEqual(b"bc", self.ring.peek(1, 2))
+
+    def test_peek_across_wrap(self):
+        self.wrap(b"abcde")
+        self.assertEqual(b"abcde", self.ring.peek(0, 5))
+        self.assertEqual(ord("d"), self.ring[3])
+
+    def test_overwrites_oldest(self):
+        self.ring.write(b"abcdef")
+        self.assertEqual(3, self.ring.write(b"ghijk"))
+        self.assertEqual(b"defghijk", self.ring.peek(0, 8))
+        self.assertEqual(8, self.ring.write(b"0123456789"[:8]))
+        self.assertEqual(b"01234567", self.ring.peek(0, 8))
+
+    def test_discard_nothing(self):
+        self.ring.write(b"\xff" * 8)
+        self.ring.clear()
+        self.ring.discard(-1)
+        self.assertEqual(0, len(self.ring))
+        self.ring.write(b"ab")
+        self.ring.discard(-1)
+        self.assertEqual(b"ab", self.ring.peek(0, 2))
+
+    def test_find(self):
+        self.ring.write(b"ab\xff\xffc")
+        self.assertEqual(2, self.ring.find(MARKER))
+        self.assertEqual(-1, self.ring.find(MARKER, 3))
+
+    def test_find_across_wrap(self):
+        # Every placement of the pattern relative to the end of the storage.
+        for position in range(3):
+            data = bytearray(b"abcd")
+            data[position : position + 2] = MARKER
+            self.ring.clear()
+            self.wrap(bytes(data[:4]))
+            self.assertEqual(position, self.ring.find(MARKER), position)
+
+    def test_find_with_offset_after_wrap(self):
+        self.wrap(b"\xff\xffab\xff\xff")
+        self.assertEqual(0, self.ring.find(MARKER))
+        self.assertEqual(4, self.ring.find(MARKER, 1))
+
+
+class SerialReadTest(TestCase):
+    def setUp(self):
+        self.ser = FakeSerial()
+        self.reader = SerialRead(ser=self.ser)
+
+    def read(self, data):
+        self.ser.feed(data)
+        self.reader.read()
+
+    def test_reads_frame(self):
+        self.read(MARKER + make_frame(0x123) + MARKER)
+        self.assertTrue(self.reader.data_ready)
+        self.assertEqual(make_frame(0x123), self.reader.get_frame())
+        self.assertFalse(self.reader.data_ready)
+
+    def test_one_bulk_read_per_call(self):
+        self.read(MARKER + make_frame(1) + MARKER + make_frame(2))
+        self.assertEqual(1, self.ser.reads)
+        self.assertEqual(0, self.ser.in_waiting)
+
+    def test_frame_split_across_reads(self):
+        data = MARKER + make_frame(0x42) + MARKER
+        for i in range(0, len(data), 7):
+            self.assertFalse(self.reader.data_ready)
+            self.read(data[i : i + 7])
+        self.assertEqual(make_frame(0x42), self.reader.get_frame())
+
+    def test_latest_frame_wins(self):
+        self.read(MARKER + make_frame(1) + MARKER + make_frame(2) + MARKER)
+        self.assertEqual(make_frame(2), self.reader.get_frame())
+
+    def test_skips_partial_frame_at_start(self):
+        self.read(make_frame(9)[:37] + MARKER + make_frame(3) + MARKER)
+        self.assertEqual(make_frame(3), self.reader.get_frame())
+
+    def test_low_byte_may_look_like_marker(self):
+        # The last packet of the partial frame ends in 0xFF, right before the marker.
+        self.read(make_frame(0x0FF)[-4:] + MARKER + make_frame(0x1FF) + MARKER)
+        self.assertEqual(make_frame(0x1FF), self.reader.get_frame())
+
+    def test_waits_for_end_of_marker_run(self):
+        self.read(b"\x00\xff" + MARKER)
+        self.assertFalse(self.reader.synchronized)
+        self.read(make_frame(5) + MARKER)
+        self.assertEqual(make_frame(5), self.reader.get_frame())
+
+    def test_synchronize_on_short_ring(self):
+        # A stale 0xFF left in the storage must not pair up with the next one.
+        self.reader.ring.write(b"\xff" * 8)
+        self.reader.ring.clear()
+        self.read(b"")
+        self.assertEqual(0, len(self.reader.ring))
+        self.read(b"\xff")
+        self.assertFalse(self.reader.synchronized)
+        self.assertEqual(1, len(self.reader.ring))
+        self.read(b"\x00" + MARKER + make_frame(7) + MARKER)
+        self.assertEqual(make_frame(7), self.reader.get_frame())
+
+    def test_resynchronizes_after_corruption(self):
+        self.read(MARKER + make_frame(1)[:-3] + MARKER)
+        self.assertFalse(self.reader.data_ready)
+        self.read(make_frame(6) + MARKER)
+        self.assertEqual(make_frame(6), self.reader.get_frame())
+
+    def test_memory_is_bounded(self):
+        self.read(MARKER)
+        for i in range(200):
+            self.ser.feed(make_frame(i) + MARKER)
+        self.reader.read()
+        self.assertEqual(make_frame(199), self.reader.get_frame())
+        self.assertEqual(SerialRead.buffer_bytes, len(self.reader.ring.buffer))
+
+        for i in range(500):
+            self.read(make_frame(i % 1024) + MARKER)
+            self.assertEqual(make_frame(i % 1024), self.reader.get_frame())
+        self.assertEqual(0, len(self.reader.ring))
+
+    def test_flush(self):
+        self.read(MARKER + make_frame(1) + MARKER + make_frame(2)[:10])
+        self.ser.feed(b"\x01\x02")
+        self.reader.flush()
+        self.assertFalse(self.reader.data_ready)
+        self.assertEqual(0, self.ser.in_waiting)
+        self.assertEqual(0, len(self.reader.ring))
@@ -0,0 +1,83 @@
+from builtins import object
+
+import numpy as np
+
+
+class SpiPacketEncoder(object):
+    """Packs frames of LED values into the byte stream expected by the floor.
+
+    Each tile takes three 10-bit color values packed into four bytes:
+
+        byte 0: R9..R4
+        byte 1: R3..R0 G9..G6
+        byte 2: G5..G0 B9..B8
+        byte 3: B7..B0
+
+    Tiles are written in the order given by `tile_order`, skipping any tile the
+    layout marks as bypassed. That index map only changes with the layout, so
+    it is computed once up front; encoding a frame is then a handful of array
+    operations writing into a reusable `bytearray`.
+    """
+
+    BYTES_PER_TILE = 4
+
+    def __init__(self, tile_order, layout=None):
+        self.tile_order = tile_order
+        self.index_map = None
+        self.buffer = None
+        self._frame_values = np.zeros((len(tile_order), 3), dtype=np.uint16)
+        self._tile_values = None
+        self._packed_values = None
+        self._packed = None
+        self.set_layout(layout)
+
+    def set_layout(self, layout):
+        """Recompute the tile index map and output buffers for `layout`."""
+        tiles = [tile for tile in self.tile_order if not (layout and layout.is_bypassed(tile))]
+        num_tiles = len(tiles)
+
+        self.index_map = np.array(tiles, dtype=np.intp)
+        self.buffer = bytearray(num_tiles * self.BYTES_PER_TILE)
+        self._tile_values = np.zeros((num_tiles, 3), dtype=np.uint16)
+        self._packed_values = np.zeros((num_tiles, self.BYTES_PER_TILE), dtype=np.uint16)
+        self._packed = np.frombuffer(self.buffer, dtype=np.uint8).reshape(
+            (num_tiles, self.BYTES_PER_TILE)
+        )
+
+    def encode(self, frame):
+        """Packs `frame` and returns the encoded bytes.
+
+        Arguments:
+            frame {FrameBuffer} -- The frame to encode.
+
+        Returns:
+            bytearray -- The encoded frame. This buffer is reused by the next
+            call to `encode`.
+        """
+        leds = frame.to_uint16(out=self._frame_values)
+        values = self._tile_values
+        np.take(leds, self.index_map, axis=0, out=values)
+        r, g, b = values[:, 0], values[:, 1], values[:, 2]
+
+        packed = self._packed_values
+        np.right_shift(r, 4, out=packed[:, 0])
+        np.left_shift(r & 0x00F, 4, out=packed[:, 1])
+        packed[:, 1] |= g >> 6
+        np.left_shift(g & 0x3F, 2, out=packed[:, 2])
+        packed[:, 2] |= (b & 0x300) >> 8
+        np.bitwise_and(b, 0x0FF, out=packed[:, 3])
+
+        self._packed[:] = packed
+        return self.buffer
+
+
+def write_packet(spi, data):
+    """Writes `data` to an SPI device.
+
+    Uses `writebytes2`, which reads directly from any buffer object, when the
+    installed `spidev` has it; older versions need a list of ints.
+    """
+    if hasattr(spi, "writebytes2"):
+        spi.writebytes2(data)
+    else:
+        spi.xfer(list(data))
@@ -0,0 +1,139 @@
+"""
+Deciding which tiles are stepped on, from noisy weight sensor readings.
+
+The sensors under each tile are noisy, so a single threshold on each reading
+makes tiles flicker on and off. A `StepFilter` runs every reading through,
+for all tiles at once:
+
+    smoothing     -- An exponential moving average of each tile's readings; 1.0
+                     uses each reading as is.
+    hysteresis    -- A tile turns on when its smoothed reading reaches
+                     `on_threshold`, and only turns off again once it drops below
+                     `off_threshold`.
+    dwell         -- A tile stays on for at least `min_on_seconds`, and off for at
+                     least `min_off_seconds`, before it can change again.
+    calibration   -- With `auto_calibrate`, the thresholds are instead
+                     `on_fraction` and `off_fraction` of the way from the lowest
+                     reading seen on each tile to the highest (or to `min_span`
+                     above the lowest, while nobody has pressed it much).
+
+The defaults just compare each reading to `on_threshold`. Layouts can
+configure the filter with a `step_filter` object of the same names, and
+`floor.util.weight_decoder.replay` runs recorded readings back through a
+filter, for tuning it.
+"""
+
+from __future__ import absolute_import, division
+
+from builtins import object
+
+import numpy as np
+
+
+class StepFilter(object):
+    DEFAULTS = {
+        "smoothing": 1.0,
+        "on_threshold": 200,
+        "off_threshold": None,
+        "min_on_seconds": 0.0,
+        "min_off_seconds": 0.0,
+        "auto_calibrate": False,
+        "on_fraction": 0.5,
+        "off_fraction": 0.3,
+        "min_span": 200,
+    }
+
+    def __init__(self, num_tiles, **kwargs):
+        """Constructor.
+
+        Arguments:
+            num_tiles {int} -- How many tiles to filter.
+
+        Keyword Arguments:
+            Any of `DEFAULTS`; see the module docs. `off_threshold` defaults to
+            `on_threshold`.
+        """
+        unknown = set(kwargs) - set(self.DEFAULTS)
+        if unknown:
+            raise ValueError("Unknown step filter settings: {}".format(", ".join(sorted(unknown))))
+        settings = dict(self.DEFAULTS, **kwargs)
+        if settings["off_threshold"] is None:
+            settings["off_threshold"] = settings["on_threshold"]
+        if not 0.0 < settings["smoothing"] <= 1.0:
+            raise ValueError(
+                "smoothing must be on (0.0, 1.0], not {}".format(settings["smoothing"])
+            )
+        if settings["off_threshold"] > settings["on_threshold"]:
+            raise ValueError("off_threshold must not be above on_threshold")
+        if settings["off_fraction"] > settings["on_fraction"]:
+            raise ValueError("off_fraction must not be above on_fraction")
+        self.settings = settings
+        for name, value in settings.items():
+            setattr(self, name, value)
+
+        self.smoothed = None
+        self.on = np.zeros(num_tiles, dtype=bool)
+        # When each tile last turned on or off.
+        self.changed_at = np.full(num_tiles, -np.inf)
+        self._on_thresholds = np.full(num_tiles, self.on_threshold, dtype=np.float32)
+        self._off_thresholds = np.full(num_tiles, self.off_threshold, dtype=np.float32)
+
+    @classmethod
+    def from_object(cls, num_tiles, obj, **defaults):
+        """Builds a filter from a layout's `step_filter` object.
+
+        Arguments:
+            num_tiles {int} -- How many tiles to filter.
+            obj {dict} -- Settings; see `DEFAULTS`.
+
+        Keyword Arguments:
+            Settings to use where `obj` doesn't give them, eg the driver's threshold.
+        """
+        settings = dict(defaults)
+        settings.update(obj or {})
+        return cls(num_tiles, **settings)
+
+    def update(self, values, valid, now, value_floor=None, value_ceiling=None):
+        """Filters one reading from every tile, and returns which are stepped on.
+
+        Arguments:
+            values {numpy.ndarray} -- Each tile's reading.
+            valid {numpy.ndarray} -- Whether each reading is in range. Out of range
+                readings are ignored, leaving their tile as it was.
+            now {float} -- When the readings were taken, in seconds.
+
+        Keyword Arguments:
+            value_floor {numpy.ndarray} -- The lowest reading seen on each tile, for
+                `auto_calibrate`.
+            value_ceiling {numpy.ndarray} -- The highest reading seen on each tile.
+
+        Returns:
+            numpy.ndarray -- True for each tile that's stepped on. Updated in place
+                by later calls.
+        """
+        if self.smoothed is None:
+            self.smoothed = np.where(valid, values, 0).astype(np.float32)
+        elif self.smoothing >= 1.0:
+            np.copyto(self.smoothed, values, where=valid)
+        else:
+            target = np.where(valid, values, self.smoothed)
+            self.smoothed += self.smoothing * (target - self.smoothed)
+
+        on_thresholds, off_thresholds = self._on_thresholds, self._off_thresholds
+        if self.auto_calibrate and value_floor is not None and value_ceiling is not None:
+            span = np.maximum(value_ceiling.astype(np.float32) - value_floor, self.min_span)
+            np.multiply(span, self.on_fraction, out=on_thresholds)
+            on_thresholds += value_floor
+            np.multiply(span, self.off_fraction, out=off_thresholds)
+            off_thresholds += value_floor
+
+        dwell = now - self.changed_at
+        on = self.on
+        turn_on = ~on & (self.smoothed >= on_thresholds) & (dwell >= self.min_off_seconds)
+        turn_off = on & (self.smoothed < off_thresholds) & (dwell >= self.min_on_seconds)
+        turn_on &= valid
+        turn_off &= valid
+        on |= turn_on
+        on &= ~turn_off
+        self.changed_at[turn_on | turn_off] = now
+        return on
@@ -0,0 +1,63 @@
+from __future__ import absolute_import, division, print_function, unicode_literals
+
+from unittest import TestCase
+
+import numpy as np
+
+from floor.util.step_filter import StepFilter
+
+VALID = np.ones(2, dtype=bool)
+
+
+def run(step_filter, readings, seconds_per_reading=0.01, **kwargs):
+    """Feeds `[tile0, tile1]` readings through, returning which tiles were on after each."""
+    results = []
+    for i, values in enumerate(readings):
+        on = step_filter.update(np.array(values), VALID, i * seconds_per_reading, **kwargs)
+        results.append(on.astype(int).tolist())
+    return results
+
+
+class StepFilterTest(TestCase):
+    def test_threshold(self):
+        step_filter = StepFilter(2, on_threshold=200)
+        self.assertEqual([[0, 1], [1, 0]], run(step_filter, [[199, 200], [300, 10]]))
+
+    def test_hysteresis(self):
+        step_filter = StepFilter(2, on_threshold=200, off_threshold=100)
+        readings = [[150, 0], [250, 0], [150, 0], [99, 0], [150, 0]]
+        self.assertEqual([[0, 0], [1, 0], [1, 0], [0, 0], [0, 0]], run(step_filter, readings))
+
+    def test_smoothing(self):
+        step_filter = StepFilter(2, smoothing=0.5, on_threshold=200)
+        # A single spike doesn't get through; a step held for a few readings does.
+        readings = [[0, 0], [300, 0], [0, 0], [300, 0], [300, 0]]
+        self.assertEqual([0, 0, 0, 0, 1], [on[0] for on in run(step_filter, readings)])
+
+    def test_dwell(self):
+        step_filter = StepFilter(2, on_threshold=200, min_on_seconds=0.025)
+        readings = [[300, 0], [0, 0], [0, 0], [0, 0], [0, 0]]
+        self.assertEqual([1, 1, 1, 0, 0], [on[0] for on in run(step_filter, readings)])
+
+    def test_invalid_readings_are_ignored(self):
+        step_filter = StepFilter(2, on_threshold=200)
+        step_filter.update(np.array([300, 300]), VALID, 0.0)
+        on = step_filter.update(np.array([0, 0]), np.array([False, True]), 1.0)
+        self.assertEqual([True, False], on.tolist())
+
+    def test_auto_calibrate(self):
+        step_filter = StepFilter(2, auto_calibrate=True, on_fraction=0.5, min_span=100)
+        floor = np.array([400, 0])
+        ceiling = np.array([800, 0])
+        results = run(step_filter, [[550, 40], [650, 60]], value_floor=floor, value_ceiling=ceiling)
+        self.assertEqual([[0, 0], [1, 1]], results)
+
+    def test_settings(self):
+        step_filter = StepFilter.from_object(2, {"smoothing": 0.5}, on_threshold=300)
+        self.assertEqual(300, step_filter.off_threshold)
+        with self.assertRaises(ValueError):
+            StepFilter(2, smoothing=0)
+        with self.assertRaises(ValueError):
+            StepFilter(2, on_threshold=100, off_threshold=200)
+        with self.assertRaises(ValueError):
+            StepFilter.from_object(2, {"treshold": 100})
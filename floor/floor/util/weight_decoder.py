@@ -0,0 +1,145 @@
+from __future__ import division
+
+import time
+from builtins import object
+
+import numpy as np
+
+from floor.util.step_filter import StepFilter
+
+
+class WeightDecoder(object):
+    """Decodes frames of weight sensor readings sent back by the floor.
+
+    A frame is a series of big-endian 16-bit packets, one per tile, in the order
+    the tiles are chained (`tile_order`). Decoding reads every packet in one
+    call, and puts them back in left-to-right tile order through a permutation
+    computed up front. Which tiles are stepped on is then decided by a
+    `StepFilter`, which by default compares each reading to `threshold`.
+
+    After each `decode`:
+
+        raw_weights   -- Each tile's reading, or 0 if it isn't stepped on.
+        weights       -- 1 for each tile stepped on, else 0.
+        pressures     -- How hard each stepped-on tile is pressed, on `(0.0, 1.0]`,
+                         relative to the heaviest reading seen on that tile; 0.0 for
+                         tiles that aren't stepped on.
+        value_floor   -- The lowest in-range reading seen on each tile so far.
+        value_ceiling -- The highest in-range reading seen on each tile so far.
+    """
+
+    def __init__(self, tile_order, threshold, max_value=1023, step_filter=None):
+        """Constructor.
+
+        Arguments:
+            tile_order {list} -- The tile position of each packet in a frame.
+            threshold {int} -- The minimum reading for a tile to register as a step.
+
+        Keyword Arguments:
+            max_value {int} -- The highest valid reading; anything above is noise.
+            step_filter {StepFilter} -- Decides which tiles are stepped on; by default,
+                those reading at least `threshold`.
+        """
+        self.threshold = threshold
+        self.max_value = max_value
+
+        num_tiles = len(tile_order)
+        # The packet index for each tile position.
+        self.permutation = np.argsort(np.asarray(tile_order, dtype=np.intp))
+
+        self.raw_weights = np.zeros(num_tiles, dtype=np.uint16)
+        self.weights = np.zeros(num_tiles, dtype=np.uint8)
+        self.pressures = np.zeros(num_tiles, dtype=np.float32)
+        self.value_floor = np.full(num_tiles, max_value, dtype=np.uint16)
+        self.value_ceiling = np.zeros(num_tiles, dtype=np.uint16)
+
+        self._packets = np.zeros(num_tiles, dtype=np.uint16)
+        self._values = np.zeros(num_tiles, dtype=np.uint16)
+        self._valid = np.zeros(num_tiles, dtype=bool)
+        self._span = np.zeros(num_tiles, dtype=np.float32)
+
+        if step_filter is None:
+            step_filter = StepFilter(num_tiles, on_threshold=threshold)
+        self.step_filter = step_filter
+
+    def decode(self, data_bytes, now=None):
+        """Decodes a frame, updating the arrays described above.
+
+        Arguments:
+            data_bytes {bytes} -- The frame. Tiles missing from a short frame read as 0.
+
+        Keyword Arguments:
+            now {float} -- When the frame was read, in seconds; defaults to the current time.
+
+        Returns:
+            list -- The binary weights, in tile order.
+        """
+        num_packets = min(len(data_bytes) // 2, len(self._packets))
+        packets = self._packets
+        packets[:num_packets] = np.frombuffer(data_bytes, dtype=">u2", count=num_packets)
+        packets[num_packets:] = 0
+
+        values = self._values
+        np.take(packets, self.permutation, out=values)
+
+        valid = np.less_equal(values, self.max_value, out=self._valid)
+        np.minimum(self.value_floor, values, out=self.value_floor, where=valid)
+        np.maximum(self.value_ceiling, values, out=self.value_ceiling, where=valid)
+
+        if now is None:
+            now = time.time()
+        stepped = self.step_filter.update(
+            values, valid, now, value_floor=self.value_floor, value_ceiling=self.value_ceiling
+        )
+        np.multiply(values, stepped, out=self.raw_weights)
+        self.weights[:] = stepped
+
+        # Scale each reading between the threshold and the tile's ceiling.
+        span = self._span
+        np.maximum(self.value_ceiling, self.threshold, out=span, casting="unsafe")
+        span -= self.threshold - 1
+        pressures = self.pressures
+        pressures[:] = values
+        pressures -= self.threshold - 1
+        pressures /= span
+        np.clip(pressures, 0.0, 1.0, out=pressures)
+        pressures *= stepped
+
+        return self.weights.tolist()
+
+
+def replay(frames, tile_order, step_filter=None, threshold=200, max_value=1023):
+    """Decodes recorded weight frames through a step filter, eg to tune its settings.
+
+    Arguments:
+        frames {iterable} -- `(time, data_bytes)` for each frame, as read from the floor.
+        tile_order {list} -- The tile position of each packet in a frame.
+
+    Keyword Arguments:
+        step_filter {dict} -- Filter settings, as in a layout's `step_filter`.
+        threshold {int} -- The driver's `floor_threshold`.
+        max_value {int} -- The highest valid reading.
+
+    Returns:
+        tuple -- The weights after each frame, as a `(num_frames, num_tiles)` array, and
+            the number of times each tile turned on.
+    """
+    num_tiles = len(tile_order)
+    decoder = WeightDecoder(
+        tile_order,
+        threshold,
+        max_value,
+        step_filter=StepFilter.from_object(num_tiles, step_filter, on_threshold=threshold),
+    )
+    all_weights = []
+    steps = np.zeros(num_tiles, dtype=np.intp)
+    previous = np.zeros(num_tiles, dtype=bool)
+    for now, data_bytes in frames:
+        decoder.decode(data_bytes, now)
+        stepped = decoder.weights.astype(bool)
+        steps += stepped & ~previous
+        previous = stepped
+        all_weights.append(stepped)
+    if not all_weights:
+        return np.zeros((0, num_tiles), dtype=np.uint8), steps
+    return np.array(all_weights, dtype=np.uint8), steps
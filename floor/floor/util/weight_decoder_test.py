@@ -0,0 +1,73 @@
+import struct
+from builtins import range
+from unittest import TestCase
+
+from floor.util.step_filter import StepFilter
+from floor.util.weight_decoder import WeightDecoder, replay
+
+TILE_ORDER = [0, 1, 3, 2]
+
+
+def make_frame(values):
+    return struct.pack(">{}H".format(len(values)), *values)
+
+
+class WeightDecoderTest(TestCase):
+    def setUp(self):
+        self.decoder = WeightDecoder(TILE_ORDER, threshold=200)
+
+    def test_decodes_in_tile_order(self):
+        weights = self.decoder.decode(make_frame([300, 0, 400, 100]))
+        self.assertEqual([1, 0, 0, 1], weights)
+        self.assertEqual([300, 0, 0, 400], self.decoder.raw_weights.tolist())
+
+    def test_threshold_and_range(self):
+        weights = self.decoder.decode(make_frame([199, 200, 1023, 1024]))
+        self.assertEqual([0, 1, 0, 1], weights)
+        self.assertEqual([0, 200, 0, 1023], self.decoder.raw_weights.tolist())
+
+    def test_short_frame(self):
+        weights = self.decoder.decode(make_frame([500, 500])[:3])
+        self.assertEqual([1, 0, 0, 0], weights)
+
+    def test_calibration(self):
+        for values in ([250, 10, 0, 300], [220, 30, 2000, 600]):
+            self.decoder.decode(make_frame(values))
+        self.assertEqual([220, 10, 300, 0], self.decoder.value_floor.tolist())
+        self.assertEqual([250, 30, 600, 0], self.decoder.value_ceiling.tolist())
+
+    def test_pressures(self):
+        self.decoder.decode(make_frame([599, 0, 0, 0]))
+        self.assertEqual([1.0, 0.0, 0.0, 0.0], self.decoder.pressures.tolist())
+
+        expected = [1.0, 0.75, 0.5, 0.25, 1.0 / 400, 0.0]
+        for value, pressure in zip([599, 499, 399, 299, 200, 199], expected):
+            self.decoder.decode(make_frame([value, 0, 0, 0]))
+            self.assertAlmostEqual(pressure, self.decoder.pressures[0], places=6)
+
+    def test_matches_per_packet_decoding(self):
+        frame = bytes(range(8))
+        weights = self.decoder.decode(frame)
+        for packet, position in enumerate(TILE_ORDER):
+            value = (frame[packet * 2] << 8) + frame[packet * 2 + 1]
+            self.assertEqual(1 if 200 <= value <= 1023 else 0, weights[position])
+
+    def test_step_filter(self):
+        decoder = WeightDecoder(
+            TILE_ORDER, threshold=200, step_filter=StepFilter(4, min_on_seconds=1.0)
+        )
+        decoder.decode(make_frame([300, 0, 0, 0]), now=10.0)
+        self.assertEqual([1, 0, 0, 0], decoder.decode(make_frame([0, 0, 0, 0]), now=10.5))
+        self.assertEqual([0, 0, 0, 0], decoder.decode(make_frame([0, 0, 0, 0]), now=11.0))
+
+
+class ReplayTest(TestCase):
+    def test_replay(self):
+        # Tile 0 flickers around the threshold.
+        frames = [(i * 0.02, make_frame([190 + 20 * (i % 2), 0, 0, 0])) for i in range(10)]
+        weights, steps = replay(frames, TILE_ORDER)
+        self.assertEqual((10, 4), weights.shape)
+        self.assertEqual([5, 0, 0, 0], steps.tolist())
+
+        weights, steps = replay(frames, TILE_ORDER, step_filter={"smoothing": 0.2})
+        self.assertEqual([0, 0, 0, 0], steps.tolist())
@@ -0,0 +1,80 @@
+"""
+Turning successive weight frames into step events.
+
+Most processors only care when a tile is stepped on or off, but weights
+arrive as a full frame every frame. A `WeightTracker` diffs each frame
+against the last one, and hands out the tiles that changed as `StepEvent`s,
+so processors can react to changes instead of rescanning every tile.
+"""
+
+from __future__ import absolute_import, division
+
+import collections
+from builtins import object
+
+import numpy as np
+
+# A tile at `index` was stepped on (`on` is True) or off, at `time`.
+StepEvent = collections.namedtuple("StepEvent", ["index", "on", "time"])
+
+
+class WeightTracker(object):
+    # How many recent events to keep, for processors that don't render every frame.
+    HISTORY_LENGTH = 256
+
+    def __init__(self, num_pixels):
+        """Constructor.
+
+        Arguments:
+            num_pixels {int} -- How many tiles there are.
+        """
+        # The current weights, 0 or 1 for each tile. Replaced, never modified, when
+        # they change, so it's safe to hold on to.
+        self.weights = np.zeros(num_pixels, dtype=np.int8)
+        # `weights` as a list, for processors that index it a lot.
+        self.weight_list = [0] * num_pixels
+        # Events from the last update, and the last `HISTORY_LENGTH` from any update.
+        self.events = ()
+        self.history = collections.deque(maxlen=self.HISTORY_LENGTH)
+        # Increases whenever `weights` changes.
+        self.version = 0
+
+    def update(self, weights, now):
+        """Takes the latest weights, and returns the events since the last update.
+
+        Arguments:
+            weights {numpy.ndarray} -- The weight of each tile; anything non-zero is on.
+            now {float} -- The time to give any events.
+        """
+        weights = (np.asarray(weights) != 0).astype(np.int8)
+        changed = np.flatnonzero(weights != self.weights)
+        if not len(changed):
+            self.events = ()
+            return self.events
+
+        self.events = tuple(
+            StepEvent(index, on, now)
+            for index, on in zip(changed.tolist(), (weights[changed] != 0).tolist())
+        )
+        self.history.extend(self.events)
+        self.weights = weights
+        self.weight_list = weights.tolist()
+        self.version += 1
+        return self.events
+
+    def events_since(self, clock):
+        """Returns the events after time `clock`, oldest first, as far back as
+        `HISTORY_LENGTH` events.
+        """
+        return events_since(self.history, clock)
+
+
+def events_since(history, clock):
+    """Returns the events in `history` after time `clock`, oldest first."""
+    recent = []
+    for event in reversed(history):
+        if event.time <= clock:
+            break
+        recent.append(event)
+    recent.reverse()
+    return recent
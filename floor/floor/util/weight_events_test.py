@@ -0,0 +1,35 @@
+from __future__ import absolute_import, division, print_function, unicode_literals
+
+from unittest import TestCase
+
+from floor.util.weight_events import StepEvent, WeightTracker
+
+
+class WeightTrackerTest(TestCase):
+    def test_events(self):
+        tracker = WeightTracker(4)
+        self.assertEqual((), tracker.update([0, 0, 0, 0], 1.0))
+        self.assertEqual(0, tracker.version)
+
+        events = tracker.update([0, 1, 0, 5], 2.0)
+        self.assertEqual((StepEvent(1, True, 2.0), StepEvent(3, True, 2.0)), events)
+        self.assertEqual([0, 1, 0, 1], tracker.weight_list)
+        self.assertEqual([0, 1, 0, 1], tracker.weights.tolist())
+        self.assertEqual(1, tracker.version)
+
+        self.assertEqual((), tracker.update([0, 1, 0, 1], 3.0))
+        weights = tracker.weights
+        self.assertEqual((StepEvent(1, False, 4.0),), tracker.update([0, 0, 0, 1], 4.0))
+        # Earlier arrays aren't modified.
+        self.assertEqual([0, 1, 0, 1], weights.tolist())
+
+    def test_events_since(self):
+        tracker = WeightTracker(2)
+        tracker.update([1, 0], 1.0)
+        tracker.update([1, 1], 2.0)
+        tracker.update([0, 0], 3.0)
+        self.assertEqual(
+            [StepEvent(0, False, 3.0), StepEvent(1, False, 3.0)], tracker.events_since(2.0)
+        )
+        self.assertEqual(4, len(tracker.events_since(0.0)))
+        self.assertEqual([], tracker.events_since(3.0))
@@ -0,0 +1,148 @@
+"""
+A compact binary log of raw weight frames, as read from the floor's serial port.
+
+The file is a fixed-size header followed by one record per frame:
+
+    header
+    offset  size  field
+    0       4     magic, b"DFWL"
+    4       2     version
+    6       2     header size, in bytes
+    8       8     reserved
+
+    record
+    0       8     when the frame was read, in seconds since the epoch, float64
+    8       2     frame length, in bytes
+    10      n     the frame, exactly as read (see `floor.util.weight_decoder`)
+
+All fields are little endian. Writers only ever append, so logging can be
+stopped and started again on the same file, and a log cut short by a crash
+is still readable up to the last whole record.
+
+    with WeightLogWriter("show.weights") as writer:
+        writer.write(time.time(), data_bytes)
+
+    for timestamp, data_bytes in WeightLog("show.weights"):
+        ...
+"""
+
+from __future__ import division
+
+import os
+import struct
+from builtins import object
+
+import numpy as np
+
+MAGIC = b"DFWL"
+VERSION = 1
+
+HEADER_FORMAT = "<4sHH8x"
+HEADER_SIZE = struct.calcsize(HEADER_FORMAT)
+RECORD_FORMAT = "<dH"
+RECORD_SIZE = struct.calcsize(RECORD_FORMAT)
+
+
+class WeightLogError(Exception):
+    """Thrown when a weight log is malformed."""
+
+
+class WeightLogWriter(object):
+    """Appends frames to a weight log, creating it if needed."""
+
+    # Written frames are flushed to disk at least this often.
+    FLUSH_SECONDS = 1.0
+
+    def __init__(self, filename):
+        self.filename = filename
+        self.fp = open(filename, "ab")
+        if self.fp.tell() == 0:
+            self.fp.write(struct.pack(HEADER_FORMAT, MAGIC, VERSION, HEADER_SIZE))
+        else:
+            # Check we're appending to a weight log, and not something else.
+            WeightLog.read_header(filename)
+        self.num_frames = 0
+        self.last_flush = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+        return False
+
+    def write(self, timestamp, data_bytes):
+        """Appends a frame.
+
+        Arguments:
+            timestamp {float} -- When the frame was read.
+            data_bytes {bytes} -- The frame.
+        """
+        self.fp.write(struct.pack(RECORD_FORMAT, timestamp, len(data_bytes)))
+        self.fp.write(data_bytes)
+        self.num_frames += 1
+        if self.last_flush is None or timestamp - self.last_flush >= self.FLUSH_SECONDS:
+            self.flush()
+            self.last_flush = timestamp
+
+    def flush(self):
+        self.fp.flush()
+
+    def close(self):
+        if not self.fp.closed:
+            self.fp.close()
+
+
+class WeightLog(object):
+    """A weight log, read into memory.
+
+    Attributes:
+        times {numpy.ndarray} -- When each frame was read.
+        frames {list} -- Each frame's bytes.
+    """
+
+    def __init__(self, filename):
+        self.filename = filename
+        header_size = self.read_header(filename)
+        with open(filename, "rb") as fp:
+            fp.seek(header_size)
+            data = fp.read()
+
+        times = []
+        self.frames = []
+        offset = 0
+        while offset + RECORD_SIZE <= len(data):
+            timestamp, length = struct.unpack_from(RECORD_FORMAT, data, offset)
+            offset += RECORD_SIZE
+            if offset + length > len(data):
+                break
+            times.append(timestamp)
+            self.frames.append(data[offset : offset + length])
+            offset += length
+        self.times = np.array(times, dtype=np.float64)
+
+    @staticmethod
+    def read_header(filename):
+        """Checks the header of `filename`, and returns its size."""
+        with open(filename, "rb") as fp:
+            header = fp.read(HEADER_SIZE)
+        if len(header) < HEADER_SIZE:
+            raise WeightLogError("{}: too short for a weight log".format(filename))
+        magic, version, header_size = struct.unpack(HEADER_FORMAT, header)
+        if magic != MAGIC:
+            raise WeightLogError("{}: not a weight log".format(filename))
+        if version != VERSION:
+            raise WeightLogError("{}: unsupported version {}".format(filename, version))
+        if header_size < HEADER_SIZE or header_size > os.path.getsize(filename):
+            raise WeightLogError("{}: malformed header".format(filename))
+        return header_size
+
+    def __len__(self):
+        return len(self.frames)
+
+    def __iter__(self):
+        return zip(self.times.tolist(), self.frames)
+
+    def duration(self):
+        """Returns the time from the first frame to the last, in seconds."""
+        return float(self.times[-1] - self.times[0]) if len(self) else 0.0
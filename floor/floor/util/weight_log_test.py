@@ -0,0 +1,69 @@
+import os
+import shutil
+import struct
+import tempfile
+from unittest import TestCase
+
+from floor.util.weight_log import (
+    HEADER_SIZE,
+    WeightLog,
+    WeightLogError,
+    WeightLogWriter,
+)
+
+
+class WeightLogTest(TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmpdir)
+        self.filename = os.path.join(self.tmpdir, "test.weights")
+
+    def test_round_trip(self):
+        with WeightLogWriter(self.filename) as writer:
+            writer.write(100.0, b"\x00\x01\x02\x03")
+            writer.write(100.5, b"")
+            writer.write(101.25, b"\xff" * 128)
+        self.assertEqual(3, writer.num_frames)
+
+        log = WeightLog(self.filename)
+        self.assertEqual(3, len(log))
+        self.assertEqual(
+            [(100.0, b"\x00\x01\x02\x03"), (100.5, b""), (101.25, b"\xff" * 128)], list(log)
+        )
+        self.assertEqual(1.25, log.duration())
+
+    def test_empty(self):
+        WeightLogWriter(self.filename).close()
+        self.assertEqual(HEADER_SIZE, os.path.getsize(self.filename))
+        log = WeightLog(self.filename)
+        self.assertEqual(0, len(log))
+        self.assertEqual(0.0, log.duration())
+
+    def test_appends(self):
+        with WeightLogWriter(self.filename) as writer:
+            writer.write(1.0, b"ab")
+        with WeightLogWriter(self.filename) as writer:
+            writer.write(2.0, b"cd")
+        self.assertEqual([(1.0, b"ab"), (2.0, b"cd")], list(WeightLog(self.filename)))
+
+    def test_truncated_record(self):
+        with WeightLogWriter(self.filename) as writer:
+            writer.write(1.0, b"abcd")
+            writer.write(2.0, b"efgh")
+        with open(self.filename, "r+b") as fp:
+            fp.truncate(os.path.getsize(self.filename) - 1)
+        self.assertEqual([(1.0, b"abcd")], list(WeightLog(self.filename)))
+
+    def test_not_a_weight_log(self):
+        with open(self.filename, "wb") as fp:
+            fp.write(struct.pack("<4sHH8x", b"DFFF", 1, HEADER_SIZE))
+        with self.assertRaises(WeightLogError):
+            WeightLog(self.filename)
+        with self.assertRaises(WeightLogError):
+            WeightLogWriter(self.filename)
+
+    def test_too_short(self):
+        with open(self.filename, "wb") as fp:
+            fp.write(b"DFWL")
+        with self.assertRaises(WeightLogError):
+            WeightLog(self.filename)
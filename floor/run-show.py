@@ -10,6 +10,7 @@ import sys
 from floor.controller import Controller, Layout, Playlist, PlaylistManager
 from floor.controller.midi import MidiManager
 from floor.controller.playlist import ProcessorNotFound
+from floor.controller.scheduler import FrameScheduler
 from floor.processor import all_processors
 from floor.server.server import run_server
 
@@ -52,7 +53,8 @@ def get_options():
         dest="driver_names",
         default=None,
         action="append",
-        help='Sets the driver to use when writing LED data and reading weight data (default "raspberry")',
+        help='Sets the driver to use when writing LED data and reading weight data (default "raspberry"); '
+        'append ":<shard>" to drive one shard of the floor layout',
     )
     parser.add_argument(
         "--processor",
@@ -78,6 +80,52 @@ def get_options():
     parser.add_argument(
         "--verbose", dest="verbose", action="store_true", help="Enable verbose logging"
     )
+    parser.add_argument(
+        "--io_thread",
+        dest="io_thread",
+        action="store_true",
+        help="Do hardware I/O on a background thread, overlapping it with rendering",
+    )
+    parser.add_argument(
+        "--keepalive_seconds",
+        dest="keepalive_seconds",
+        default=None,
+        type=float,
+        help="Resend unchanged frames to drivers this often, in seconds; 0 to send every frame",
+    )
+    parser.add_argument(
+        "--frame_policy",
+        dest="frame_policy",
+        default=FrameScheduler.DEFAULT_POLICY,
+        choices=FrameScheduler.POLICIES,
+        help="When frames run late, drop the missed frames, or skip rendering until caught up",
+    )
+    parser.add_argument(
+        "--record_weights",
+        dest="record_weights",
+        default=None,
+        help="Append every weight frame read from the floor to this log (raspberry driver)",
+    )
+    parser.add_argument(
+        "--replay_file",
+        dest="replay_file",
+        default=None,
+        help="Weight log for the replay driver to play back",
+    )
+    parser.add_argument(
+        "--replay_speed",
+        dest="replay_speed",
+        default=1.0,
+        type=float,
+        help="How fast the replay driver plays back weights; 1.0 is real time",
+    )
+    parser.add_argument(
+        "--render_worker",
+        dest="render_workers",
+        default=[],
+        action="append",
+        help='Render this layer (eg "playlist" or "overlay1") in a worker process',
+    )
     parser.add_argument(
         "--server_port", dest="server_port", type=int, help="Web server port; -1 to disable."
     )
@@ -110,9 +158,20 @@ def main():
     drivers = []
     driver_names = set(args.driver_names or DEFAULT_DRIVERS)
 
-    for driver_name in driver_names:
-        logger.info('Initializing driver "{}"'.format(driver_name))
-        driver = load_driver(driver_name, {"config_dir": CONFIG_DIR})
+    for driver_spec in driver_names:
+        driver_name, _, shard = driver_spec.partition(":")
+        logger.info('Initializing driver "{}"'.format(driver_spec))
+        driver_args = {"config_dir": CONFIG_DIR, "io_thread": args.io_thread}
+        if shard:
+            driver_args["shard"] = shard
+        if args.keepalive_seconds is not None:
+            driver_args["keepalive_seconds"] = args.keepalive_seconds
+        if args.record_weights:
+            driver_args["record_weights"] = args.record_weights
+        if args.replay_file:
+            driver_args["replay_file"] = args.replay_file
+            driver_args["replay_speed"] = args.replay_speed
+        driver = load_driver(driver_name, driver_args)
         if not driver:
             logger.error("No driver, exiting.")
             sys.exit(1)
@@ -136,7 +195,13 @@ def main():
         playlist = Playlist.from_file(DEFAULT_PLAYLIST, all_processors())
 
     playlist_manager = PlaylistManager(playlist, user_playlists_dir=args.user_playlists_dir)
-    show = Controller(drivers, playlist_manager)
+    show = Controller(
+        drivers,
+        playlist_manager,
+        layout=drivers[0].layout,
+        frame_policy=args.frame_policy,
+        render_workers=args.render_workers,
+    )
 
     if args.midi_server_port:
         midi_manager = MidiManager(
@@ -160,6 +225,9 @@ def main():
     except Exception as e:
         logger.exception("Unexpected error, aborting: {}".format(e))
         sys.exit(1)
+    finally:
+        for driver in drivers:
+            driver.close()
 
 
 if __name__ == "__main__":
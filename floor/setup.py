@@ -5,6 +5,7 @@ setup(
     version="0.2.0",
     description="Dance floor",
     packages=find_packages(),
+    package_data={"floor.processor.animations": ["*.frames"]},
     test_suite="nose.collector",
-    install_requires=["gevent"],
+    install_requires=["gevent", "numpy"],
 )